@@ -1,26 +1,69 @@
 # ===== Imports (deduped) =====
 # 표준 라이브러리
+import io
+import json
+import hashlib
 import os
 import re
 import shutil
 import uuid
+import time
 import threading
-import smtplib
+import zipfile
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+import importlib
+from contextlib import contextmanager
+
 # 서드파티
-import pandas as pd
-import pdfkit
 from jinja2 import Template
 from flask import (
-    Flask, request, jsonify, render_template, render_template_string,
-    redirect, url_for, send_from_directory, flash, session
+    Flask, Response, request, jsonify, render_template, render_template_string,
+    redirect, url_for, send_from_directory, flash, session, g, stream_with_context,
+    before_render_template, template_rendered
 )
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-from email.mime.application import MIMEApplication
+# email.mime.* 는 메일을 만드는 함수 안에서 import (콜드 스타트 단축)
+
+
+class _LazyModule:
+    """
+    첫 속성 접근 때 import 하는 모듈 대리 객체 — Render 무료 플랜 wake-up 시
+    로그인 페이지 같은 가벼운 요청이 pandas/pdfkit import 비용을 치르지 않도록.
+    optional=True면 설치되지 않았을 때 bool(모듈)이 False.
+    """
+    def __init__(self, name, optional=False):
+        self._name = name
+        self._optional = optional
+        self._module = None
+        self._missing = False
+
+    def _load(self):
+        if self._module is None and not self._missing:
+            try:
+                self._module = importlib.import_module(self._name)
+            except ImportError:
+                if not self._optional:
+                    raise
+                self._missing = True
+        return self._module
+
+    def __bool__(self):
+        return self._load() is not None
+
+    def __getattr__(self, attr):
+        module = self._load()
+        if module is None:
+            raise AttributeError(f"{self._name} 모듈이 설치되어 있지 않습니다")
+        return getattr(module, attr)
+
+
+pd = _LazyModule("pandas")
+pdfkit = _LazyModule("pdfkit")
+# 선택 의존성: Pillow가 없으면 이미지 최적화 없이 원본 그대로 사용
+Image = _LazyModule("PIL.Image", optional=True)
+# 선택 의존성: pypdf가 없으면 인쇄용 묶음 PDF는 한 명씩 다시 생성, 발급 전 초안 PDF는 만들지 않음
+pypdf = _LazyModule("pypdf", optional=True)
 # ===== end =====
 
 # 렌더서버는 미국서버이므로 한국시간으로 변경-------
@@ -61,31 +104,521 @@ Notes:
 app = Flask(__name__, template_folder=".")
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "saedam-super-secret")
 
-# Render's ephemeral disk safe base dir
-BASE_DIR = "/mnt/data" if os.path.exists("/mnt/data") else "."
+# Render's ephemeral disk safe base dir (DATA_DIR로 지정하면 우선 — 벤치마크/부하 테스트용 임시 폴더 등)
+BASE_DIR = os.environ.get("DATA_DIR") or ("/mnt/data" if os.path.exists("/mnt/data") else ".")
 
 # 지속 저장 디렉터리(급여명세서 광고 이미지 ad01.jpg등등 저장용)
 AD_DIR = os.path.join(BASE_DIR, "ad_images")
-os.makedirs(AD_DIR, exist_ok=True)
+
+
+# ---- 지점/담당자 목록 (Tenant Registry) ----
+# 증명서 시스템(system01, system02 ...)과 급여명세서 담당자(send01, send02 ...)를 설정 파일에서 읽음.
+# 지점을 늘릴 때 코드/라우트를 복사하지 않고 TENANTS_FILE(기본 tenants.json)에 항목만 추가.
+# 라우트, 저장 위치, 메일 계정, 발송 엔진/연결 수, 하루 발송 한도가 모두 이 목록을 따름.
+#   certificate_systems.<key> : templates(템플릿 폴더), storage_suffix(pending_submissions_XX / output_pdfsXX / draft_pdfsXX),
+#                               user_password, admin_password, admin_email, email, app_password
+#   payroll_operators.<key>   : templates(templates/<폴더>), email, app_password, image_mode
+#   공통(선택)                : daily_quota, connections, delivery_engine, mail_transport
+# 값 자리에 {"env": "환경변수명", "default": 기본값} 을 쓰면 환경변수를 먼저 봄 (비밀번호/메일 계정).
+TENANTS_FILE = os.environ.get("TENANTS_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "tenants.json")
+
+def _tenant_value(value):
+    if isinstance(value, dict) and "env" in value:
+        return os.environ.get(value["env"]) or _tenant_value(value.get("default"))
+    return value
+
+def load_tenants(path=TENANTS_FILE):
+    with open(path, encoding="utf-8") as f:
+        conf = json.load(f)
+
+    def common(t):
+        return {k: t.get(k) for k in ("daily_quota", "connections", "delivery_engine", "mail_transport")}
+
+    systems = {}
+    for key, raw in (conf.get("certificate_systems") or {}).items():
+        t = {k: _tenant_value(v) for k, v in raw.items()}
+        suffix = str(t.get("storage_suffix") or key)
+        systems[key] = {
+            "templates": t.get("templates") or key,
+            "submissions": os.path.join(BASE_DIR, f"pending_submissions_{suffix}.xlsx"),
+            "pdf_dir": os.path.join(BASE_DIR, f"output_pdfs{suffix}"),
+            "draft_dir": os.path.join(BASE_DIR, f"draft_pdfs{suffix}"),
+            "user_password": str(t.get("user_password") or ""),
+            "admin_password": str(t.get("admin_password") or ""),
+            "admin_email": t.get("admin_email"),
+            "email": t.get("email") or os.environ.get("EMAIL_ADDRESS"),
+            "app_pw": t.get("app_password") or os.environ.get("APP_PASSWORD"),
+            **common(t),
+        }
+    operators = {}
+    for key, raw in (conf.get("payroll_operators") or {}).items():
+        t = {k: _tenant_value(v) for k, v in raw.items()}
+        operators[key] = {
+            "upload_dir": os.path.join(BASE_DIR, "uploads", key),
+            "template_base": t.get("templates") or key,             # templates/<폴더>/
+            "email": t.get("email") or os.environ.get("EMAIL_ADDRESS"),
+            "app_pw": t.get("app_password") or os.environ.get("APP_PASSWORD"),
+            "image_mode": t.get("image_mode") or "cid",             # "cid"(첨부) | "hosted"(URL 참조)
+            **common(t),
+        }
+    return systems, operators
+
+CERT_SYSTEMS, PAYROLL_OPERATORS = load_tenants()
+
+def tenant_conf(key):
+    return CERT_SYSTEMS.get(key) or PAYROLL_OPERATORS.get(key) or {}
+
+def submissions_path(system):
+    return CERT_SYSTEMS[system]["submissions"]
+
+def pdf_dir(system):
+    return CERT_SYSTEMS[system]["pdf_dir"]
+
+def draft_dir(system):
+    return CERT_SYSTEMS[system]["draft_dir"]
+
+def system_template(system, name):
+    return f"{CERT_SYSTEMS[system]['templates']}/{name}"
+
+
+# ---- 지연 초기화 (첫 사용 시 1회) ----
+# 무거운 하위 시스템(payroll 이미지 캐시, 증명서 PDF 엔진, 입금 엑셀)은 import 시점이 아니라
+# 처음 쓰일 때 초기화. /warmup 또는 WARMUP_ON_BOOT=1 로 부팅 직후 백그라운드에서 미리 할 수 있음.
+_initializers = {}     # name -> 초기화 함수 (각 Part에서 등록)
+_initialized = {}      # name -> 소요 시간(ms)
+_init_lock = threading.RLock()
+
+def ensure_initialized(name):
+    if name in _initialized:
+        return
+    with _init_lock:
+        if name in _initialized:
+            return
+        started = time.perf_counter()
+        _initializers[name]()
+        _initialized[name] = round((time.perf_counter() - started) * 1000, 1)
 
 
 # =============================
-# Email Credentials (ENV first)
+# Metrics (라우트 지연 히스토그램 + 주요 구간 타이머)
 # =============================
+# /metrics            : Prometheus text format
+# /metrics?format=json: 같은 내용을 JSON으로 (구간별 합계/건수 요약 포함)
+# METRICS_JSON_LOG    : "off"(기본) | "requests"(요청마다 1줄 — /metrics, 상태 폴링까지 찍히므로 조사할 때만) | "all"(구간 타이머까지)
+# 값은 워커 프로세스별로 집계됨 (JSON에 pid 포함)
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+METRICS_JSON_LOG = os.environ.get("METRICS_JSON_LOG", "off").strip().lower()
+
+_metrics = {}   # (name, (("label", "value"), ...)) -> {"buckets": [...], "sum": float, "count": int}
+_metrics_lock = threading.Lock()
+
+def log_event(event, **fields):
+    """구조화 로그 1줄 (JSON) — Render 로그에서 검색/집계용."""
+    fields = {"ts": now_kst().isoformat(timespec="milliseconds"), "event": event, "pid": os.getpid(), **fields}
+    print(json.dumps(fields, ensure_ascii=False, default=str), flush=True)
+
+def observe(name, seconds, **labels):
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _metrics_lock:
+        m = _metrics.get(key)
+        if m is None:
+            m = _metrics[key] = {"buckets": [0] * len(METRICS_BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(METRICS_BUCKETS):
+            if seconds <= bound:
+                m["buckets"][i] += 1
+        m["sum"] += seconds
+        m["count"] += 1
+
+@contextmanager
+def timed(name, **labels):
+    """
+    블록 소요 시간을 히스토그램 name에 기록. yield 한 dict의 "seconds"로 경과 시간을 돌려줌.
+        with timed("smtp_send", key=sender_key) as t: ...
+    """
+    result = {"seconds": 0.0}
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - started
+        observe(name, result["seconds"], **labels)
+        if METRICS_JSON_LOG == "all":
+            log_event("timer", name=name, seconds=round(result["seconds"], 4), **labels)
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+def render_prometheus():
+    with _metrics_lock:
+        snapshot = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]} for k, v in _metrics.items()}
+    lines = []
+    for name in sorted({k[0] for k in snapshot}):
+        metric = f"saedam_{name}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for (n, labels), m in sorted(snapshot.items()):
+            if n != name:
+                continue
+            for bound, count in zip(METRICS_BUCKETS, m["buckets"]):
+                lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {m['count']}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {m['sum']:.6f}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {m['count']}")
+    return "\n".join(lines) + "\n"
+
+def metrics_summary():
+    """이름별 합계/건수/평균 — 예: payroll 배치에서 throttle_sleep 대 smtp_send 비율 확인."""
+    with _metrics_lock:
+        items = [(k, v["sum"], v["count"]) for k, v in _metrics.items()]
+    summary = {}
+    for (name, labels), total, count in items:
+        label_str = ",".join(f"{k}={v}" for k, v in labels)
+        summary[f"{name}{{{label_str}}}" if label_str else name] = {
+            "count": count, "sum_sec": round(total, 4), "avg_sec": round(total / count, 4) if count else 0,
+        }
+    return dict(sorted(summary.items()))
+
+@app.before_request
+def _metrics_start_timer():
+    g._metrics_started = time.perf_counter()
+
+@app.after_request
+def _metrics_record_request(response):
+    started = g.pop("_metrics_started", None)
+    if started is not None:
+        seconds = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        observe("http_request", seconds, route=route, method=request.method, status=response.status_code)
+        if METRICS_JSON_LOG in ("requests", "all"):
+            log_event("request", route=route, path=request.path, method=request.method,
+                      status=response.status_code, ms=round(seconds * 1000, 1))
+    return response
+
+# 템플릿 렌더링 시간 (render_template / render_template_string 모두 — Flask 시그널 사용)
+_render_started = threading.local()
+
+@before_render_template.connect_via(app)
+def _metrics_template_start(sender, template, context, **extra):
+    _render_started.t = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def _metrics_template_done(sender, template, context, **extra):
+    started = getattr(_render_started, "t", None)
+    _render_started.t = None
+    # 이름 없는 문자열 템플릿(메일 본문 등)은 호출부에서 이름을 붙여 따로 잼
+    if started is not None and template.name:
+        observe("template_render", time.perf_counter() - started, template=template.name)
+
+@app.get("/metrics")
+def metrics():
+    if request.args.get("format") == "json":
+        return jsonify({"pid": os.getpid(), "summary": metrics_summary(), "init_ms": dict(_initialized),
+                        "mail_queue": mail_queue_stats()})
+    return render_prometheus() + render_mail_queue_gauges(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
-EMAIL_ADDRESS_01 = os.environ.get("EMAIL_ADDRESS_01")
-APP_PASSWORD_01  = os.environ.get("APP_PASSWORD_01")
-EMAIL_ADDRESS_02 = os.environ.get("EMAIL_ADDRESS_02")
-APP_PASSWORD_02  = os.environ.get("APP_PASSWORD_02")
+
+# =============================
+# Profiler (관리자 전용, 요청/작업 단위 프로파일 + 플레임 그래프)
+# =============================
+# 켜는 방법 (관리자 세션 또는 X-Profile-Token 헤더 = PROFILE_TOKEN 필요)
+#   - 요청 헤더 X-Profile: 1  또는  쿼리 ?_profile=1  → cProfile + 스택 샘플링
+#   - PROFILE_SLOW_SEC=N      → 모든 요청을 가볍게 샘플링하다가 N초 넘은 요청만 저장
+#   - PROFILE_JOBS=1          → 급여 발송 배치 / 입금 엑셀 작업 전체를 샘플링해서 저장
+# 저장: BASE_DIR/profiles/<시각>_<이름>_<ms>ms.{json,folded,prof}  (최근 PROFILE_KEEP개 유지)
+# 보기: /profiles (목록) → /profiles/<id> (상위 함수 요약 + 플레임 그래프)
+PROFILE_DIR = os.path.join(BASE_DIR, "profiles")
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_SLOW_SEC = float(os.environ.get("PROFILE_SLOW_SEC", "0") or 0)
+PROFILE_JOBS = os.environ.get("PROFILE_JOBS", "0") == "1"
+PROFILE_INTERVAL_SEC = float(os.environ.get("PROFILE_INTERVAL_SEC", "0.005"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+
+
+class _StackSampler:
+    """
+    등록된 스레드의 스택을 주기적으로 떠서 "a;b;c" → 횟수 로 모음 (flamegraph.pl/speedscope 의 folded 형식).
+    샘플링 스레드 1개가 등록된 모든 요청을 같이 보므로, 상시 켜 두어도 부담이 적음.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}          # thread ident -> {stack: count}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, ident):
+        with self._lock:
+            if ident in self._active:
+                return False       # 이미 바깥(요청)에서 샘플링 중
+            self._active[ident] = {}
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        return True
+
+    def stop(self, ident):
+        with self._lock:
+            return self._active.pop(ident, {})
+
+    def _run(self):
+        import sys
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None    # 쉬는 동안은 스레드도 종료, 다음 start()에서 다시 띄움
+                    return
+                frames = sys._current_frames()
+                for ident, counts in self._active.items():
+                    frame = frames.get(ident)
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    if stack:
+                        key = ";".join(reversed(stack))
+                        counts[key] = counts.get(key, 0) + 1
+
+
+_sampler = _StackSampler(PROFILE_INTERVAL_SEC)
+
+
+def _profiling_allowed():
+    if PROFILE_TOKEN and request.headers.get("X-Profile-Token") == PROFILE_TOKEN:
+        return True
+    return any(session.get(f"{system}_authenticated") for system in ADMIN_PASSWORDS)
+
+
+def save_profile(name, seconds, folded, stats=None, meta=None):
+    """프로파일 1건 저장 후 id 반환. stats는 cProfile.Profile (없으면 샘플링 결과만)."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^0-9A-Za-z_-]+", "_", name).strip("_")[:60] or "root"
+    profile_id = f"{now_kst().strftime('%Y%m%d_%H%M%S_%f')}_{slug}_{int(seconds * 1000)}ms"
+    base = os.path.join(PROFILE_DIR, profile_id)
+
+    top = []
+    if stats is not None:
+        import pstats
+        stats.dump_stats(base + ".prof")
+        ps = pstats.Stats(stats)
+        for (filename, lineno, func), (cc, nc, tt, ct, _callers) in ps.stats.items():
+            top.append({"func": f"{func} ({os.path.basename(filename)}:{lineno})",
+                        "calls": nc, "tottime": round(tt, 4), "cumtime": round(ct, 4)})
+        top.sort(key=lambda r: r["cumtime"], reverse=True)
+        top = top[:60]
+
+    with open(base + ".folded", "w", encoding="utf-8") as f:
+        for stack, count in sorted(folded.items()):
+            f.write(f"{stack} {count}\n")
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump({"id": profile_id, "name": name, "seconds": round(seconds, 3),
+                   "created": now_kst().isoformat(timespec="seconds"),
+                   "samples": sum(folded.values()), "top": top, **(meta or {})}, f, ensure_ascii=False)
+
+    # 오래된 것 정리
+    metas = sorted(fn for fn in os.listdir(PROFILE_DIR) if fn.endswith(".json"))
+    for old in metas[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else []:
+        for ext in (".json", ".folded", ".prof"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, old[:-5] + ext))
+            except FileNotFoundError:
+                pass
+    log_event("profile_saved", id=profile_id, name=name, seconds=round(seconds, 3))
+    return profile_id
+
+
+@contextmanager
+def profile_job(name, **meta):
+    """배치 작업(급여 발송, 입금 엑셀 등) 전체를 샘플링. PROFILE_JOBS=1 일 때만 동작."""
+    ident = threading.get_ident()
+    if not PROFILE_JOBS or not _sampler.start(ident):
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        folded = _sampler.stop(ident)
+        try:
+            save_profile(f"job_{name}", time.perf_counter() - started, folded, meta={"kind": "job", **meta})
+        except Exception as e:
+            print(f"⚠️ 프로파일 저장 실패: {e}")
+
+
+@app.before_request
+def _profile_start():
+    explicit = request.headers.get("X-Profile") == "1" or request.args.get("_profile") == "1"
+    if explicit and not _profiling_allowed():
+        explicit = False
+    if not (explicit or PROFILE_SLOW_SEC > 0) or request.path.startswith("/profiles"):
+        return
+    ident = threading.get_ident()
+    if not _sampler.start(ident):
+        return
+    g._profile = {"ident": ident, "started": time.perf_counter(), "explicit": explicit, "cprofile": None}
+    if explicit:
+        import cProfile
+        g._profile["cprofile"] = cProfile.Profile()
+        g._profile["cprofile"].enable()
+
+def _profile_finish(state, exc=None):
+    elapsed = time.perf_counter() - state["started"]
+    prof = state["cprofile"]
+    if prof is not None:
+        prof.disable()
+    folded = _sampler.stop(state["ident"])
+    if not state["explicit"] and elapsed < PROFILE_SLOW_SEC:
+        return
+    route = request.url_rule.rule if request.url_rule is not None else request.path
+    try:
+        return save_profile(f"{request.method}_{route}", elapsed, folded, stats=prof, meta={
+            "kind": "request" if state["explicit"] else "slow", "path": request.full_path.rstrip("?"),
+            "error": repr(exc) if exc else None,
+        })
+    except Exception as e:
+        print(f"⚠️ 프로파일 저장 실패: {e}")
+
+@app.after_request
+def _profile_after(response):
+    state = g.pop("_profile", None)
+    if state:
+        profile_id = _profile_finish(state)
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
+    return response
+
+@app.teardown_request
+def _profile_teardown(exc):
+    # 처리 중 예외가 나서 after_request 를 못 거친 경우
+    state = g.pop("_profile", None)
+    if state:
+        _profile_finish(state, exc)
+
+
+def _flame_html(folded, min_pct=0.5):
+    """folded 스택을 아이시클(위→아래) 형태의 간단한 HTML 플레임 그래프로."""
+    tree = {"n": 0, "c": {}}
+    for stack, count in folded.items():
+        node = tree
+        node["n"] += count
+        for fn in stack.split(";"):
+            node = node["c"].setdefault(fn, {"n": 0, "c": {}})
+            node["n"] += count
+    total = tree["n"] or 1
+
+    from markupsafe import escape
+    def render(children, depth):
+        out = []
+        for fn, node in sorted(children.items(), key=lambda kv: -kv[1]["n"]):
+            pct = 100.0 * node["n"] / total
+            if pct < min_pct:
+                continue
+            hue = 20 + int(hashlib.md5(fn.encode("utf-8")).hexdigest()[:4], 16) % 40
+            out.append(
+                f'<div class="f" style="flex-basis:{pct:.3f}%">'
+                f'<div class="l" style="background:hsl({hue},85%,{70 - min(depth, 20)}%)" '
+                f'title="{escape(fn)} — {node["n"]} samples ({pct:.1f}%)">{escape(fn)}</div>'
+                f'<div class="r">{render(node["c"], depth + 1)}</div></div>'
+            )
+        return "".join(out)
+    return render(tree["c"], 0)
+
+
+PROFILE_LIST_HTML = """
+<!doctype html><meta charset="utf-8"><title>프로파일 목록</title>
+<style>body{font-family:sans-serif;margin:24px}td,th{padding:4px 10px;border-bottom:1px solid #ddd;text-align:left}</style>
+<h2>프로파일 목록 <small>(최근 {{ keep }}개)</small></h2>
+<table><tr><th>시각</th><th>종류</th><th>이름</th><th>시간(초)</th><th>샘플</th></tr>
+{% for p in profiles %}
+<tr><td>{{ p.created }}</td><td>{{ p.kind }}</td>
+<td><a href="{{ url_for('profile_detail', profile_id=p.id) }}">{{ p.name }}</a></td>
+<td>{{ p.seconds }}</td><td>{{ p.samples }}</td></tr>
+{% else %}<tr><td colspan="5">저장된 프로파일이 없습니다.</td></tr>{% endfor %}
+</table>
+"""
+
+PROFILE_DETAIL_HTML = """
+<!doctype html><meta charset="utf-8"><title>{{ p.name }}</title>
+<style>
+body{font-family:sans-serif;margin:24px} td,th{padding:2px 8px;border-bottom:1px solid #eee;text-align:left;font-size:13px}
+.flame{display:flex;width:100%;font:11px monospace} .f{display:flex;flex-direction:column;min-width:0}
+.l{white-space:nowrap;overflow:hidden;text-overflow:ellipsis;border:1px solid #fff;padding:1px 2px}
+.r{display:flex}
+</style>
+<p><a href="{{ url_for('profile_list') }}">← 목록</a></p>
+<h2>{{ p.name }} — {{ p.seconds }}초</h2>
+<p>{{ p.created }} · {{ p.kind }} · 샘플 {{ p.samples }}개 {% if p.path %}· {{ p.path }}{% endif %}
+{% if p.error %}· 오류: {{ p.error }}{% endif %}</p>
+<p>다운로드:
+<a href="{{ url_for('profile_download', profile_id=p.id, kind='folded') }}">folded</a>
+{% if has_prof %}· <a href="{{ url_for('profile_download', profile_id=p.id, kind='prof') }}">cProfile(.prof)</a>{% endif %}</p>
+<h3>플레임 그래프 (샘플링)</h3>
+<div class="flame">{{ flame|safe }}</div>
+{% if p.top %}
+<h3>누적 시간 상위 함수 (cProfile)</h3>
+<table><tr><th>함수</th><th>호출</th><th>자체(초)</th><th>누적(초)</th></tr>
+{% for r in p.top %}<tr><td>{{ r.func }}</td><td>{{ r.calls }}</td><td>{{ r.tottime }}</td><td>{{ r.cumtime }}</td></tr>{% endfor %}
+</table>
+{% endif %}
+"""
+
+def _profile_path(profile_id, ext):
+    if not re.fullmatch(r"[0-9A-Za-z_-]+", profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + ext)
+    return path if os.path.exists(path) else None
+
+@app.get("/profiles")
+def profile_list():
+    if not _profiling_allowed():
+        return "관리자 로그인이 필요합니다.", 403
+    profiles = []
+    if os.path.isdir(PROFILE_DIR):
+        for fn in sorted(os.listdir(PROFILE_DIR), reverse=True):
+            if fn.endswith(".json"):
+                with open(os.path.join(PROFILE_DIR, fn), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+    return render_template_string(PROFILE_LIST_HTML, profiles=profiles, keep=PROFILE_KEEP)
+
+@app.get("/profiles/<profile_id>")
+def profile_detail(profile_id):
+    if not _profiling_allowed():
+        return "관리자 로그인이 필요합니다.", 403
+    meta_path = _profile_path(profile_id, ".json")
+    if not meta_path:
+        return "프로파일이 없습니다.", 404
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    folded = {}
+    with open(_profile_path(profile_id, ".folded") or os.devnull, encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                folded[stack] = int(count)
+    return render_template_string(PROFILE_DETAIL_HTML, p=meta, flame=_flame_html(folded),
+                                  has_prof=_profile_path(profile_id, ".prof") is not None)
+
+@app.get("/profiles/<profile_id>/<kind>")
+def profile_download(profile_id, kind):
+    if not _profiling_allowed():
+        return "관리자 로그인이 필요합니다.", 403
+    path = _profile_path(profile_id, "." + kind) if kind in ("folded", "prof") else None
+    if not path:
+        return "프로파일이 없습니다.", 404
+    return send_from_directory(PROFILE_DIR, os.path.basename(path), as_attachment=True)
+
+
+# =============================
+# Email Credentials (ENV first — tenants.json 의 {"env": ...} 값)
+# =============================
 
 def _system_email_login_params(system: str):
-    # system은 "system01" 또는 "system02"
-    if str(system).endswith("01"):
-        return (EMAIL_ADDRESS_01 or os.environ.get("EMAIL_ADDRESS"),
-                APP_PASSWORD_01  or os.environ.get("APP_PASSWORD"))
-    else:  # system02 기본
-        return (EMAIL_ADDRESS_02 or os.environ.get("EMAIL_ADDRESS"),
-                APP_PASSWORD_02  or os.environ.get("APP_PASSWORD"))
+    conf = CERT_SYSTEMS[system]
+    return conf["email"], conf["app_pw"]
 
 
 # ===== 저장용: 구글메일주소와 앱비밀번호는 렌더서버 환경셋팅에 셋팅함. 아래를 써도 됨.
@@ -98,6 +631,465 @@ def _system_email_login_params(system: str):
 # ========================================================
 
 
+# =============================
+# Mail Transport (발송 경로 선택: Gmail / SMTP 릴레이 / 로컬 스풀 / 메모리)
+# =============================
+# 설정값(URL 형식) — 키별 MAIL_TRANSPORT_<KEY> > 공통 MAIL_TRANSPORT > "gmail"
+#   gmail                          : smtp.gmail.com:465 SSL + 계정 로그인 (기존 동작)
+#   smtp://host:port               : 일반 SMTP 릴레이 (로컬 릴레이/테스트용 SMTP 서버), ?starttls=1 지원
+#   smtp://user:pw@host:port       : 릴레이 자체 인증 사용
+#   smtps://host:port              : SSL 릴레이 + 계정 로그인
+#   spool:///절대경로 | spool:상대경로 : Maildir(tmp/new)에 .eml 파일로 저장 (실제 발송 없음)
+#   memory                         : 메모리 보관함(MEMORY_OUTBOX)에만 쌓음 (CI/부하 테스트)
+# 예) MAIL_TRANSPORT=smtp://127.0.0.1:1025, MAIL_TRANSPORT_SEND02=spool:spool/send02
+from collections import deque
+from urllib.parse import urlsplit, parse_qs, unquote, urlencode
+
+SMTP_TIMEOUT_SEC = float(os.environ.get("SMTP_TIMEOUT_SEC", "60"))
+
+# memory 트랜스포트 보관함: (key, from, to, bytes) — 오래된 것부터 버림
+MEMORY_OUTBOX = deque(maxlen=int(os.environ.get("MEMORY_OUTBOX_MAX", "10000")))
+_memory_outbox_lock = threading.Lock()
+
+def mail_transport_url(key):
+    # key: "send01" | "send02" | "system01" | "system02"
+    return (os.environ.get(f"MAIL_TRANSPORT_{str(key).upper()}")
+            or tenant_conf(key).get("mail_transport")
+            or os.environ.get("MAIL_TRANSPORT")
+            or "gmail").strip()
+
+def _transport_smtp(url, msg, from_addr, password, use_ssl):
+    import smtplib
+
+    parts = urlsplit(url)
+    host = parts.hostname or "127.0.0.1"
+    port = parts.port or (465 if use_ssl else 25)
+    opts = parse_qs(parts.query)
+    cls = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
+    with timed("smtp_connect", host=host):
+        smtp = cls(host, port, timeout=SMTP_TIMEOUT_SEC)
+    with smtp:
+        if not use_ssl and opts.get("starttls", ["0"])[0] in ("1", "true"):
+            smtp.starttls()
+        if parts.username or (use_ssl and from_addr and password):
+            with timed("smtp_login", host=host):
+                if parts.username:
+                    smtp.login(unquote(parts.username), unquote(parts.password or ""))
+                else:
+                    smtp.login(from_addr, password)
+        with timed("smtp_send", host=host):
+            smtp.send_message(msg)
+
+def _transport_spool(url, msg):
+    # spool:///abs/path -> path, spool:rel/path -> BASE_DIR/rel/path
+    raw = url[len("spool:"):]
+    path = raw[2:] if raw.startswith("//") else os.path.join(BASE_DIR, raw or "mail_spool")
+    for sub in ("tmp", "new"):
+        os.makedirs(os.path.join(path, sub), exist_ok=True)
+    # Maildir 규칙: tmp에 다 쓴 뒤 new로 rename (읽는 쪽이 반쯤 쓴 파일을 보지 않음)
+    fname = f"{now_kst().strftime('%Y%m%d%H%M%S')}.{uuid.uuid4().hex}.eml"
+    tmp_path = os.path.join(path, "tmp", fname)
+    with open(tmp_path, "wb") as f:
+        f.write(msg.as_bytes())
+    os.replace(tmp_path, os.path.join(path, "new", fname))
+
+def send_mail(key, msg, from_addr, password, priority=None):
+    """
+    설정된 트랜스포트로 메일 1통 발송. 실패 시 예외를 그대로 올림(호출부의 기존 처리 유지).
+    priority: "certificate" | "admin" | "bulk" (없으면 key로 결정) — 계정 게이트에서 순서를 받은 뒤 발송.
+    """
+    with mail_slot(from_addr or key, priority or mail_priority(key), key):
+        _send_mail_now(key, msg, from_addr, password)
+
+def _send_mail_now(key, msg, from_addr, password):
+    # 게이트 없이 바로 발송 (게이트 자리를 이미 받은 async 워커용)
+    url = mail_transport_url(key)
+    scheme = url.split(":", 1)[0].lower()
+
+    if scheme == "gmail":
+        # smtp.gmail.com:465 SSL + 계정 로그인 = smtps 릴레이와 같은 경로
+        _transport_smtp("smtps://smtp.gmail.com:465", msg, from_addr, password, use_ssl=True)
+    elif scheme in ("smtp", "smtps"):
+        _transport_smtp(url, msg, from_addr, password, use_ssl=(scheme == "smtps"))
+    elif scheme == "spool":
+        _transport_spool(url, msg)
+    elif scheme == "memory":
+        with _memory_outbox_lock:
+            MEMORY_OUTBOX.append((key, from_addr, msg["To"], msg.as_bytes()))
+    else:
+        raise ValueError(f"알 수 없는 메일 트랜스포트: {url}")
+    record_mail_usage(from_addr)
+
+
+# =============================
+# Async Delivery Engine (asyncio 동시 발송)
+# =============================
+# DELIVERY_ENGINE(_<KEY>) = "sync"(기존: 1통씩 연결/로그인/발송) | "async"
+# async: 계정당 최대 ASYNC_SMTP_CONNECTIONS개의 연결을 유지하며 큐의 메일을 동시에 처리.
+#        aiosmtplib가 없으면 같은 동시성으로 send_mail을 스레드에서 실행.
+aiosmtplib = _LazyModule("aiosmtplib", optional=True)
+
+ASYNC_SMTP_CONNECTIONS = int(os.environ.get("ASYNC_SMTP_CONNECTIONS", "3"))
+
+def async_pacing(key):
+    """
+    async 엔진 속도 제어 — 연결 수와 관계없이 계정 전체 기준.
+    ASYNC_SEND_INTERVAL_SEC: 다음 메일까지 최소 간격(초). gmail 트랜스포트는 sync 엔진과 같은
+    SEND_DELAY_SEC(+SEND_JITTER_SEC)/COOLDOWN_EVERY/COOLDOWN_SEC 가 기본이고 0으로 끌 수 없음
+    (엔진만 바꿨다고 Gmail 속도 제한이 사라지지 않도록). 간격 0은 릴레이/spool/memory 에서만.
+    """
+    gmail = mail_transport_url(key).split(":", 1)[0].lower() == "gmail"
+    interval = os.environ.get("ASYNC_SEND_INTERVAL_SEC", "").strip()
+    if not gmail:
+        return {"interval": float(interval or 0), "jitter": 0.0, "cooldown_every": 0, "cooldown_sec": 0.0}
+    delay = float(os.environ.get("SEND_DELAY_SEC", "4.0"))
+    interval = float(interval) if interval else delay
+    if interval <= 0:
+        print(f"⚠️ [{key}] gmail 트랜스포트는 발송 간격 0을 쓸 수 없어 기본 간격 사용")
+        interval = delay if delay > 0 else 4.0
+    return {
+        "interval": interval,
+        "jitter": max(0.0, float(os.environ.get("SEND_JITTER_SEC", "3"))),
+        "cooldown_every": int(os.environ.get("COOLDOWN_EVERY", "25")),
+        "cooldown_sec": float(os.environ.get("COOLDOWN_SEC", "65")),
+    }
+
+def delivery_engine(key):
+    return (os.environ.get(f"DELIVERY_ENGINE_{str(key).upper()}")
+            or tenant_conf(key).get("delivery_engine")
+            or os.environ.get("DELIVERY_ENGINE")
+            or "sync").strip().lower()
+
+async def _async_smtp_connect(url, from_addr, password):
+    """트랜스포트 URL -> 로그인까지 끝난 aiosmtplib 연결 (gmail/smtp/smtps만 해당)."""
+    scheme = url.split(":", 1)[0].lower()
+    if scheme == "gmail":
+        host, port, use_tls, start_tls = "smtp.gmail.com", 465, True, False
+        username, pw = from_addr, password
+    else:
+        parts = urlsplit(url)
+        use_tls = scheme == "smtps"
+        host = parts.hostname or "127.0.0.1"
+        port = parts.port or (465 if use_tls else 25)
+        start_tls = (not use_tls) and parse_qs(parts.query).get("starttls", ["0"])[0] in ("1", "true")
+        if parts.username:
+            username, pw = unquote(parts.username), unquote(parts.password or "")
+        elif use_tls and from_addr and password:
+            username, pw = from_addr, password
+        else:
+            username = pw = None
+
+    smtp = aiosmtplib.SMTP(hostname=host, port=port, use_tls=use_tls,
+                           start_tls=start_tls, timeout=SMTP_TIMEOUT_SEC)
+    with timed("smtp_connect", host=host, engine="async"):
+        await smtp.connect()
+    if username:
+        with timed("smtp_login", host=host, engine="async"):
+            await smtp.login(username, pw)
+    return smtp
+
+async def _deliver_all(key, jobs, stop_check, on_result, connections, priority):
+    import asyncio
+
+    url = mail_transport_url(key)
+    scheme = url.split(":", 1)[0].lower()
+    use_aiosmtp = bool(aiosmtplib) and scheme in ("gmail", "smtp", "smtps")
+
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    account = jobs[0]["from_addr"] or key
+
+    import random
+
+    pacing = async_pacing(key)
+    pace = {"next_at": 0.0, "sent": 0}
+    pace_lock = asyncio.Lock()
+
+    async def wait_turn():
+        # 워커마다 다음 발송 시각을 하나씩 받아 감 (계정 전체 간격 + 지터 + N통마다 쿨다운)
+        if pacing["interval"] <= 0 and pacing["cooldown_every"] <= 0:
+            return
+        async with pace_lock:
+            now = time.monotonic()
+            wait = pace["next_at"] - now
+            gap = pacing["interval"] + random.random() * pacing["jitter"]
+            pace["sent"] += 1
+            if pacing["cooldown_every"] > 0 and pace["sent"] % pacing["cooldown_every"] == 0:
+                gap += pacing["cooldown_sec"]
+            pace["next_at"] = max(now, pace["next_at"]) + gap
+        if wait > 0:
+            with timed("throttle_sleep", key=key, kind="async"):
+                await asyncio.sleep(wait)
+
+    async def worker():
+        smtp = None
+        try:
+            while not queue.empty():
+                await wait_turn()
+                # SQLite를 읽고 쓰는 콜백(중단 확인, 발송량, 결과 기록)은 스레드에서 — 이벤트 루프를 막으면
+                # 다른 연결의 발송까지 같이 멈춤
+                if stop_check and await asyncio.to_thread(stop_check):
+                    return
+                try:
+                    job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                # 메일 1통마다 mail_slot과 같은 절차로 자리를 받음 → 급한 메일이 대량 발송 사이에 끼어들 수 있고
+                # bulk는 다른 워커 프로세스의 급한 메일에도 양보
+                await asyncio.to_thread(_mail_slot_acquire, account, priority, key)
+                try:
+                    if use_aiosmtp:
+                        if smtp is None:
+                            smtp = await _async_smtp_connect(url, job["from_addr"], job["password"])
+                        with timed("smtp_send", host=smtp.hostname, engine="async"):
+                            await smtp.send_message(job["msg"])
+                        await asyncio.to_thread(record_mail_usage, job["from_addr"])
+                    else:
+                        await asyncio.to_thread(_send_mail_now, key, job["msg"], job["from_addr"], job["password"])
+                    error = None
+                except Exception as e:
+                    # 연결이 끊겼을 수 있으니 버리고 다음 메일에서 새로 연결
+                    if smtp is not None:
+                        smtp.close()
+                        smtp = None
+                    error = e
+                finally:
+                    await asyncio.to_thread(_mail_slot_release, account, priority)
+                await asyncio.to_thread(on_result, job, error)
+        finally:
+            if smtp is not None:
+                try:
+                    await smtp.quit()
+                except Exception:
+                    smtp.close()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, connections))))
+
+def deliver_batch(key, jobs, stop_check=None, on_result=None, connections=None, priority=None):
+    """
+    jobs: [{"msg", "from_addr", "password", ...}] 를 asyncio로 동시 발송 (같은 계정 기준).
+    stop_check(): True면 남은 메일은 보내지 않음 (payroll의 stop_requested 연동).
+    on_result(job, error): 메일마다 완료 시 호출 (성공이면 error=None). 이벤트 루프 밖 스레드에서 불림.
+    반환: (성공 수, 실패 수)
+    """
+    if not jobs:
+        return 0, 0
+    counts = {"ok": 0, "fail": 0}
+    lock = threading.Lock()
+
+    def _on_result(job, error):
+        with lock:
+            counts["fail" if error else "ok"] += 1
+        if on_result:
+            on_result(job, error)
+
+    import asyncio
+
+    connections = min(len(jobs), connections or tenant_conf(key).get("connections") or ASYNC_SMTP_CONNECTIONS)
+    asyncio.run(_deliver_all(key, list(jobs), stop_check, _on_result, connections,
+                             priority or mail_priority(key)))
+    return counts["ok"], counts["fail"]
+
+def deliver_mail(key, msg, from_addr, password, priority=None):
+    """단건 메일(증명서/관리자 알림) — 설정된 엔진으로 발송, 실패 시 예외."""
+    if delivery_engine(key) != "async":
+        return send_mail(key, msg, from_addr, password, priority=priority)
+    errors = []
+    deliver_batch(key, [{"msg": msg, "from_addr": from_addr, "password": password}],
+                  on_result=lambda job, error: error and errors.append(error), priority=priority)
+    if errors:
+        raise errors[0]
+
+
+# =============================
+# Mail Priority Scheduler (계정별 발송 순서: 증명서 > 관리자 알림 > 대량 발송)
+# =============================
+# send01/send02가 같은 EMAIL_ADDRESS로 폴백하면 급여명세서 대량 발송, 증명서, 관리자 알림이 Gmail 계정
+# 하나를 나눠 씀. 모든 발송(sync/async)은 메일 1통마다 계정 게이트에서 자리를 받은 뒤 나감.
+#   우선순위 : certificate > admin > bulk (대기 중인 것 중 높은 등급부터)
+#   MAIL_ACCOUNT_CONCURRENCY : 계정당 동시에 나가는 메일 수 (기본 ASYNC_SMTP_CONNECTIONS + 1)
+#   MAIL_URGENT_RESERVE      : bulk가 비워 두는 자리 수 (기본 1) → 대량 발송 중에도 급한 메일은 바로 나감
+#   같은 계정의 bulk 끼리는 담당자(send01/send02) 간에 번갈아 자리를 줌 (공정 분배)
+#   다른 워커 프로세스에서 급한 메일이 나가는 중이면 bulk는 다음 메일 전에 양보 (최대 MAIL_YIELD_MAX_SEC)
+#   MAIL_MULTI_WORKER        : 워커 간 양보 사용 여부 "1"/"0" (기본: WEB_CONCURRENCY > 1 또는 gunicorn 실행이면 켬)
+#                              꺼져 있으면 SQLite를 전혀 거치지 않고 프로세스 안 게이트만 씀
+# 등급별 대기 수/발송 중/대기 시간: /mail/queue (JSON), /metrics (saedam_mail_queue_*)
+MAIL_PRIORITIES = {"certificate": 0, "admin": 1, "bulk": 2}
+MAIL_ACCOUNT_CONCURRENCY = int(os.environ.get("MAIL_ACCOUNT_CONCURRENCY", str(ASYNC_SMTP_CONNECTIONS + 1)))
+MAIL_URGENT_RESERVE = int(os.environ.get("MAIL_URGENT_RESERVE", "1"))
+MAIL_YIELD_MAX_SEC = float(os.environ.get("MAIL_YIELD_MAX_SEC", "60"))
+
+def _detect_multi_worker():
+    import sys
+    flag = os.environ.get("MAIL_MULTI_WORKER", "").strip()
+    if flag in ("0", "1"):
+        return flag == "1"
+    try:
+        workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    except ValueError:
+        workers = 1
+    return workers > 1 or "gunicorn" in (sys.argv[0] if sys.argv else "")
+
+MAIL_MULTI_WORKER = _detect_multi_worker()
+
+def mail_priority(key):
+    # 급여명세서 담당자 키는 대량 발송, 증명서 시스템 키는 증명서 (관리자 알림은 호출부에서 "admin")
+    return "bulk" if key in PAYROLL_OPERATORS else "certificate"
+
+class MailGate:
+    """계정(보내는 주소) 1개의 발송 순서표."""
+
+    def __init__(self, account, capacity):
+        self.account = account
+        self.capacity = max(1, capacity)
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._waiting = []        # 대기표 [(등급 순위, 순번, 담당자 key, 등급)]
+        self._last_grant = {}     # 담당자 key -> 마지막으로 자리 받은 시각 (bulk 공정 분배)
+        self.in_flight = {cls: 0 for cls in MAIL_PRIORITIES}
+        self.stats = {cls: {"granted": 0, "wait_sum": 0.0, "wait_max": 0.0} for cls in MAIL_PRIORITIES}
+
+    def _eligible(self):
+        """지금 자리를 받을 대기표 (없으면 None)."""
+        if not self._waiting or sum(self.in_flight.values()) >= self.capacity:
+            return None
+        ticket = min(self._waiting, key=lambda t: (
+            t[0], self._last_grant.get(t[2], 0.0) if t[3] == "bulk" else 0.0, t[1]))
+        if ticket[3] == "bulk" and self.in_flight["bulk"] >= max(1, self.capacity - MAIL_URGENT_RESERVE):
+            return None
+        return ticket
+
+    def acquire(self, cls, owner):
+        started = time.perf_counter()
+        with self._cond:
+            self._seq += 1
+            ticket = (MAIL_PRIORITIES[cls], self._seq, owner, cls)
+            self._waiting.append(ticket)
+            while self._eligible() is not ticket:
+                self._cond.wait()
+            self._waiting.remove(ticket)
+            self.in_flight[cls] += 1
+            self._last_grant[owner] = time.monotonic()
+            waited = time.perf_counter() - started
+            st = self.stats[cls]
+            st["granted"] += 1
+            st["wait_sum"] += waited
+            st["wait_max"] = max(st["wait_max"], waited)
+            # 자리가 남았으면 다음 대기표도 깨움
+            self._cond.notify_all()
+        observe("mail_queue_wait", waited, cls=cls, key=owner)
+        return waited
+
+    def release(self, cls):
+        with self._cond:
+            self.in_flight[cls] -= 1
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            waiting = {cls: sum(1 for t in self._waiting if t[3] == cls) for cls in MAIL_PRIORITIES}
+            return {
+                "capacity": self.capacity,
+                "classes": {cls: {
+                    "waiting": waiting[cls],
+                    "in_flight": self.in_flight[cls],
+                    "granted": st["granted"],
+                    "avg_wait_ms": round(1000 * st["wait_sum"] / st["granted"], 1) if st["granted"] else 0,
+                    "max_wait_ms": round(1000 * st["wait_max"], 1),
+                } for cls, st in self.stats.items()},
+            }
+
+_mail_gates = {}
+_mail_gates_lock = threading.Lock()
+
+def mail_gate(account):
+    with _mail_gates_lock:
+        if account not in _mail_gates:
+            _mail_gates[account] = MailGate(account, MAIL_ACCOUNT_CONCURRENCY)
+        return _mail_gates[account]
+
+# 급한 메일 수는 프로세스별 행(mailq:<account>:<pid>)에 둠 — 자기 프로세스 것은 게이트가 이미 순서를 정하므로
+# bulk는 다른 프로세스 행만 보고 양보함
+def _urgent_state_key(account, pid=None):
+    return f"mailq:{account}:{pid or os.getpid()}"
+
+def _publish_urgent(account, delta):
+    # 카운터 증감 + 시각 갱신을 한 번의 쓰기로 (오래된 행은 urgent_ts로 무시 — 죽은 워커 대비)
+    key = _urgent_state_key(account)
+    with _runtime_db(write=True) as conn:
+        conn.execute(
+            "INSERT INTO runtime_state(key, field, value) VALUES (?, 'urgent', ?) "
+            "ON CONFLICT(key, field) DO UPDATE SET value=COALESCE(value, 0) + excluded.value", (key, delta))
+        conn.execute(
+            "INSERT INTO runtime_state(key, field, value) VALUES (?, 'urgent_ts', ?) "
+            "ON CONFLICT(key, field) DO UPDATE SET value=excluded.value", (key, time.time()))
+
+def _urgent_elsewhere(account):
+    """다른 워커 프로세스에서 나가는 중인 급한 메일 수."""
+    prefix = f"mailq:{account}:"
+    with _runtime_db() as conn:
+        row = conn.execute(
+            "SELECT SUM(u.value) FROM runtime_state u JOIN runtime_state t ON t.key = u.key AND t.field = 'urgent_ts' "
+            "WHERE u.field = 'urgent' AND substr(u.key, 1, ?) = ? AND u.key != ? AND t.value > ?",
+            (len(prefix), prefix, _urgent_state_key(account), time.time() - MAIL_YIELD_MAX_SEC)).fetchone()
+    return max(0, row[0] or 0)
+
+def _mail_slot_acquire(account, cls, owner):
+    # mail_slot 진입부 — async 엔진은 워커마다 스레드에서 이걸 부르고 끝나면 _mail_slot_release
+    if not MAIL_MULTI_WORKER:
+        mail_gate(account).acquire(cls, owner)
+        return
+    if cls == "bulk":
+        # 다른 워커의 급한 메일에 양보 — 같은 프로세스 안은 게이트가 순서를 정함
+        deadline = time.monotonic() + MAIL_YIELD_MAX_SEC
+        with timed("mail_yield", key=owner):
+            while time.monotonic() < deadline and _urgent_elsewhere(account):
+                time.sleep(0.5)
+    else:
+        _publish_urgent(account, 1)
+    try:
+        mail_gate(account).acquire(cls, owner)
+    except BaseException:
+        if cls != "bulk":
+            _publish_urgent(account, -1)
+        raise
+
+def _mail_slot_release(account, cls):
+    mail_gate(account).release(cls)
+    if MAIL_MULTI_WORKER and cls != "bulk":
+        _publish_urgent(account, -1)
+
+@contextmanager
+def mail_slot(account, cls, owner):
+    """계정 게이트 자리 1개 (메일 1통 동안)."""
+    _mail_slot_acquire(account, cls, owner)
+    try:
+        yield
+    finally:
+        _mail_slot_release(account, cls)
+
+def mail_queue_stats():
+    with _mail_gates_lock:
+        gates = list(_mail_gates.values())
+    return {gate.account: gate.snapshot() for gate in gates}
+
+def render_mail_queue_gauges():
+    lines = ["# TYPE saedam_mail_queue_depth gauge", "# TYPE saedam_mail_queue_in_flight gauge"]
+    for account, snap in sorted(mail_queue_stats().items()):
+        for cls, st in snap["classes"].items():
+            labels = _format_labels([("account", account), ("cls", cls)])
+            lines.append(f"saedam_mail_queue_depth{labels} {st['waiting']}")
+            lines.append(f"saedam_mail_queue_in_flight{labels} {st['in_flight']}")
+    return "\n".join(lines) + "\n"
+
+@app.get("/mail/queue")
+def mail_queue():
+    return jsonify({"pid": os.getpid(), "concurrency": MAIL_ACCOUNT_CONCURRENCY,
+                    "urgent_reserve": MAIL_URGENT_RESERVE, "accounts": mail_queue_stats()})
+
+
 
 
 # =========================================================
@@ -107,58 +1099,211 @@ def _system_email_login_params(system: str):
 # ===== Part A config =====
 UPLOAD_FOLDER_BASE = os.path.join(BASE_DIR, "uploads")
 
-SENDER_KEYS = ("send01", "send02")
-
-def _get_env(key, fallback=None):
-    return os.environ.get(key) or fallback
-
-SENDER_CONF = {
-    "send01": {
-        "upload_dir": os.path.join(UPLOAD_FOLDER_BASE, "send01"),  # <-- 문자열 경로
-        "template_base": "send01",                                  # templates/send01/
-        "email": _get_env("EMAIL_ADDRESS_01", _get_env("EMAIL_ADDRESS")),
-        "app_pw": _get_env("APP_PASSWORD_01",  _get_env("APP_PASSWORD")),
-    },
-    "send02": {
-        "upload_dir": os.path.join(UPLOAD_FOLDER_BASE, "send02"),  # <-- 문자열 경로
-        "template_base": "send02",                                  # templates/send02/
-        "email": _get_env("EMAIL_ADDRESS_02", _get_env("EMAIL_ADDRESS")),
-        "app_pw": _get_env("APP_PASSWORD_02",  _get_env("APP_PASSWORD")),
-    },
-}
+# 담당자 목록/설정은 tenants.json 의 payroll_operators (upload_dir, template_base, email, app_pw, image_mode ...)
+SENDER_KEYS = tuple(PAYROLL_OPERATORS)
+SENDER_CONF = PAYROLL_OPERATORS
+
+def operator_route(rule, **options):
+    """담당자마다 /<key><rule> 라우트 등록 — 뷰에서는 request.path 첫 구간이 담당자 key."""
+    def decorator(f):
+        for key in SENDER_KEYS:
+            app.add_url_rule(f"/{key}{rule}", view_func=f, **options)
+        return f
+    return decorator
 
-# 디렉터리 생성
-for key in SENDER_KEYS:
-    os.makedirs(SENDER_CONF[key]["upload_dir"], exist_ok=True)
 # ===== end =====
 
 
-# ---- operator-scoped runtime states ----
-runtime = {
-    "send01": {
-        "sent_count": 0,
-        "sent_names": [],
-        "sent_count_lock": threading.Lock(),
-        "stop_requested": False,
-        "stop_lock": threading.Lock(),
-    },
-    "send02": {
-        "sent_count": 0,
-        "sent_names": [],
-        "sent_count_lock": threading.Lock(),
-        "stop_requested": False,
-        "stop_lock": threading.Lock(),
-    },
+# ---- operator-scoped runtime states (워커 간 공유: SQLite) ----
+# gunicorn 워커가 여러 개여도 /sendXX/status, /sendXX/stop 이 어느 워커에 가든
+# 같은 상태를 보도록 발송 진행 상황/중단 플래그/발송일을 파일 DB에 둠.
+#   runtime_state(key, field, value) : sent_count, stop_requested, send_date_iso ...
+#   runtime_names(id, key, entry)    : 발송 진행 목록(sent_names), 입력 순서 = id 순서
+import sqlite3
+
+RUNTIME_DB = os.path.join(BASE_DIR, "runtime_state.db")
+
+@contextmanager
+def _runtime_db(write=False):
+    # 호출마다 새 연결 (sqlite 연결은 가벼움). autocommit, write=True면 BEGIN IMMEDIATE 트랜잭션
+    if not _runtime_db_ready:
+        _init_runtime_db()
+    conn = sqlite3.connect(RUNTIME_DB, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        if not write:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+_runtime_db_ready = False
+
+def _init_runtime_db():
+    # 첫 사용 시 1회 테이블 생성
+    global _runtime_db_ready
+    conn = sqlite3.connect(RUNTIME_DB, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS runtime_state (
+            key TEXT NOT NULL, field TEXT NOT NULL, value,
+            PRIMARY KEY (key, field))""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS runtime_names (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, entry TEXT NOT NULL)""")
+        # 계정(보내는 주소)별 하루 발송 수 — 급여명세서/증명서/관리자 알림 모두 합산 (KST 날짜)
+        conn.execute("""CREATE TABLE IF NOT EXISTS mail_usage (
+            account TEXT NOT NULL, day TEXT NOT NULL, count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (account, day))""")
+        # 예약 발송: 작업(업로드 1건) / 묶음(하루·시간대별로 나눈 수신자 범위)
+        conn.execute("""CREATE TABLE IF NOT EXISTS dispatch_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, file TEXT NOT NULL,
+            filename TEXT, send_date TEXT NOT NULL, image_mode TEXT, public_base_url TEXT,
+            total INTEGER NOT NULL, created TEXT NOT NULL, status TEXT NOT NULL)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS dispatch_chunks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, job_id INTEGER NOT NULL, key TEXT NOT NULL,
+            account TEXT NOT NULL, day TEXT NOT NULL, run_at TEXT NOT NULL,
+            start INTEGER NOT NULL, stop INTEGER NOT NULL, status TEXT NOT NULL,
+            sent INTEGER NOT NULL DEFAULT 0, started_at TEXT, finished_at TEXT)""")
+        # 급여명세서 발송 기록: 배치(업로드 1건 또는 예약 작업 1건) / 수신자별 결과
+        conn.execute("""CREATE TABLE IF NOT EXISTS send_reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, filename TEXT,
+            dispatch_job INTEGER, send_date TEXT, image_mode TEXT,
+            started TEXT NOT NULL, finished TEXT, status TEXT NOT NULL,
+            sent INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0, invalid INTEGER NOT NULL DEFAULT 0,
+            bytes_sent INTEGER NOT NULL DEFAULT 0, bytes_cid INTEGER NOT NULL DEFAULT 0,
+            bytes_hosted INTEGER NOT NULL DEFAULT 0)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS send_report_rows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, report_id INTEGER NOT NULL, sheet TEXT,
+            name TEXT, email TEXT, job TEXT, status TEXT NOT NULL, error TEXT, ts TEXT NOT NULL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS send_report_rows_report ON send_report_rows(report_id, status)")
+    finally:
+        conn.close()
+    _runtime_db_ready = True
+
+def runtime_get(key, field, default=None):
+    with _runtime_db() as conn:
+        row = conn.execute("SELECT value FROM runtime_state WHERE key=? AND field=?", (key, field)).fetchone()
+    return default if row is None or row[0] is None else row[0]
+
+def runtime_set(key, **fields):
+    with _runtime_db() as conn:
+        conn.executemany(
+            "INSERT INTO runtime_state(key, field, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(key, field) DO UPDATE SET value=excluded.value",
+            [(key, f, v) for f, v in fields.items()])
+
+def runtime_add(key, entry=None, **increments):
+    """진행 목록 1줄 추가 + 카운터 증가를 한 트랜잭션으로 (워커/스레드 간 원자적)."""
+    with _runtime_db(write=True) as conn:
+        if entry is not None:
+            conn.execute("INSERT INTO runtime_names(key, entry) VALUES (?, ?)", (key, entry))
+        for field, n in increments.items():
+            conn.execute(
+                "INSERT INTO runtime_state(key, field, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(key, field) DO UPDATE SET value=COALESCE(value, 0) + excluded.value",
+                (key, field, n))
+
+def runtime_names(key):
+    with _runtime_db() as conn:
+        return [r[0] for r in conn.execute("SELECT entry FROM runtime_names WHERE key=? ORDER BY id", (key,))]
+
+def runtime_reset(key):
+    """새 배치 시작: 카운터와 진행 목록 초기화."""
+    with _runtime_db(write=True) as conn:
+        conn.execute("DELETE FROM runtime_names WHERE key=?", (key,))
+        conn.executemany(
+            "INSERT INTO runtime_state(key, field, value) VALUES (?, ?, 0) "
+            "ON CONFLICT(key, field) DO UPDATE SET value=0",
+            [(key, f) for f in ("sent_count", "bytes_sent", "bytes_cid", "bytes_hosted")])
+
+def record_mail_usage(account, n=1):
+    if not account:
+        return
+    try:
+        with _runtime_db(write=True) as conn:
+            conn.execute(
+                "INSERT INTO mail_usage(account, day, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(account, day) DO UPDATE SET count=count + excluded.count",
+                (account, now_kst().strftime('%Y-%m-%d'), n))
+    except Exception as e:
+        # 집계 실패로 이미 나간 메일을 실패 처리하지 않음
+        print(f"⚠️ 발송량 기록 실패({account}): {e}")
+
+def mail_usage(account, day):
+    with _runtime_db() as conn:
+        row = conn.execute("SELECT count FROM mail_usage WHERE account=? AND day=?", (account, day)).fetchone()
+    return row[0] if row else 0
+
+def is_stop_requested(key):
+    return bool(runtime_get(key, "stop_requested", 0))
+
+def set_stop_requested(key, flag):
+    runtime_set(key, stop_requested=1 if flag else 0)
+
+# ---- 이미지 최적화 (리사이즈 + 재압축 + 메타데이터 제거) ----
+# 메일 본문 표시 폭(광고 200px, 로고 100~112px)의 2배(레티나)까지만 유지
+IMAGE_MAX_WIDTH = {
+    "logo01.jpg": 240,
+    "ad1.jpg": 400,
+    "ad2.jpg": 400,
+    "ad3.jpg": 400,
 }
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "82"))
+_IMAGE_META_KEYS = ("exif", "icc_profile", "photoshop", "xmp", "comment")
 
-# 이미지 캐시: 공용 + send01 + send02 모두 로드====
+def optimize_jpeg_bytes(data, max_width):
+    """
+    JPEG 바이트를 표시 크기로 줄이고 메타데이터를 제거해 재압축.
+    이미 규격 안(폭 이하 + 메타데이터 없음)이면 재압축 손실을 피하려고 그대로 반환.
+    Pillow가 없거나 결과가 더 크면 원본 반환.
+    """
+    if not Image or not data:
+        return data
+    try:
+        im = Image.open(io.BytesIO(data))
+        needs_resize = im.width > max_width
+        has_meta = any(k in im.info for k in _IMAGE_META_KEYS)
+        if im.format == "JPEG" and not needs_resize and not has_meta:
+            return data
+
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        if needs_resize:
+            height = round(im.height * max_width / im.width)
+            im = im.resize((max_width, height), Image.LANCZOS)
+
+        out = io.BytesIO()
+        im.save(out, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+        optimized = out.getvalue()
+        return optimized if len(optimized) < len(data) else data
+    except Exception as e:
+        print(f"⚠️ 이미지 최적화 실패(원본 사용): {e}")
+        return data
+
+
+# 이미지 캐시: 공용 + 담당자별(send01, send02 ...) 모두 로드====
 image_cache = {}
+# rel -> (원본 바이트 수, 최적화 후 바이트 수) — 용량 리포트용
+image_sizes = {}
+# (rel, cid) -> 미리 base64 인코딩해 둔 MIMEImage 파트 (수신자마다 재인코딩하지 않음)
+mime_image_cache = {}
+# (rel, cid) -> 위 파트의 인코딩 후 바이트 수 (메일 용량 집계용, 파트 만들 때 1번만 계산)
+mime_image_bytes = {}
+# rel -> 내용 해시(앞 10자리) — 호스팅 모드 URL의 버전(?v=)으로 사용
+image_versions = {}
 
 def load_images():
     """
-    우선순위: AD_DIR/(send01|send02)/파일 -> AD_DIR/공용파일 -> static/(send..)/파일 -> static/공용파일
+    우선순위: AD_DIR/(담당자 key)/파일 -> AD_DIR/공용파일 -> static/(담당자 key)/파일 -> static/공용파일
     """
-    variants = ["", "send01", "send02"]  # ""=공용
+    variants = ["", *SENDER_KEYS]  # ""=공용
     files = ["logo01.jpg", "ad1.jpg", "ad2.jpg", "ad3.jpg"]
 
     def read_bytes(rel):
@@ -189,75 +1334,688 @@ def load_images():
 
         return None
 
+    original_sizes = _load_original_sizes()
+    mime_image_cache.clear()
+    mime_image_bytes.clear()
+
     for v in variants:
         for fname in files:
             rel = f"{v}/{fname}" if v else fname
             data = read_bytes(rel)
             if data:
-                image_cache[rel] = data
+                # static 기본 이미지도 업로드본과 같은 규격으로 정규화
+                optimized = optimize_jpeg_bytes(data, IMAGE_MAX_WIDTH[fname])
+                image_cache[rel] = optimized
+                # 업로드본이면 업로드 당시 원본 크기, static 기본 이미지면 읽은 크기
+                if os.path.exists(os.path.join(AD_DIR, rel)):
+                    original = original_sizes.get(rel, len(data))
+                else:
+                    original = original_sizes.get(fname, len(data))
+                image_sizes[rel] = (original, len(optimized))
+                image_versions[rel] = hashlib.sha1(optimized).hexdigest()[:10]
+
+# 업로드 원본 크기 기록 (업로드 시 정규화된 파일만 남으므로 리포트용으로 따로 보관)
+IMAGE_SIZES_FILE = os.path.join(AD_DIR, "original_sizes.json")
+
+def _load_original_sizes():
+    try:
+        with open(IMAGE_SIZES_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _record_original_size(rel, size):
+    sizes = _load_original_sizes()
+    sizes[rel] = size
+    with open(IMAGE_SIZES_FILE, "w", encoding="utf-8") as f:
+        json.dump(sizes, f, ensure_ascii=False)
+
+# 다른 워커에서 이미지가 교체되면 공유 버전이 올라감 → 내 캐시가 뒤처졌으면 다시 로드
+_images_loaded_version = 0
+
+def _init_payroll():
+    # 디렉터리 생성 + 로고 및 광고이미지 1회 로드 (첫 payroll 요청 또는 warm-up 때)
+    global _images_loaded_version
+    os.makedirs(AD_DIR, exist_ok=True)
+    for key in SENDER_KEYS:
+        os.makedirs(SENDER_CONF[key]["upload_dir"], exist_ok=True)
+    _images_loaded_version = runtime_get("_images", "version", 0)
+    load_images()
+
+_initializers["payroll"] = _init_payroll
+
+def ensure_images_fresh():
+    global _images_loaded_version
+    ensure_initialized("payroll")
+    version = runtime_get("_images", "version", 0)
+    if version != _images_loaded_version:
+        load_images()
+        _images_loaded_version = version
+
+def get_mime_image(rel, cid):
+    """
+    담당자 폴더 이미지 -> 공용 이미지 순으로 찾아 MIMEImage 파트를 1회만 만들어 재사용.
+    (MIMEImage 생성 시 base64 인코딩이 끝나므로 배치 전체에서 인코딩은 이미지당 1번)
+    """
+    from email.mime.image import MIMEImage
+
+    ensure_initialized("payroll")
+    key = (rel, cid)
+    part = mime_image_cache.get(key)
+    if part is not None:
+        return part
+
+    data = image_cache.get(rel)
+    if data is None:
+        fallback = rel.split('/', 1)[-1]  # 'logo01.jpg' 등
+        data = image_cache.get(fallback)
+    if not data:
+        return None
+
+    part = MIMEImage(data, _subtype='jpeg')
+    part.add_header('Content-ID', f'<{cid}>')
+    mime_image_cache[key] = part
+    mime_image_bytes[key] = len(part.as_bytes())
+    return part
+
+
+# ---- 호스팅 이미지 모드 (CID 첨부 대신 /ad/<path> URL 참조) ----
+IMAGE_MODES = ("cid", "hosted")
 
-# 앱 시작 시 로고 및 광고이미지 1회 로드===
-load_images()
-#============================
+# 외부 이미지를 막는 메일 서비스 도메인은 호스팅 모드여도 CID 첨부로 폴백 (예: "hanmail.net,daum.net")
+CID_FALLBACK_DOMAINS = {
+    d.strip().lower() for d in os.environ.get("CID_FALLBACK_DOMAINS", "").split(",") if d.strip()
+}
+# 항상 CID 첨부가 필요한 템플릿 (예: "retired.html")
+CID_ONLY_TEMPLATES = {
+    t.strip() for t in os.environ.get("CID_ONLY_TEMPLATES", "").split(",") if t.strip()
+}
+
+def resolve_image_rel(rel):
+    """담당자 폴더 이미지가 없으면 공용 이미지 rel로 폴백 (process_row 규칙과 동일)."""
+    if rel in image_cache:
+        return rel
+    fallback = rel.split('/', 1)[-1]
+    return fallback if fallback in image_cache else None
+
+def hosted_image_url(base_url, rel):
+    """내용 해시를 버전으로 붙인 /ad/ URL — 이미지가 교체되면 URL도 바뀌어 캐시가 무효화됨."""
+    rel = resolve_image_rel(rel)
+    if rel is None:
+        return ""
+    return f"{base_url.rstrip('/')}/ad/{rel}?v={image_versions.get(rel, '')}"
+
+def needs_cid_embedding(row, receiver, template_name):
+    """수신자/템플릿이 CID 첨부가 필요하다고 표시된 경우 True."""
+    if template_name in CID_ONLY_TEMPLATES:
+        return True
+    flag = str(row.get('이미지첨부', '') or '').strip().upper()
+    if flag in ('Y', 'O', '1', 'TRUE', '예'):
+        return True
+    domain = receiver.rsplit('@', 1)[-1].lower() if '@' in receiver else ''
+    return domain in CID_FALLBACK_DOMAINS
+
+# ---- 이메일 템플릿 컴파일 (CSS 인라인 + 압축, 파일이 바뀔 때만 다시) ----
+# 예전에는 수신자마다 템플릿 파일을 읽고 그대로 렌더 → 메일마다 <style>과 들여쓰기/주석이 다 실림,
+# <style>을 지우는 메일 프로그램(일부 웹메일)에서는 그 규칙이 빠짐.
+# 이제 템플릿을 처음 쓸 때 1번: <style> 규칙을 요소의 style 속성으로 옮기고(태그/.class/#id 단순 선택자만),
+# 주석/공백을 줄인 뒤 Jinja 템플릿으로 컴파일해 캐시. 파일 mtime/크기가 바뀌면 다시 컴파일.
+# 옮기지 못한 규칙(@media, :hover, 자손 선택자 등)은 <style>에 남김. /<key>/templates 에서 템플릿별 크기 비교.
+#   EMAIL_TEMPLATE_COMPILE=0  → 컴파일 없이 원본 그대로 렌더 (문제 확인용)
+EMAIL_TEMPLATE_COMPILE = os.environ.get("EMAIL_TEMPLATE_COMPILE", "1") == "1"
+_email_templates = {}   # 경로 -> {"sig", "template", "report"}
+_email_templates_lock = threading.Lock()
+
+_CSS_SIMPLE_SELECTOR = re.compile(r"^([a-zA-Z][a-zA-Z0-9]*)?((?:[.#][\w-]+)*)$")
+_HTML_BLOCK_TAGS = ("html|head|body|meta|title|style|table|thead|tbody|tfoot|tr|td|th|div|p|br|hr|center"
+                    "|h[1-6]|ul|ol|li")
+_HTML_NO_INLINE = {"html", "head", "meta", "title", "style", "link", "script", "br"}
+
+def _parse_css(css):
+    """'선택자 { 선언 }' 목록 → [(선택자, 선언문자열)], 처리 못 하는 블록(@media 등)은 따로 원문으로."""
+    rules, leftover = [], []
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    pos = 0
+    for m in re.finditer(r"([^{}]+)\{([^{}]*)\}", css):
+        if css[pos:m.start()].strip() or m.group(1).strip().startswith("@"):
+            # @media {...} 같은 중첩 블록은 통째로 남김
+            leftover.append(css[pos:].strip())
+            break
+        pos = m.end()
+        decls = "; ".join(d.strip() for d in m.group(2).split(";") if d.strip())
+        for selector in m.group(1).split(","):
+            rules.append((selector.strip(), decls))
+    return rules, leftover
+
+def _selector_specificity(selector):
+    tag, rest = _CSS_SIMPLE_SELECTOR.match(selector).groups()
+    return (rest.count("#"), rest.count("."), 1 if tag else 0)
+
+def _attr_value(attrs, name):
+    # class="a b" / class='a b' 모두
+    m = re.search(rf"""\b{name}\s*=\s*(["'])(.*?)\1""", attrs, flags=re.S)
+    return m.group(2) if m else ""
+
+def _css_properties(decls):
+    return [d.split(":", 1)[0].strip().lower() for d in decls.split(";") if ":" in d]
+
+def _css_property_overlaps(prop, others):
+    # padding ↔ padding-left 처럼 축약형/개별 속성도 같은 속성으로 봄
+    return any(prop == o or prop.startswith(o + "-") or o.startswith(prop + "-") for o in others)
+
+def _selector_matches(selector, tag, attrs):
+    want_tag, rest = _CSS_SIMPLE_SELECTOR.match(selector).groups()
+    if want_tag and want_tag.lower() != tag:
+        return False
+    classes = _attr_value(attrs, "class").split()
+    element_id = _attr_value(attrs, "id")
+    for kind, name in re.findall(r"([.#])([\w-]+)", rest):
+        if (kind == "." and name not in classes) or (kind == "#" and name != element_id):
+            return False
+    return True
+
+def inline_css(html):
+    """
+    <style> 규칙을 style 속성으로 옮김. 반환: (html, 옮긴 규칙 수, 남긴 규칙 수)
+    style 속성은 어떤 <style> 규칙보다 우선하므로, 남기는 규칙(@media, 자손 선택자 등)이 건드리는 속성은
+    옮기지 않고 원래 순서대로 <style>에 같이 남김 → 캐스케이드 결과가 원본과 같음.
+    조건부 주석(<!--[if mso]> ... <![endif]-->) 안은 그대로 둠.
+    """
+    conditionals = []
+
+    def stash(m):
+        conditionals.append(m.group(0))
+        return f"\x00cc{len(conditionals) - 1}\x00"
+
+    html = re.sub(r"<!--\[if.*?<!\[endif\]-->", stash, html, flags=re.S | re.I)
+
+    entries = []   # 원래 순서대로 (선택자, 선언) 또는 (None, 원문 블록)
+    for block in re.findall(r"<style[^>]*>(.*?)</style>", html, flags=re.S | re.I):
+        parsed, rest = _parse_css(block)
+        entries += parsed
+        entries += [(None, raw) for raw in rest]
+
+    def simple(sel):
+        return bool(sel) and bool(_CSS_SIMPLE_SELECTOR.match(sel))
+
+    kept_props = set()
+    for sel, body in entries:
+        if sel is None:
+            for decls in re.findall(r"\{([^{}]*)\}", body):
+                kept_props.update(_css_properties(decls))
+        elif not simple(sel):
+            kept_props.update(_css_properties(body))
+
+    inlinable, leftover = [], []
+    for sel, body in entries:
+        if sel is None:
+            leftover.append(body)
+            continue
+        if not simple(sel):
+            leftover.append(f"{sel} {{ {body} }}")
+            continue
+        decls = [d.strip() for d in body.split(";") if d.strip()]
+        keep = [d for d in decls if _css_property_overlaps(_css_properties(d)[0] if ":" in d else d, kept_props)]
+        move = [d for d in decls if d not in keep]
+        if move:
+            inlinable.append((sel, "; ".join(move)))
+        if keep:
+            leftover.append(f"{sel} {{ {'; '.join(keep)} }}")
+    # 우선순위(특이도) 낮은 것부터 → 뒤의 선언이 이김, 원래 style 속성이 가장 마지막(최우선)
+    ordered = sorted(enumerate(inlinable), key=lambda item: (_selector_specificity(item[1][0]), item[0]))
+
+    def apply(m):
+        tag, attrs, close = m.group(1).lower(), m.group(2) or "", m.group(3)
+        if tag in _HTML_NO_INLINE:
+            return m.group(0)
+        decls = [d for _, (sel, d) in ordered if _selector_matches(sel, tag, attrs)]
+        if not decls:
+            return m.group(0)
+        existing = re.search(r"""\bstyle\s*=\s*(["'])(.*?)\1""", attrs, flags=re.S)
+        style = "; ".join(decls + ([existing.group(2).strip().rstrip(";")] if existing else []))
+        style = style.replace('"', "'")   # 항상 style="..." 로 씀
+        if existing:
+            attrs = attrs[:existing.start()] + f'style="{style}"' + attrs[existing.end():]
+        else:
+            attrs += f' style="{style}"'
+        return f"<{m.group(1)}{attrs}{close}>"
+
+    if ordered:
+        html = re.sub(r"<([a-zA-Z][a-zA-Z0-9]*)(\s[^<>]*?)?(/?)>", apply, html)
+    # 옮긴 규칙은 <style>에서 빼고, 남은 규칙만 첫 <style>에
+    html = re.sub(r"\s*<style[^>]*>.*?</style>", "", html, flags=re.S | re.I)
+    if leftover:
+        html = re.sub(r"</head>", lambda m: "<style>" + " ".join(leftover) + "</style></head>", html,
+                      count=1, flags=re.I)
+    html = re.sub(r"\x00cc(\d+)\x00", lambda m: conditionals[int(m.group(1))], html)
+    return html, len(inlinable), len(leftover)
+
+def minify_html(html):
+    """주석(조건부 주석 제외)/연속 공백/블록 태그 주변 공백 제거. Jinja 구문은 건드리지 않음."""
+    # <!--[if ...]> 와 숨김 해제형 <!--[if !mso]><!--> ... <!--<![endif]--> 의 표시는 남김
+    html = re.sub(r"<!--(?!\[if|>|<!\[endif\]).*?-->", "", html, flags=re.S)
+    html = re.sub(r"[ \t\r\n]+", " ", html)
+    html = re.sub(rf"\s*(</?(?:{_HTML_BLOCK_TAGS})\b[^>]*>)\s*", r"\1", html, flags=re.I)
+    return html.strip()
+
+def compile_email_template(template_base, template_name):
+    """templates/<base>/<name> → 컴파일된 Jinja 템플릿 (캐시, 파일이 바뀌면 다시)."""
+    path = os.path.join('templates', template_base, template_name)
+    sig = _file_signature(path)
+    with _email_templates_lock:
+        cached = _email_templates.get(path)
+    if cached is not None and cached["sig"] == sig:
+        return cached["template"]
+
+    with timed("template_compile", template=f"{template_base}/{template_name}"):
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        compiled, inlined, kept = inline_css(source) if EMAIL_TEMPLATE_COMPILE else (source, 0, 0)
+        if EMAIL_TEMPLATE_COMPILE:
+            compiled = minify_html(compiled)
+        template = app.jinja_env.from_string(compiled)
+    report = {"template": f"{template_base}/{template_name}", "source_bytes": len(source.encode()),
+              "compiled_bytes": len(compiled.encode()), "inlined_rules": inlined, "kept_rules": kept,
+              "compiled_at": now_kst().isoformat(timespec="seconds")}
+    with _email_templates_lock:
+        _email_templates[path] = {"sig": sig, "template": template, "report": report}
+    print(f"🧩 이메일 템플릿 컴파일 {report['template']}: {report['source_bytes'] / 1024:.1f}KB → "
+          f"{report['compiled_bytes'] / 1024:.1f}KB (인라인 {inlined}, 남김 {kept})")
+    return template
 
 def render_email_template(template_base, template_name, context):
-    # templates/<template_base>/<template_name>
-    with open(os.path.join('templates', template_base, template_name), 'r', encoding='utf-8') as f:
-        template_str = f.read()
-    return render_template_string(template_str, **context)
+    # templates/<template_base>/<template_name> — 컴파일은 배치 첫 메일에서 1번, 이후는 렌더만
+    template = compile_email_template(template_base, template_name)
+    with timed("template_render", template=f"{template_base}/{template_name}"):
+        return template.render(**context)
+
+EMAIL_TEMPLATE_NAMES = ("teacher.html", "employee_worker.html", "employee_business.html", "retired.html")
+
+def email_template_report(template_base):
+    """담당자 템플릿별 원본/컴파일 크기 (필요하면 여기서 컴파일)."""
+    reports = []
+    for name in EMAIL_TEMPLATE_NAMES:
+        if not os.path.exists(os.path.join('templates', template_base, name)):
+            continue
+        compile_email_template(template_base, name)
+        with _email_templates_lock:
+            reports.append(_email_templates[os.path.join('templates', template_base, name)]["report"])
+    return reports
+
+EMAIL_TEMPLATE_REPORT_HTML = """
+<!doctype html>
+<html lang="ko">
+<head><meta charset="utf-8"><title>이메일 템플릿 크기 ({{ sender_key }})</title>
+<style>
+  body { font-family: 'Nanum Gothic', sans-serif; margin: 32px; color: #1f2937; }
+  table { border-collapse: collapse; } th, td { border: 1px solid #e5e7eb; padding: 6px 10px; font-size: 13px; text-align: right; }
+  td:first-child { text-align: left; }
+</style></head>
+<body>
+  <h3>🧩 이메일 템플릿 컴파일 결과 ({{ sender_key }}){% if not enabled %} — EMAIL_TEMPLATE_COMPILE=0 (원본 그대로){% endif %}</h3>
+  <table>
+    <tr><th>템플릿</th><th>원본</th><th>컴파일</th><th>줄어든 비율</th><th>인라인 규칙</th><th>남긴 규칙</th><th>컴파일 시각</th></tr>
+    {% for r in reports %}
+    <tr>
+      <td>{{ r.template }}</td><td>{{ '{:,}'.format(r.source_bytes) }}B</td><td>{{ '{:,}'.format(r.compiled_bytes) }}B</td>
+      <td>{{ '%.1f'|format(100 - 100 * r.compiled_bytes / r.source_bytes) }}%</td>
+      <td>{{ r.inlined_rules }}</td><td>{{ r.kept_rules }}</td><td>{{ r.compiled_at[:19]|replace('T', ' ') }}</td>
+    </tr>
+    {% endfor %}
+  </table>
+  <p><a href="/{{ sender_key }}">발송 페이지로 가기</a></p>
+</body>
+</html>
+"""
+
+@operator_route('/templates', methods=['GET'])
+def email_template_report_view():
+    sender_key = request.path.split('/')[1]
+    reports = email_template_report(SENDER_CONF[sender_key]["template_base"])
+    if request.args.get("format") == "json":
+        return jsonify(reports)
+    return render_template_string(EMAIL_TEMPLATE_REPORT_HTML, sender_key=sender_key, reports=reports,
+                                  enabled=EMAIL_TEMPLATE_COMPILE)
 
 def _email_login_params(sender_key):
     return SENDER_CONF[sender_key]["email"], SENDER_CONF[sender_key]["app_pw"]
 
+# ---- 발송 전 점검 (pre-flight) ----
+# 업로드 직후 모든 시트를 한 번 훑어서, 속도 제어 루프(smart_sleep)에 들어가기 전에
+# 못 보내는 행과 중복을 걸러 내고 담당자가 보고서를 확인한 뒤 발송을 시작함.
+#   제외: 이름/이메일 없음, 이메일 형식 오류, 지급총액 0 이하, 같은 사람·같은 금액 중복(다른 시트 포함)
+#   경고(발송은 함): 계좌번호 없음, 같은 이메일로 내용이 다른 명세서 여러 건
+# 확인하면 통과한 행만 담은 엑셀(1행 제목 / 3행 헤더 그대로)을 만들어 기존 발송(즉시/예약)에 넘김.
+EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+\-']+@[A-Za-z0-9\-]+(\.[A-Za-z0-9\-]+)*\.[A-Za-z]{2,}$")
+
+def normalize_email(value):
+    # 전각 문자(＠ 등) → 반각, 공백/mailto: 제거, 소문자
+    import unicodedata
+
+    s = unicodedata.normalize("NFKC", str(value or "")).strip()
+    s = re.sub(r"\s+", "", s)
+    if s.lower().startswith("mailto:"):
+        s = s[7:]
+    return s.rstrip(".").lower()
+
+def _cell_text(row, *keys):
+    for key in keys:
+        val = row.get(key)
+        if val is not None and pd.notna(val):
+            s = str(val).strip()
+            if s and s.lower() not in ('nan', 'none', 'non'):
+                return s
+    return ''
+
+def _cell_int(row, key):
+    try:
+        return int(float(str(row.get(key)).replace(',', '').strip()))
+    except (TypeError, ValueError):
+        return None
+
+def preflight_payroll(filepath):
+    """
+    반환: {"sheets": {시트명: {"title", "columns", "keep"(통과한 DataFrame)}},
+           "total", "ok", "excluded": [...], "warnings": [...], "reasons": {사유: 건수}}
+    """
+    with timed("excel_read", file="payroll_preflight"):
+        excel_data = pd.read_excel(filepath, sheet_name=None, header=2)
+        titles = pd.read_excel(filepath, sheet_name=None, header=None, nrows=1)
+
+    report = {"sheets": {}, "total": 0, "ok": 0, "excluded": [], "warnings": [], "reasons": {}}
+    seen = {}          # (이메일, 이름, 지급총액, 공제총액) -> 처음 나온 위치
+    by_email = {}      # 이메일 -> 처음 나온 위치 (내용이 다른 중복 경고용)
+
+    def flag(kind, where, name, email, reason, detail=""):
+        entry = {"sheet": where[0], "row": where[1], "name": name, "email": email,
+                 "reason": reason, "detail": detail}
+        report[kind].append(entry)
+        if kind == "excluded":
+            report["reasons"][reason] = report["reasons"].get(reason, 0) + 1
+
+    for sheet_name, df in excel_data.items():
+        df.columns = df.columns.astype(str).str.strip()
+        title_row = titles[sheet_name].iloc[0].tolist() if len(titles[sheet_name]) else []
+        keep = []
+        for idx, row in df.iterrows():
+            if not _payroll_has_recipient(row):
+                continue
+            report["total"] += 1
+            where = (sheet_name, idx + 4)   # 엑셀 행 번호 (3행 헤더 다음부터)
+            name = _cell_text(row, '강사명', '직원명')
+            raw_email = _cell_text(row, '이메일')
+            email = normalize_email(raw_email)
+
+            if not name:
+                flag("excluded", where, name, raw_email, "이름 없음")
+                continue
+            if not email:
+                flag("excluded", where, name, raw_email, "이메일 없음")
+                continue
+            if not EMAIL_RE.match(email):
+                flag("excluded", where, name, raw_email, "이메일 형식 오류")
+                continue
+            total_pay = _cell_int(row, '지급총액')
+            if '지급총액' in df.columns and (total_pay is None or total_pay <= 0):
+                flag("excluded", where, name, email, "지급총액 0 이하/없음")
+                continue
+            key = (email, name, total_pay, _cell_int(row, '공제총액'))
+            if key in seen:
+                first = seen[key]
+                flag("excluded", where, name, email, "중복", f"{first[0]} {first[1]}행과 같음")
+                continue
+            seen[key] = where
+
+            if email in by_email:
+                first = by_email[email]
+                flag("warnings", where, name, email, "같은 이메일 다른 명세서", f"{first[0]} {first[1]}행")
+            else:
+                by_email[email] = where
+            if '계좌번호' in df.columns and not _cell_text(row, '계좌번호'):
+                flag("warnings", where, name, email, "계좌번호 없음")
+
+            if email != raw_email:
+                row = row.copy()
+                row['이메일'] = email
+            keep.append(row)
+
+        report["sheets"][sheet_name] = {
+            "title": title_row, "columns": list(df.columns),
+            "keep": pd.DataFrame(keep, columns=df.columns),
+        }
+        report["ok"] += len(keep)
+    return report
+
+def write_preflight_workbook(report, path):
+    """점검 통과 행만으로 업로드 양식과 같은 모양(1행 제목, 3행 헤더)의 엑셀 작성."""
+    import openpyxl
+
+    def clean(v):
+        return None if v is None or (not isinstance(v, str) and pd.isna(v)) else v
+
+    wb = openpyxl.Workbook(write_only=True)
+    for sheet_name, sheet in report["sheets"].items():
+        ws = wb.create_sheet(sheet_name)
+        ws.append([clean(v) for v in sheet["title"]])
+        ws.append([])
+        ws.append(["" if c.startswith("Unnamed:") else c for c in sheet["columns"]])
+        for values in sheet["keep"].itertuples(index=False):
+            ws.append([clean(v) for v in values])
+    wb.save(path)
+
+PREFLIGHT_HTML = """
+<!doctype html>
+<html lang="ko">
+<head>
+  <meta charset="utf-8">
+  <title>발송 전 점검</title>
+  <style>
+    body { font-family: 'Nanum Gothic', sans-serif; margin: 40px auto; max-width: 1100px; color: #1f2937; }
+    h2 { color: #1f3c88; }
+    .summary span { display: inline-block; margin-right: 12px; padding: 4px 10px; border-radius: 999px;
+                    background: #eef2ff; border: 1px solid #c7d2fe; font-weight: bold; font-size: 13px; }
+    .summary span.bad { background: #fee2e2; border-color: #fca5a5; }
+    .summary span.warn { background: #fef3c7; border-color: #fcd34d; }
+    table { border-collapse: collapse; width: 100%; margin: 8px 0 20px; font-size: 13px; }
+    th, td { border: 1px solid #e5e7eb; padding: 5px 8px; text-align: left; }
+    th { background: #f3f4f6; }
+    .actions button { padding: 10px 18px; border-radius: 8px; border: 1px solid #1f3c88; font-size: 14px; cursor: pointer; }
+    .actions .go { background: #1f3c88; color: #fff; }
+    .actions .cancel { background: #fff; color: #1f3c88; }
+    #status-message { margin-top: 16px; font-size: 14px; }
+  </style>
+</head>
+<body>
+  <h2>📋 [{{ sender_key }}] 발송 전 점검 — {{ filename }}</h2>
+  <div class="summary">
+    <span>전체 {{ report.total }}명</span>
+    <span>발송 대상 {{ report.ok }}명</span>
+    {% for reason, n in report.reasons.items() %}<span class="bad">{{ reason }} {{ n }}</span>{% endfor %}
+    {% if report.warnings %}<span class="warn">경고 {{ report.warnings|length }}</span>{% endif %}
+  </div>
+  <p>{{ '예약 발송' if options.dispatch_mode == 'schedule' else '즉시 발송' }} · 지급일 {{ options.send_date or '오늘' }}
+     {% if options.dispatch_mode == 'schedule' %}{{ options.dispatch_time }}부터{% endif %}</p>
+
+  {% if report.excluded %}
+  <h3>제외 ({{ report.excluded|length }}건, 발송하지 않음)</h3>
+  <table>
+    <tr><th>시트</th><th>행</th><th>이름</th><th>이메일</th><th>사유</th></tr>
+    {% for e in report.excluded[:500] %}
+    <tr><td>{{ e.sheet }}</td><td>{{ e.row }}</td><td>{{ e.name }}</td><td>{{ e.email }}</td><td>{{ e.reason }}{% if e.detail %} ({{ e.detail }}){% endif %}</td></tr>
+    {% endfor %}
+  </table>
+  {% endif %}
+
+  {% if report.warnings %}
+  <h3>경고 ({{ report.warnings|length }}건, 발송은 함)</h3>
+  <table>
+    <tr><th>시트</th><th>행</th><th>이름</th><th>이메일</th><th>내용</th></tr>
+    {% for e in report.warnings[:500] %}
+    <tr><td>{{ e.sheet }}</td><td>{{ e.row }}</td><td>{{ e.name }}</td><td>{{ e.email }}</td><td>{{ e.reason }}{% if e.detail %} ({{ e.detail }}){% endif %}</td></tr>
+    {% endfor %}
+  </table>
+  {% endif %}
+
+  <form method="post" action="/{{ sender_key }}/confirm" class="actions" id="confirm-form">
+    <input type="hidden" name="token" value="{{ token }}">
+    {% if report.ok %}
+    <button type="submit" name="action" value="send" class="go">✅ 확인 — {{ report.ok }}명 발송</button>
+    {% endif %}
+    <button type="submit" name="action" value="cancel" class="cancel">취소</button>
+  </form>
+  <div id="status-message"></div>
+
+  <script>
+    // 즉시 발송은 응답이 올 때까지 이 화면에서 진행 상황 표시
+    document.getElementById('confirm-form').addEventListener('submit', function (e) {
+      if (!e.submitter || e.submitter.value !== 'send') return;
+      document.querySelectorAll('#confirm-form button').forEach(b => b.style.display = 'none');
+      setInterval(() => {
+        fetch('/{{ sender_key }}/status').then(res => res.json()).then(data => {
+          document.getElementById('status-message').innerHTML = `총 <strong>${data.sent_count}</strong>명 발송 완료`;
+        });
+      }, 5000);
+    });
+  </script>
+</body>
+</html>
+"""
+
+def _preflight_paths(sender_key, token):
+    save_dir = SENDER_CONF[sender_key]["upload_dir"]
+    return os.path.join(save_dir, f"{token}.xlsx"), os.path.join(save_dir, f"{token}.json")
+
 # ---- Upload UI (per-operator) ----
-@app.route('/send01', methods=['GET', 'POST'])
-@app.route('/send02', methods=['GET', 'POST'])
+@operator_route('', methods=['GET', 'POST'])
 def payroll_upload_file_multi():
     sender_key = request.path.strip('/')
 
     if request.method == 'POST':
-        # reset stop flag
-        with runtime[sender_key]["stop_lock"]:
-            runtime[sender_key]["stop_requested"] = False
-
-        chosen_date = min(resolve_send_date(request.form), now_kst().date())
-        runtime[sender_key]["send_date"] = chosen_date
-        runtime[sender_key]["send_date_str"] = chosen_date.strftime('%Y년 %m월 %d일')
-        runtime[sender_key]["send_date_iso"] = chosen_date.strftime('%Y-%m-%d')
-
         file = request.files.get('excel')
-        if file and file.filename.lower().endswith('.xlsx'):
-            safe_filename = f"{uuid.uuid4()}.xlsx"
-            save_dir = SENDER_CONF[sender_key]["upload_dir"]
-            path = os.path.join(save_dir, safe_filename)
-            file.save(path)
-            try:
-                result_html = process_excel_multi(sender_key, path)
-            except Exception as e:
-                return f"처리 중 오류 발생: {e}"
-            finally:
-                try:
-                    os.remove(path)
-                except Exception:
-                    pass
-            return (result_html or "") + f'</div><br><a href="/{sender_key}" style="display:block; margin:16px auto 24px; width:fit-content; padding:8px 16px; background:#1f3c88; color:#fff; text-decoration:none; border-radius:5px;">발송 페이지로 가기</a>'
-        else:
+        if not (file and file.filename.lower().endswith('.xlsx')):
             return "엑셀 파일(.xlsx)만 업로드 가능합니다."
-
-    # 각 담당자 폴더의 업로드 폼 사용: templates/send01/upload_form.html, templates/send02/upload_form.html
+        ensure_initialized("payroll")  # 업로드 폴더가 아직 없을 수 있음 (지연 초기화)
+        token = uuid.uuid4().hex
+        path, meta_path = _preflight_paths(sender_key, token)
+        file.save(path)
+        # 확인 단계에서 쓸 폼 선택값 보관 (지급일/이미지 방식/발송 방식)
+        options = {k: request.form.get(k, "") for k in ("send_date", "image_mode", "dispatch_mode", "dispatch_time")}
+        options.update(filename=file.filename, public_base_url=os.environ.get("PUBLIC_BASE_URL") or request.host_url)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(options, f, ensure_ascii=False)
+        try:
+            report = preflight_payroll(path)
+        except Exception as e:
+            for p in (path, meta_path):
+                os.remove(p)
+            return f"엑셀 점검 중 오류 발생: {e}"
+        log_event("payroll_preflight", key=sender_key, total=report["total"], ok=report["ok"],
+                  excluded=len(report["excluded"]), warnings=len(report["warnings"]))
+        return render_template_string(PREFLIGHT_HTML, sender_key=sender_key, token=token, report=report,
+                                      options=options, filename=file.filename)
+
+    # 각 담당자 폴더의 업로드 폼 사용: templates/<template_base>/upload_form.html
     upload_form_path = os.path.join("templates", SENDER_CONF[sender_key]["template_base"], "upload_form.html")
     return render_template_string(
-        open(upload_form_path, encoding="utf-8").read(),
-        uuid1=str(uuid.uuid4()), uuid2=str(uuid.uuid4()), uuid3=str(uuid.uuid4())
+        open(upload_form_path, encoding="utf-8").read(), sender_key=sender_key,
+        uuid1=str(uuid.uuid4()), uuid2=str(uuid.uuid4()), uuid3=str(uuid.uuid4()),
+        image_mode=SENDER_CONF[sender_key]["image_mode"]
     )
 
+@operator_route('/confirm', methods=['POST'])
+def payroll_confirm_multi():
+    sender_key = request.path.split('/')[1]
+    token = request.form.get('token', '')
+    if not re.fullmatch(r"[0-9a-f]{32}", token):
+        return redirect(f"/{sender_key}")
+    path, meta_path = _preflight_paths(sender_key, token)
+    # 먼저 이름을 바꾼 쪽만 진행 (확인 버튼 두 번 눌러도 한 번만 발송)
+    claimed = path[:-5] + ".confirmed.xlsx"
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return "이미 발송했거나 취소된 파일입니다. 다시 업로드하세요."
+    with open(meta_path, encoding="utf-8") as f:
+        options = json.load(f)
+    os.remove(meta_path)
+
+    if request.form.get('action') != 'send':
+        os.remove(claimed)
+        return redirect(f"/{sender_key}")
+
+    clean_path = path[:-5] + ".clean.xlsx"
+    try:
+        write_preflight_workbook(preflight_payroll(claimed), clean_path)
+    finally:
+        os.remove(claimed)
+
+    if options.get('dispatch_mode') == 'schedule':
+        return schedule_upload(sender_key, clean_path, options)
+
+    # reset stop flag
+    set_stop_requested(sender_key, False)
+
+    chosen_date = min(resolve_send_date(options), now_kst().date())
+
+    # 이미지 방식: 폼 선택 > 담당자 기본값(IMAGE_MODE_0X)
+    image_mode = options.get('image_mode') or SENDER_CONF[sender_key]["image_mode"]
+    runtime_set(
+        sender_key,
+        send_date_str=chosen_date.strftime('%Y년 %m월 %d일'),
+        send_date_iso=chosen_date.strftime('%Y-%m-%d'),
+        image_mode=image_mode if image_mode in IMAGE_MODES else "cid",
+        public_base_url=options["public_base_url"],
+    )
+    try:
+        with profile_job("payroll", key=sender_key):
+            report_id = process_excel_multi(sender_key, clean_path, filename=options.get("filename"))
+    except Exception as e:
+        return f"처리 중 오류 발생: {e}"
+    finally:
+        try:
+            os.remove(clean_path)
+        except Exception:
+            pass
+    # 결과는 발송 기록으로 남음 (새로고침해도 다시 발송되지 않도록 리다이렉트)
+    return redirect(f"/{sender_key}/reports/{report_id}")
+
+def schedule_upload(sender_key, path, options):
+    """예약 발송: 점검한 엑셀을 보관하고 지급일(send_date)+시각부터 한도에 맞춰 나눠 보내도록 등록."""
+    send_date = resolve_send_date(options)   # 예약은 미래 지급일 허용
+    try:
+        at = datetime.strptime(options.get('dispatch_time') or "", "%H:%M").time()
+    except ValueError:
+        at = dispatch_windows()[0][0]
+    start_dt = max(datetime.combine(send_date, at, tzinfo=KST), now_kst())
+    image_mode = options.get('image_mode') or SENDER_CONF[sender_key]["image_mode"]
+
+    os.makedirs(DISPATCH_DIR, exist_ok=True)
+    scheduled_path = os.path.join(DISPATCH_DIR, f"{sender_key}_{uuid.uuid4()}.xlsx")
+    shutil.move(path, scheduled_path)
+    try:
+        job_id, total = schedule_dispatch(
+            sender_key, scheduled_path, options.get('filename'), send_date, start_dt,
+            image_mode if image_mode in IMAGE_MODES else "cid", options["public_base_url"])
+    except Exception as e:
+        os.remove(scheduled_path)
+        return f"예약 등록 중 오류 발생: {e}"
+    with _runtime_db() as conn:
+        days = [r[0] for r in conn.execute(
+            "SELECT DISTINCT day FROM dispatch_chunks WHERE job_id=? ORDER BY day", (job_id,))]
+    return f'''
+    <script>
+        alert("({sender_key}) 예약 발송 #{job_id} 등록: {total}명, {days[0]} ~ {days[-1]} ({len(days)}일) 동안 나눠 발송합니다.");
+        location.href = "/dispatch?month={days[0][:7]}";
+    </script>
+    '''
+
 # ---- Stop & Status (per-operator) ----
-@app.post('/send01/stop')
-@app.post('/send02/stop')
+@operator_route('/stop', methods=['POST'])
 def stop_sending_multi():
     sender_key = request.path.split('/')[1]
-    with runtime[sender_key]["stop_lock"]:
-        runtime[sender_key]["stop_requested"] = True
+    set_stop_requested(sender_key, True)
+    # 도는 중인 예약 발송 묶음도 멈춤 (남은 예약은 _run_dispatch_chunk가 취소)
+    set_stop_requested(dispatch_state_key(sender_key), True)
     return f'''
     <script>
         alert("({sender_key}) 발송이 중단되었습니다.");
@@ -265,35 +2023,45 @@ def stop_sending_multi():
     </script>
     '''
 
-@app.get('/send01/status')
-@app.get('/send02/status')
+@operator_route('/status', methods=['GET'])
 def status_multi():
     sender_key = request.path.split('/')[1]
     return jsonify({
-        "sent_count": runtime[sender_key]["sent_count"],
-        "sent_names": list(reversed(runtime[sender_key]["sent_names"]))
+        "sent_count": runtime_get(sender_key, "sent_count", 0),
+        "sent_names": list(reversed(runtime_names(sender_key))),
+        "image_mode": runtime_get(sender_key, "image_mode", SENDER_CONF[sender_key]["image_mode"]),
+        "bytes_sent": runtime_get(sender_key, "bytes_sent", 0),
+        "bytes_cid": runtime_get(sender_key, "bytes_cid", 0),
+        "bytes_hosted": runtime_get(sender_key, "bytes_hosted", 0),
     })
 
 # ---- 광고 이미지 교체 (담당자별 분리 + 공용 폴백) ----
 @app.post('/send/upload_ad_image')
-@app.post('/send01/upload_ad_image')
-@app.post('/send02/upload_ad_image')
+@operator_route('/upload_ad_image', methods=['POST'])
 def upload_ad_image_multi():
     file   = request.files.get('ad_file')
     target = request.form.get('target')              # 'ad1.jpg' | 'ad2.jpg' | 'ad3.jpg' | 'logo01.jpg'
-    bucket = request.form.get('bucket', '')          # '', 'send01', 'send02'
+    bucket = request.form.get('bucket', '')          # '' 또는 담당자 key (send01, send02 ...)
 
     valid = {'logo01.jpg', 'ad1.jpg', 'ad2.jpg', 'ad3.jpg'}
     if not file or target not in valid:
         return "잘못된 요청입니다.", 400
 
     # ✅ 지속 저장소(/mnt/data/ad_images ...)에 저장
-    folder = os.path.join(AD_DIR, bucket) if bucket in ('send01', 'send02') else AD_DIR
+    folder = os.path.join(AD_DIR, bucket) if bucket in SENDER_KEYS else AD_DIR
     os.makedirs(folder, exist_ok=True)
-    file.save(os.path.join(folder, target))
 
-    # 캐시 갱신
-    load_images()
+    # 업로드 시점에 표시 크기로 정규화(리사이즈 + 재압축 + 메타데이터 제거)
+    raw = file.read()
+    optimized = optimize_jpeg_bytes(raw, IMAGE_MAX_WIDTH[target])
+    with open(os.path.join(folder, target), "wb") as f:
+        f.write(optimized)
+    rel = f"{bucket}/{target}" if bucket in SENDER_KEYS else target
+    _record_original_size(rel, len(raw))
+
+    # 캐시 갱신 (다른 워커는 공유 버전을 보고 다음 사용 시 다시 로드)
+    runtime_add("_images", version=1)
+    ensure_images_fresh()
 
     # 캐시 무력화 리다이렉트
     return '''
@@ -316,6 +2084,14 @@ def _safe_join(base, rel):
 
 @app.get("/ad/<path:rel>")
 def serve_ad(rel):
+    ensure_images_fresh()
+    # 0) 최적화된 메모리 캐시 (호스팅 모드 메일이 참조하는 것과 같은 바이트)
+    cached = resolve_image_rel(rel)
+    if cached is not None:
+        # ?v=해시 로 요청되면 내용이 바뀔 일이 없으므로 길게 캐시
+        max_age = 31536000 if request.args.get("v") else 0
+        return send_file(io.BytesIO(image_cache[cached]), mimetype="image/jpeg",
+                         max_age=max_age, etag=image_versions.get(cached) or False)
     # 1) persistent 우선
     p = _safe_join(AD_DIR, rel)
     if p and os.path.exists(p):
@@ -328,16 +2104,100 @@ def serve_ad(rel):
 # ---- 광고 이미지 교체 mnt/data/ad_images로 끝  ----
 
 
+# ---- 이미지 용량 리포트 (메일 1통 / PDF 1건당 절감 바이트) ----
+def _base64_size(n):
+    # MIME base64: 3바이트 -> 4문자, 76문자마다 줄바꿈(\n)
+    encoded = 4 * ((n + 2) // 3)
+    return encoded + encoded // 76
+
+@app.get('/send/image_report')
+@operator_route('/image_report', methods=['GET'])
+def image_report():
+    ensure_images_fresh()
+    images = {
+        rel: {"original": orig, "optimized": opt, "saved": orig - opt}
+        for rel, (orig, opt) in sorted(image_sizes.items())
+    }
+
+    def size_of(rel):
+        # process_row와 같은 폴백 규칙(담당자 폴더 -> 공용)
+        if rel not in image_sizes:
+            rel = rel.split('/', 1)[-1]
+        return image_sizes.get(rel, (0, 0))
+
+    per_message = {}
+    for base in SENDER_KEYS:
+        for kind, last_ad in (("teacher", "ad2.jpg"), ("others", "ad3.jpg")):
+            rels = [f"{base}/logo01.jpg", f"{base}/ad1.jpg", f"{base}/{last_ad}"]
+            orig = sum(_base64_size(size_of(r)[0]) for r in rels)
+            opt = sum(_base64_size(size_of(r)[1]) for r in rels)
+            per_message[f"{base}/{kind}"] = {"original": orig, "optimized": opt, "saved": orig - opt}
+
+    seal_orig = os.path.getsize(SEAL_IMAGE) if os.path.exists(SEAL_IMAGE) else 0
+    seal_opt_path = optimized_seal_path()
+    seal_opt = os.path.getsize(seal_opt_path) if os.path.exists(seal_opt_path) else seal_orig
+
+    return jsonify({
+        "images": images,
+        "per_message": per_message,       # 메일 1통의 이미지 파트(base64 인코딩 후) 바이트
+        "per_pdf": {"seal_original": seal_orig, "seal_optimized": seal_opt, "saved": seal_orig - seal_opt},
+    })
+
+
 # ---- Core processor (per-operator) ----
-def process_excel_multi(sender_key, filepath):
+def _payroll_has_recipient(row):
+    # 이름이나 이메일 중 하나라도 있는 행 = 수신자 1명 (예약 분할 발송의 순번 기준)
+    for key in ('강사명', '직원명', '이메일'):
+        val = row.get(key)
+        if val is not None and pd.notna(val) and str(val).strip().lower() not in ('', 'nan', 'none', 'non'):
+            return True
+    return False
+
+def count_payroll_recipients(filepath):
+    excel_data = pd.read_excel(filepath, sheet_name=None, header=2)
+    total = 0
+    for df in excel_data.values():
+        df.columns = df.columns.str.strip()
+        total += sum(1 for _, row in df.iterrows() if _payroll_has_recipient(row))
+    return total
+
+def process_excel_multi(sender_key, filepath, send_date=None, image_mode=None, public_base_url=None,
+                        row_range=None, filename=None, report_id=None, state_key=None):
+    """
+    send_date/image_mode/public_base_url: 예약 발송에서 넘김 (없으면 업로드 시 저장한 runtime 값).
+    row_range=(start, stop): 수신자 순번(_payroll_has_recipient 기준) 중 이 범위만 발송.
+    report_id: 이어서 기록할 발송 기록 (예약 작업의 여러 묶음). 없으면 새로 만듦.
+    state_key: 진행 상태(중지 플래그, 발송 수)를 둘 runtime key. 예약 발송은 화면 발송과 섞이지 않게
+               따로 씀 (없으면 sender_key).
+    반환값: 발송 기록 id (/<key>/reports/<id>)
+    """
     # init runtime
-    runtime[sender_key]["sent_count"] = 0
-    runtime[sender_key]["sent_names"] = []
+    state = state_key or sender_key
+    runtime_reset(state)
+    ensure_images_fresh()
+    # 배치 동안 바뀌지 않는 값은 한 번만 읽어 둠
+    if send_date is not None:
+        send_date_str = send_date.strftime('%Y년 %m월 %d일')
+        send_date_iso_chosen = send_date.strftime('%Y-%m-%d')
+    else:
+        send_date_str = runtime_get(state, "send_date_str")
+        send_date_iso_chosen = runtime_get(state, "send_date_iso")
+    image_mode = image_mode or runtime_get(state, "image_mode", SENDER_CONF[sender_key]["image_mode"])
+    public_base_url = (public_base_url or runtime_get(state, "public_base_url")
+                       or os.environ.get("PUBLIC_BASE_URL", ""))
 
-    summary_by_sheet = {}
+    # 배치 시간 분해: 엑셀 읽기 / 템플릿 렌더 / 발송 / 속도 제어 대기
+    batch_timing = {"excel_read": 0.0, "render": 0.0, "send": 0.0, "sleep": 0.0}
+    batch_started = time.perf_counter()
 
     # header row at index 2 (3rd Excel row)
-    excel_data = pd.read_excel(filepath, sheet_name=None, header=2)
+    with timed("excel_read", file="payroll") as t:
+        excel_data = pd.read_excel(filepath, sheet_name=None, header=2)
+    batch_timing["excel_read"] += t["seconds"]
+
+    if report_id is None:
+        report_id = create_send_report(sender_key, filename=filename, send_date=send_date_iso_chosen,
+                                       image_mode=image_mode)
 
     def format_account_number(account_number):
         s = str(account_number or "").strip()
@@ -347,11 +2207,13 @@ def process_excel_multi(sender_key, filepath):
         # 4자리 그룹 하이픈
         return '-'.join([digits[i:i+4] for i in range(0, len(digits), 4)])
 
-    def process_row(row, template_name, sheet_summary):
+    # DELIVERY_ENGINE=async 이면 메일을 만들어 모아 두었다가 한 번에 동시 발송
+    async_jobs = [] if delivery_engine(sender_key) == "async" else None
+
+    def process_row(row, template_name, sheet_name):
         # stop check
-        with runtime[sender_key]["stop_lock"]:
-            if runtime[sender_key]["stop_requested"]:
-                return
+        if is_stop_requested(state):
+            return
 
         EMAIL_ADDRESS, APP_PASSWORD = _email_login_params(sender_key)
 
@@ -371,9 +2233,9 @@ def process_excel_multi(sender_key, filepath):
                 display_name = name if has_name else '이름 없음'
                 display_email = receiver if has_email else '이메일 없음'
                 msg = f"<span style='color:red;'>{display_name} - 이메일: {display_email}</span>"
-                with runtime[sender_key]["sent_count_lock"]:
-                    runtime[sender_key]["sent_names"].append(msg)
-                    sheet_summary.append(msg)
+                runtime_add(state, entry=msg)
+                record_send_result(report_id, sheet_name, "invalid", name, receiver,
+                                   error="이름 없음" if not has_name else "이메일 없음")
                 return
 
             job = str(row.get('학교명', '')).strip()
@@ -383,8 +2245,8 @@ def process_excel_multi(sender_key, filepath):
             account = format_account_number(account_src)
 
             # 업로드 폼에서 선택한 날짜(없으면 오늘)
-            send_date_display = runtime[sender_key].get("send_date_str") or now_kst().strftime('%Y년 %m월 %d일')
-            send_date_iso = runtime[sender_key].get("send_date_iso") or now_kst().strftime('%Y-%m-%d')
+            send_date_display = send_date_str or now_kst().strftime('%Y년 %m월 %d일')
+            send_date_iso = send_date_iso_chosen or now_kst().strftime('%Y-%m-%d')
 
 
             def safe_amount(_row, key):
@@ -439,12 +2301,28 @@ def process_excel_multi(sender_key, filepath):
 
             template_base = SENDER_CONF[sender_key]["template_base"]
 
+            # teacher vs others ad rule
+            # 담당자별 이미지 + 공용 폴백
+            base = sender_key  # 담당자 key (send01, send02 ...)
+            image_list = [
+                ('logo_image', f'{base}/logo01.jpg'),
+                ('ad1_image',   f'{base}/ad1.jpg'),
+                ('ad2_image',   f'{base}/ad2.jpg' if template_name == 'teacher.html' else f'{base}/ad3.jpg'),
+            ]
+
+            # 호스팅 모드: 템플릿이 /ad/ URL을 참조 (플래그된 수신자/템플릿은 CID 첨부로 폴백)
+            use_hosted = image_mode == "hosted" and not needs_cid_embedding(row, receiver, template_name)
+            for cid, rel in image_list:
+                src_key = cid.replace('_image', '_src')  # logo_src, ad1_src, ad2_src
+                context[src_key] = hosted_image_url(public_base_url, rel) if use_hosted else f"cid:{cid}"
+
             with app.app_context():
+                render_started = time.perf_counter()
                 html = render_email_template(template_base, template_name, context)
+                batch_timing["render"] += time.perf_counter() - render_started
 
                 from email.mime.multipart import MIMEMultipart
                 from email.mime.text import MIMEText
-                from email.mime.image import MIMEImage
 
                 msg = MIMEMultipart('related')
                 msg['Subject'] = f'[새담 지급명세서] {name}님 - {send_date_display}'
@@ -454,38 +2332,49 @@ def process_excel_multi(sender_key, filepath):
                 html_part = MIMEMultipart('alternative')
                 html_part.attach(MIMEText(html, 'html'))
                 msg.attach(html_part)
+                # 용량 집계: 메일 전체를 다시 직렬화하지 않고 본문 파트 + 이미지 파트(캐시된 크기)로 계산
+                html_bytes = len(html_part.as_bytes())
 
-                # teacher vs others ad rule
-
-                # 담당자별 이미지 첨부 + 공용 폴백
-                base = sender_key  # 'send01' 또는 'send02'
-                image_list = [
-                    ('logo_image', f'{base}/logo01.jpg'),
-                    ('ad1_image',   f'{base}/ad1.jpg'),
-                    ('ad2_image',   f'{base}/ad2.jpg' if template_name == 'teacher.html' else f'{base}/ad3.jpg'),
-                ]
+                # 1순위: 담당자 폴더 이미지, 2순위: 공용('logo01.jpg' 등)으로 폴백
+                image_bytes = 0
                 for cid, rel in image_list:
-                    # 1순위: 담당자 폴더 이미지, 2순위: 공용('logo01.jpg' 등)으로 폴백
-                    data = image_cache.get(rel)
-                    if data is None:
-                        fallback = rel.split('/', 1)[-1]  # 'logo01.jpg' 등
-                        data = image_cache.get(fallback)
-                    if data:
-                        mime_img = MIMEImage(data, _subtype='jpeg')
-                        mime_img.add_header('Content-ID', f'<{cid}>')
+                    mime_img = get_mime_image(rel, cid)
+                    if mime_img is None:
+                        continue
+                    image_bytes += mime_image_bytes[(rel, cid)]
+                    if not use_hosted:
                         msg.attach(mime_img)
 
-                with smtplib.SMTP_SSL('smtp.gmail.com', 465, timeout=60) as smtp:
-                    smtp.login(EMAIL_ADDRESS, APP_PASSWORD)
-                    smtp.send_message(msg)
-
-                with runtime[sender_key]["sent_count_lock"]:
-                    runtime[sender_key]["sent_names"].append(f"{job} - {name}")
-                    sheet_summary.append(f"{job} - {name}")
-                    runtime[sender_key]["sent_count"] += 1
+                def record_sent():
+                    # 방식별 용량 비교: 실제 보낸 크기 + 다른 방식이었다면의 크기
+                    msg_bytes = html_bytes if use_hosted else html_bytes + image_bytes
+                    runtime_add(
+                        state, entry=f"{job} - {name}",
+                        sent_count=1,
+                        bytes_sent=msg_bytes,
+                        bytes_cid=msg_bytes if not use_hosted else msg_bytes + image_bytes,
+                        bytes_hosted=msg_bytes if use_hosted else msg_bytes - image_bytes,
+                    )
+                    record_send_result(report_id, sheet_name, "sent", name, receiver, job)
+
+                # async 엔진: 발송은 모아서 deliver_batch가 처리, 완료 시 기록
+                if async_jobs is not None:
+                    async_jobs.append({
+                        "msg": msg, "from_addr": EMAIL_ADDRESS, "password": APP_PASSWORD,
+                        "label": name, "on_sent": record_sent,
+                        "result": (sheet_name, name, receiver, job),
+                    })
+                    return
+
+                with timed("mail_send", key=sender_key) as t:
+                    send_mail(sender_key, msg, EMAIL_ADDRESS, APP_PASSWORD)
+                batch_timing["send"] += t["seconds"]
+                record_sent()
 
         except Exception as e:
             print(f"❌ [{sender_key}] {row.get('강사명', row.get('직원명', '이름없음'))} 실패: {e}")
+            record_send_result(report_id, sheet_name, "failed", str(row.get('강사명', row.get('직원명', '')) or ''),
+                               str(row.get('이메일', '') or ''), error=str(e))
 
     # template rules
     template_rules = [
@@ -505,9 +2394,11 @@ def process_excel_multi(sender_key, filepath):
                     return tpl
         return DEFAULT_TEMPLATE
 
+    recipient_no = 0  # 시트를 넘어 이어지는 수신자 순번 (row_range 판정용)
+
 
     # --- 순차 발송 (속도 제어: 지연 + 지터 + 주기적 쿨다운) -------------------------------------
-    import time, random  # ✅ random 추가
+    import random  # ✅ random 추가 (time은 모듈 상단에서 import)
 
     # 기본 지연(초) + 지터(0~해당 값 무작위)
     SEND_DELAY_SEC  = float(os.environ.get("SEND_DELAY_SEC",  "4.0"))  # 권장 3.5~5
@@ -520,14 +2411,15 @@ def process_excel_multi(sender_key, filepath):
     def smart_sleep():
         """기본 지연 + 랜덤 지터"""
         d = SEND_DELAY_SEC + random.random() * max(0.0, SEND_JITTER_SEC)
-        try:
-            time.sleep(d)
-        except Exception:
-            pass
+        with timed("throttle_sleep", key=sender_key, kind="delay") as t:
+            try:
+                time.sleep(d)
+            except Exception:
+                pass
+        batch_timing["sleep"] += t["seconds"]
 
     for sheet_name, df in excel_data.items():
         df.columns = df.columns.str.strip()
-        sheet_summary = []
 
         # try to infer template from first raw row
         try:
@@ -548,11 +2440,22 @@ def process_excel_multi(sender_key, filepath):
 
         for _, row in df.iterrows():
             # 중단 요청 체크
-            with runtime[sender_key]["stop_lock"]:
-                if runtime[sender_key]["stop_requested"]:
-                    break
+            if is_stop_requested(state):
+                break
+
+            # 예약 분할 발송: 이번 묶음 범위 밖의 수신자는 건너뜀
+            if row_range is not None:
+                if not _payroll_has_recipient(row):
+                    continue
+                recipient_no += 1
+                if not (row_range[0] < recipient_no <= row_range[1]):
+                    continue
+
+            process_row(row, template_name, sheet_name)
 
-            process_row(row, template_name, sheet_summary)
+            # async 엔진은 발송 쪽에서 속도 제어 (async_pacing — gmail이면 같은 지연/쿨다운)
+            if async_jobs is not None:
+                continue
 
             # ① 기본 지연 + ② 지터
             smart_sleep()
@@ -560,102 +2463,723 @@ def process_excel_multi(sender_key, filepath):
             # ③ 주기적 쿨다운
             sent_since_cooldown += 1
             if COOLDOWN_EVERY > 0 and sent_since_cooldown >= COOLDOWN_EVERY:
+                with timed("throttle_sleep", key=sender_key, kind="cooldown") as t:
+                    try:
+                        time.sleep(COOLDOWN_SEC)
+                    except Exception:
+                        pass
+                batch_timing["sleep"] += t["seconds"]
+                sent_since_cooldown = 0
+
+    # async 엔진: 모든 시트의 메일을 계정 연결 풀로 동시 발송 (중단 플래그 연동)
+    if async_jobs:
+        def stop_check():
+            return is_stop_requested(state)
+
+        def on_result(job, error):
+            if error is None:
+                job["on_sent"]()
+            else:
+                print(f"❌ [{sender_key}] {job['label']} 실패: {error}")
+                sheet_name, name, receiver, school = job["result"]
+                record_send_result(report_id, sheet_name, "failed", name, receiver, school, error=str(error))
+
+        with timed("mail_send", key=sender_key, engine="async") as t:
+            deliver_batch(sender_key, async_jobs, stop_check=stop_check, on_result=on_result)
+        batch_timing["send"] += t["seconds"]
+
+    # 배치 요약 로그: 전체 시간 중 대기/발송 비율
+    batch_total = time.perf_counter() - batch_started
+    observe("payroll_batch", batch_total, key=sender_key)
+    log_event(
+        "payroll_batch", key=sender_key, sent=runtime_get(state, "sent_count", 0),
+        total_sec=round(batch_total, 2),
+        **{f"{k}_sec": round(v, 2) for k, v in batch_timing.items()},
+        **{f"{k}_pct": round(100 * v / batch_total, 1) if batch_total else 0 for k, v in batch_timing.items()},
+    )
+
+    finish_send_report(report_id, state, "stopped" if is_stop_requested(state) else "done")
+    return report_id
+
+
+# =============================
+# Send Reports (급여명세서 발송 기록)
+# =============================
+# 발송 결과를 배치(업로드 1건 / 예약 작업 1건)와 수신자별 행으로 runtime DB에 남김.
+# 결과 화면은 /<key>/reports/<id> 에서 페이지 나눔 + 상태/시트/검색 필터, 엑셀(.xlsx) 내려받기,
+# /<key>/reports 는 담당자별 지난 발송 목록. (브라우저 창을 닫아도 결과가 남음)
+SEND_RESULT_LABELS = {"sent": "발송", "failed": "실패", "invalid": "정보 누락"}
+SEND_REPORT_STATUS_LABELS = {"running": "발송 중", "done": "완료", "stopped": "중단"}
+SEND_REPORT_PAGE_SIZE = int(os.environ.get("SEND_REPORT_PAGE_SIZE", "100"))
+
+def create_send_report(key, filename=None, send_date=None, image_mode=None, dispatch_job=None):
+    with _runtime_db(write=True) as conn:
+        cur = conn.execute(
+            "INSERT INTO send_reports(key, filename, dispatch_job, send_date, image_mode, started, status) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'running')",
+            (key, filename, dispatch_job, send_date, image_mode, now_kst().isoformat(timespec="seconds")))
+        return cur.lastrowid
+
+def record_send_result(report_id, sheet, status, name="", email="", job="", error=None):
+    with _runtime_db() as conn:
+        conn.execute(
+            "INSERT INTO send_report_rows(report_id, sheet, name, email, job, status, error, ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (report_id, sheet, name, email, job, status, error, now_kst().isoformat(timespec="seconds")))
+
+def finish_send_report(report_id, key, status):
+    """배치 끝: 상태별 인원 다시 집계 + 이번 배치 발송 용량 누적 (예약 작업은 묶음마다 호출)."""
+    sizes = [runtime_get(key, f, 0) for f in ("bytes_sent", "bytes_cid", "bytes_hosted")]
+    with _runtime_db(write=True) as conn:
+        counts = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM send_report_rows WHERE report_id=? GROUP BY status", (report_id,)))
+        conn.execute(
+            "UPDATE send_reports SET status=?, finished=?, sent=?, failed=?, invalid=?, "
+            "bytes_sent=bytes_sent+?, bytes_cid=bytes_cid+?, bytes_hosted=bytes_hosted+? WHERE id=?",
+            (status, now_kst().isoformat(timespec="seconds"),
+             counts.get("sent", 0), counts.get("failed", 0), counts.get("invalid", 0), *sizes, report_id))
+
+def dispatch_report_id(job_id, key, filename=None, send_date=None, image_mode=None):
+    # 예약 작업은 여러 묶음이 한 기록에 이어서 쌓임
+    with _runtime_db() as conn:
+        row = conn.execute("SELECT id FROM send_reports WHERE dispatch_job=?", (job_id,)).fetchone()
+    if row:
+        return row[0]
+    return create_send_report(key, filename, send_date, image_mode, dispatch_job=job_id)
+
+def send_report(report_id, key=None):
+    with _runtime_db() as conn:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM send_reports WHERE id=?", (report_id,)).fetchone()
+    if row is None or (key is not None and row["key"] != key):
+        return None
+    return dict(row)
+
+def send_report_sheets(report_id):
+    """시트별 상태 인원: [(시트명, {status: n})] (발송 순서대로)"""
+    sheets = {}
+    with _runtime_db() as conn:
+        for sheet, status, n in conn.execute(
+                "SELECT sheet, status, COUNT(*) FROM send_report_rows WHERE report_id=? "
+                "GROUP BY sheet, status ORDER BY MIN(id)", (report_id,)):
+            sheets.setdefault(sheet, {})[status] = n
+    return list(sheets.items())
+
+def _send_report_where(report_id, status=None, sheet=None, q=None):
+    where, params = ["report_id=?"], [report_id]
+    if status:
+        where.append("status=?")
+        params.append(status)
+    if sheet:
+        where.append("sheet=?")
+        params.append(sheet)
+    if q:
+        where.append("(name LIKE ? OR email LIKE ? OR job LIKE ?)")
+        params += [f"%{q}%"] * 3
+    return " AND ".join(where), params
+
+def send_report_rows(report_id, status=None, sheet=None, q=None, page=1, per_page=SEND_REPORT_PAGE_SIZE):
+    """필터에 맞는 수신자 행 한 페이지 + 전체 건수."""
+    where, params = _send_report_where(report_id, status, sheet, q)
+    with _runtime_db() as conn:
+        conn.row_factory = sqlite3.Row
+        total = conn.execute(f"SELECT COUNT(*) FROM send_report_rows WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM send_report_rows WHERE {where} ORDER BY id LIMIT ? OFFSET ?",
+            params + [per_page, (page - 1) * per_page]).fetchall()
+    return [dict(r) for r in rows], total
+
+def send_report_history(key, page=1, per_page=SEND_REPORT_PAGE_SIZE):
+    with _runtime_db() as conn:
+        conn.row_factory = sqlite3.Row
+        total = conn.execute("SELECT COUNT(*) FROM send_reports WHERE key=?", (key,)).fetchone()[0]
+        rows = conn.execute("SELECT * FROM send_reports WHERE key=? ORDER BY id DESC LIMIT ? OFFSET ?",
+                            (key, per_page, (page - 1) * per_page)).fetchall()
+    return [dict(r) for r in rows], total
+
+def write_send_report_workbook(report_id, out, status=None, sheet=None, q=None):
+    """필터 적용한 수신자 결과를 엑셀로 (write_only — 행이 많아도 메모리 일정)."""
+    import openpyxl
+
+    where, params = _send_report_where(report_id, status, sheet, q)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("발송결과")
+    ws.append(["시트", "이름", "이메일", "학교", "결과", "사유", "시각"])
+    with _runtime_db() as conn:
+        for row in conn.execute(
+                f"SELECT sheet, name, email, job, status, error, ts FROM send_report_rows WHERE {where} ORDER BY id",
+                params):
+            sheet_name, name, email, job, result, error, ts = row
+            ws.append([sheet_name, name, email, job, SEND_RESULT_LABELS.get(result, result), error or "",
+                       ts.replace("T", " ")[:19]])
+    wb.save(out)
+
+SEND_REPORT_STYLE = """
+  <link href="https://fonts.googleapis.com/css2?family=Nanum+Gothic&display=swap" rel="stylesheet">
+  <style>
+    body { margin: 0; padding: 40px 32px; background: #f7f8fb; font-family: 'Nanum Gothic', sans-serif; color: #1f2937; }
+    .page { max-width: 1200px; margin: 0 auto; }
+    .title { font-size: 22px; font-weight: 800; color: #1f3c88; margin-bottom: 12px; }
+    .badge { display: inline-block; background: #eef2ff; color: #3730a3; border: 1px solid #c7d2fe;
+             padding: 4px 10px; border-radius: 999px; font-size: 13px; font-weight: 700; margin: 0 4px 6px 0; }
+    .badge.failed, .badge.invalid { background: #fee2e2; color: #b91c1c; border-color: #fecaca; }
+    .card { background: #fff; border: 1px solid #e5e7eb; border-radius: 12px; padding: 18px; margin: 14px 0;
+            box-shadow: 0 8px 24px rgba(15, 23, 42, 0.08); }
+    table { border-collapse: collapse; width: 100%; }
+    th, td { border-bottom: 1px solid #e5e7eb; padding: 6px 10px; font-size: 13px; text-align: left; }
+    tr.failed td, tr.invalid td { color: #b91c1c; }
+    .pager a, .pager b { margin: 0 4px; }
+    a { color: #1f3c88; }
+  </style>
+"""
+
+SEND_REPORT_HTML = """
+<!doctype html>
+<html lang="ko">
+<head>
+  <meta charset="utf-8">
+  <title>[지급명세서] 메일 발송 결과 #{{ report.id }}</title>
+""" + SEND_REPORT_STYLE + """
+</head>
+<body>
+<div class="page">
+  <div class="title">[지급명세서] 메일 발송 결과 #{{ report.id }}</div>
+  <div>
+    <span class="badge">{{ status_labels.get(report.status, report.status) }}</span>
+    <span class="badge">발송 {{ report.sent }}명</span>
+    {% if report.failed %}<span class="badge failed">실패 {{ report.failed }}명</span>{% endif %}
+    {% if report.invalid %}<span class="badge invalid">정보 누락 {{ report.invalid }}명</span>{% endif %}
+    <span class="badge">발송 용량 {{ '{:,.0f}'.format(report.bytes_sent / 1024) }}KB
+      (CID 첨부 {{ '{:,.0f}'.format(report.bytes_cid / 1024) }}KB / 호스팅 {{ '{:,.0f}'.format(report.bytes_hosted / 1024) }}KB)</span>
+  </div>
+  <p style="font-size:13px; color:#6b7280;">
+    {{ report.key }} · {{ report.filename or '' }} · 지급일 {{ report.send_date or '' }}
+    {% if report.dispatch_job %}· 예약 발송 #{{ report.dispatch_job }}{% endif %}
+    · {{ report.started[:16]|replace('T', ' ') }} ~ {{ (report.finished or '')[:16]|replace('T', ' ') }}
+  </p>
+
+  <div class="card">
+    <table>
+      <tr><th>시트</th>{% for s, label in labels.items() %}<th>{{ label }}</th>{% endfor %}</tr>
+      {% for sheet, counts in sheets %}
+      <tr>
+        <td><a href="{{ page_url(sheet=sheet, status='', page=1) }}">{{ sheet }}</a></td>
+        {% for s in labels %}
+        <td>{% if counts.get(s) %}<a href="{{ page_url(sheet=sheet, status=s, page=1) }}">{{ counts[s] }}</a>{% else %}0{% endif %}</td>
+        {% endfor %}
+      </tr>
+      {% else %}
+      <tr><td colspan="4">기록된 수신자가 없습니다.</td></tr>
+      {% endfor %}
+    </table>
+  </div>
+
+  <div class="card">
+    <form method="get" style="margin-bottom:12px;">
+      <select name="status">
+        <option value="">전체 결과</option>
+        {% for s, label in labels.items() %}<option value="{{ s }}" {{ 'selected' if filters.status == s }}>{{ label }}</option>{% endfor %}
+      </select>
+      <select name="sheet">
+        <option value="">전체 시트</option>
+        {% for sheet, _ in sheets %}<option value="{{ sheet }}" {{ 'selected' if filters.sheet == sheet }}>{{ sheet }}</option>{% endfor %}
+      </select>
+      <input type="text" name="q" value="{{ filters.q }}" placeholder="이름/이메일/학교 검색">
+      <button type="submit">조회</button>
+      <a href="/{{ report.key }}/reports/{{ report.id }}/download?{{ query }}">엑셀로 내려받기 ({{ total }}건)</a>
+    </form>
+    <table>
+      <tr><th>#</th><th>시트</th><th>이름</th><th>이메일</th><th>학교</th><th>결과</th><th>사유</th><th>시각</th></tr>
+      {% for r in rows %}
+      <tr class="{{ r.status }}">
+        <td>{{ (page - 1) * per_page + loop.index }}</td><td>{{ r.sheet }}</td><td>{{ r.name }}</td><td>{{ r.email }}</td>
+        <td>{{ r.job }}</td><td>{{ labels.get(r.status, r.status) }}</td><td>{{ r.error or '' }}</td>
+        <td>{{ r.ts[11:19] }}</td>
+      </tr>
+      {% else %}
+      <tr><td colspan="8">조건에 맞는 수신자가 없습니다.</td></tr>
+      {% endfor %}
+    </table>
+    <p class="pager">
+      {% if page > 1 %}<a href="{{ page_url(page=page - 1) }}">◀ 이전</a>{% endif %}
+      <b>{{ page }} / {{ pages }}</b>
+      {% if page < pages %}<a href="{{ page_url(page=page + 1) }}">다음 ▶</a>{% endif %}
+    </p>
+  </div>
+  <p><a href="/{{ report.key }}/reports">지난 발송 기록</a> · <a href="/{{ report.key }}">발송 페이지로 가기</a></p>
+</div>
+</body>
+</html>
+"""
+
+SEND_HISTORY_HTML = """
+<!doctype html>
+<html lang="ko">
+<head>
+  <meta charset="utf-8">
+  <title>[지급명세서] 발송 기록 ({{ sender_key }})</title>
+""" + SEND_REPORT_STYLE + """
+</head>
+<body>
+<div class="page">
+  <div class="title">[지급명세서] 발송 기록 ({{ sender_key }})</div>
+  <div class="card">
+    <table>
+      <tr><th>#</th><th>시작</th><th>파일</th><th>지급일</th><th>발송</th><th>실패</th><th>정보 누락</th><th>상태</th></tr>
+      {% for r in reports %}
+      <tr>
+        <td><a href="/{{ sender_key }}/reports/{{ r.id }}">{{ r.id }}</a></td>
+        <td>{{ r.started[:16]|replace('T', ' ') }}</td>
+        <td>{{ r.filename or '' }}{% if r.dispatch_job %} (예약 #{{ r.dispatch_job }}){% endif %}</td>
+        <td>{{ r.send_date or '' }}</td><td>{{ r.sent }}</td><td>{{ r.failed }}</td><td>{{ r.invalid }}</td>
+        <td>{{ status_labels.get(r.status, r.status) }}</td>
+      </tr>
+      {% else %}
+      <tr><td colspan="8">발송 기록이 없습니다.</td></tr>
+      {% endfor %}
+    </table>
+    <p class="pager">
+      {% if page > 1 %}<a href="?page={{ page - 1 }}">◀ 이전</a>{% endif %}
+      <b>{{ page }} / {{ pages }}</b>
+      {% if page < pages %}<a href="?page={{ page + 1 }}">다음 ▶</a>{% endif %}
+    </p>
+  </div>
+  <p><a href="/{{ sender_key }}">발송 페이지로 가기</a></p>
+</div>
+</body>
+</html>
+"""
+
+def _report_filters():
+    return {k: request.args.get(k, "").strip() for k in ("status", "sheet", "q")}
+
+@operator_route('/reports', methods=['GET'])
+def send_report_history_view():
+    sender_key = request.path.split('/')[1]
+    page = max(1, request.args.get("page", 1, type=int))
+    reports, total = send_report_history(sender_key, page)
+    return render_template_string(
+        SEND_HISTORY_HTML, sender_key=sender_key, reports=reports, page=page,
+        pages=max(1, -(-total // SEND_REPORT_PAGE_SIZE)), status_labels=SEND_REPORT_STATUS_LABELS)
+
+@operator_route('/reports/<int:report_id>', methods=['GET'])
+def send_report_view(report_id):
+    sender_key = request.path.split('/')[1]
+    report = send_report(report_id, sender_key)
+    if report is None:
+        abort(404)
+    filters = _report_filters()
+    page = max(1, request.args.get("page", 1, type=int))
+    rows, total = send_report_rows(report_id, page=page, **filters)
+
+    def page_url(**changes):
+        args = {**filters, "page": page, **changes}
+        return "?" + urlencode({k: v for k, v in args.items() if v})
+
+    return render_template_string(
+        SEND_REPORT_HTML, report=report, rows=rows, total=total, page=page, per_page=SEND_REPORT_PAGE_SIZE,
+        pages=max(1, -(-total // SEND_REPORT_PAGE_SIZE)), sheets=send_report_sheets(report_id),
+        filters=filters, page_url=page_url, query=urlencode({k: v for k, v in filters.items() if v}),
+        labels=SEND_RESULT_LABELS, status_labels=SEND_REPORT_STATUS_LABELS)
+
+@operator_route('/reports/<int:report_id>/download', methods=['GET'])
+def send_report_download(report_id):
+    sender_key = request.path.split('/')[1]
+    report = send_report(report_id, sender_key)
+    if report is None:
+        abort(404)
+    out = io.BytesIO()
+    write_send_report_workbook(report_id, out, **_report_filters())
+    out.seek(0)
+    return send_file(out, as_attachment=True, download_name=f"발송결과_{sender_key}_{report_id}.xlsx",
+                     mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+# =============================
+# Dispatch Scheduler (예약 발송 + 계정별 하루 한도에 맞춰 여러 날/시간대로 분산)
+# =============================
+# Gmail 계정은 하루 발송 수 제한이 있고 send01/send02 급여명세서와 증명서 메일이 같은 계정을 나눠 씀.
+# 업로드 폼에서 "예약 발송"을 고르면 엑셀을 보관해 두고, 지급일(send_date)+시각부터
+# 발송 시간대마다 남은 한도만큼씩 묶음(chunk)으로 나눠 보냄. 그날 한도가 차면 다음 날로 넘어감.
+#   MAIL_DAILY_QUOTA(_<KEY>) : 계정 하루 한도 (기본 450 — Gmail 500에서 여유)
+#   MAIL_QUOTA_RESERVE       : 예약 발송이 남겨 두는 몫 (증명서/관리자 알림용, 기본 30)
+#   DISPATCH_WINDOWS         : 발송 시간대 (기본 "09:00-12:00,13:00-18:00", KST)
+#   DISPATCH_SCHEDULER=0     : 이 프로세스에서는 예약 묶음을 실행하지 않음
+# 워커가 여러 개여도 묶음은 SQLite에서 planned → running 으로 먼저 바꾼 쪽만 실행.
+KST = ZoneInfo("Asia/Seoul")
+MAIL_QUOTA_RESERVE = int(os.environ.get("MAIL_QUOTA_RESERVE", "30"))
+DISPATCH_WINDOWS = os.environ.get("DISPATCH_WINDOWS", "09:00-12:00,13:00-18:00")
+DISPATCH_POLL_SEC = float(os.environ.get("DISPATCH_POLL_SEC", "30"))
+DISPATCH_MAX_DAYS = 60
+# running 상태로 이 시간 넘게 남은 묶음은 재시작 등으로 끊긴 것으로 봄
+DISPATCH_STALE_HOURS = float(os.environ.get("DISPATCH_STALE_HOURS", "12"))
+DISPATCH_DIR = os.path.join(UPLOAD_FOLDER_BASE, "scheduled")
+
+def mail_daily_quota(key):
+    return int(os.environ.get(f"MAIL_DAILY_QUOTA_{str(key).upper()}")
+               or tenant_conf(key).get("daily_quota")
+               or os.environ.get("MAIL_DAILY_QUOTA") or "450")
+
+def _dispatch_account(key):
+    return SENDER_CONF[key]["email"] or key
+
+def dispatch_windows():
+    windows = []
+    for part in DISPATCH_WINDOWS.split(","):
+        try:
+            start, end = (datetime.strptime(x.strip(), "%H:%M").time() for x in part.split("-"))
+        except ValueError:
+            continue
+        if start < end:
+            windows.append((start, end))
+    return windows or [(datetime.strptime("09:00", "%H:%M").time(), datetime.strptime("18:00", "%H:%M").time())]
+
+def _day_capacity(conn, key, account, day_iso):
+    # 예약 발송이 그날 더 쓸 수 있는 수 = 한도 - 남겨 둘 몫 - 이미 보낸 수 - 이미 잡힌 묶음
+    used = conn.execute("SELECT count FROM mail_usage WHERE account=? AND day=?", (account, day_iso)).fetchone()
+    planned = conn.execute(
+        "SELECT COALESCE(SUM(stop - start), 0) FROM dispatch_chunks "
+        "WHERE account=? AND day=? AND status IN ('planned', 'running')", (account, day_iso)).fetchone()
+    return mail_daily_quota(key) - MAIL_QUOTA_RESERVE - (used[0] if used else 0) - planned[0]
+
+def _plan_chunks(conn, key, job_id, start_dt, offset, total):
+    """
+    수신자 순번 (offset, total] 을 start_dt 이후의 발송 시간대에 나눠 묶음으로 저장.
+    하루 남은 한도를 그날 남은 시간대에 고르게 나눔. 반환: 배정된 마지막 순번.
+    """
+    account = _dispatch_account(key)
+    day = start_dt.date()
+    for _ in range(DISPATCH_MAX_DAYS):
+        if offset >= total:
+            break
+        cap = _day_capacity(conn, key, account, day.isoformat())
+        windows = [(max(datetime.combine(day, ws, tzinfo=KST), start_dt), datetime.combine(day, we, tzinfo=KST))
+                   for ws, we in dispatch_windows()]
+        windows = [w for w in windows if w[1] > start_dt]
+        if cap > 0 and windows:
+            per = -(-min(cap, total - offset) // len(windows))
+            for run_at, _ in windows:
+                n = min(per, cap, total - offset)
+                if n <= 0:
+                    break
+                conn.execute(
+                    "INSERT INTO dispatch_chunks(job_id, key, account, day, run_at, start, stop, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 'planned')",
+                    (job_id, key, account, day.isoformat(), run_at.isoformat(timespec="seconds"), offset, offset + n))
+                offset += n
+                cap -= n
+        day += timedelta(days=1)
+    return offset
+
+def schedule_dispatch(sender_key, filepath, filename, send_date, start_dt, image_mode, public_base_url):
+    """엑셀(이미 DISPATCH_DIR에 저장됨)을 예약 작업으로 등록. 반환: (job_id, 수신자 수)."""
+    total = count_payroll_recipients(filepath)
+    if total == 0:
+        raise ValueError("발송할 수신자가 없습니다.")
+    with _runtime_db(write=True) as conn:
+        job_id = conn.execute(
+            "INSERT INTO dispatch_jobs(key, file, filename, send_date, image_mode, public_base_url, total, "
+            "created, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'planned')",
+            (sender_key, filepath, filename, send_date.isoformat(), image_mode, public_base_url, total,
+             now_kst().isoformat(timespec="seconds"))).lastrowid
+        if _plan_chunks(conn, sender_key, job_id, start_dt, 0, total) < total:
+            # 예외 → 트랜잭션 롤백 (작업/묶음 모두 취소)
+            raise ValueError(f"{DISPATCH_MAX_DAYS}일 안에 한도 내로 보낼 수 없습니다. (수신자 {total}명)")
+    log_event("dispatch_scheduled", key=sender_key, job=job_id, total=total,
+              start=start_dt.isoformat(timespec="seconds"))
+    return job_id, total
+
+def _claim_due_chunk(now):
+    """실행할 묶음 1개를 running으로 바꿔 가져옴 (같은 담당자 묶음이 도는 중이면 기다림)."""
+    now_iso = now.isoformat(timespec="seconds")
+    stale_iso = (now - timedelta(hours=DISPATCH_STALE_HOURS)).isoformat(timespec="seconds")
+    with _runtime_db(write=True) as conn:
+        conn.execute("UPDATE dispatch_chunks SET status='interrupted', finished_at=? "
+                     "WHERE status='running' AND started_at < ?", (now_iso, stale_iso))
+        while True:
+            row = conn.execute(
+                "SELECT c.id, c.job_id, c.key, c.account, c.day, c.start, c.stop, "
+                "j.file, j.send_date, j.image_mode, j.public_base_url, j.filename "
+                "FROM dispatch_chunks c JOIN dispatch_jobs j ON j.id = c.job_id "
+                "WHERE c.status='planned' AND c.run_at <= ? "
+                "AND c.key NOT IN (SELECT key FROM dispatch_chunks WHERE status='running') "
+                "ORDER BY c.run_at, c.id LIMIT 1", (now_iso,)).fetchone()
+            if row is None:
+                return None
+            chunk = dict(zip(("id", "job_id", "key", "account", "day", "start", "stop",
+                              "file", "send_date", "image_mode", "public_base_url", "filename"), row))
+            # 실행 직전 한도 재확인: 증명서 메일 등으로 이미 많이 썼으면 되는 만큼만 보내고 나머지는 다시 배정
+            today = now.strftime('%Y-%m-%d')
+            used = conn.execute("SELECT count FROM mail_usage WHERE account=? AND day=?",
+                                (chunk["account"], today)).fetchone()
+            cap = max(0, mail_daily_quota(chunk["key"]) - MAIL_QUOTA_RESERVE - (used[0] if used else 0))
+            size = chunk["stop"] - chunk["start"]
+            if cap < size:
+                conn.execute("UPDATE dispatch_chunks SET stop=?, day=?, status=? WHERE id=?",
+                             (chunk["start"] + cap, today, "planned" if cap else "moved", chunk["id"]))
+                _plan_chunks(conn, chunk["key"], chunk["job_id"], now + timedelta(minutes=1),
+                             chunk["start"] + cap, chunk["stop"])
+                if not cap:
+                    continue
+                chunk["stop"] = chunk["start"] + cap
+            # 밀린 묶음(서버 중단 등)은 실제로 보내는 날로 옮겨 기록
+            conn.execute("UPDATE dispatch_chunks SET status='running', started_at=?, day=? WHERE id=?",
+                         (now_iso, today, chunk["id"]))
+            conn.execute("UPDATE dispatch_jobs SET status='running' WHERE id=?", (chunk["job_id"],))
+            return chunk
+
+def dispatch_state_key(key):
+    # 예약 발송 진행 상태는 화면 발송(runtime key = 담당자 key)과 따로 둠
+    return f"{key}:dispatch"
+
+def _run_dispatch_chunk(chunk):
+    key = chunk["key"]
+    state = dispatch_state_key(key)
+    status, sent = "done", 0
+    set_stop_requested(state, False)
+    report_id = None
+    try:
+        report_id = dispatch_report_id(chunk["job_id"], key, chunk["filename"], chunk["send_date"],
+                                       chunk["image_mode"])
+        with profile_job("payroll", key=key, dispatch=chunk["id"]):
+            process_excel_multi(
+                key, chunk["file"], send_date=datetime.strptime(chunk["send_date"], "%Y-%m-%d").date(),
+                image_mode=chunk["image_mode"], public_base_url=chunk["public_base_url"],
+                row_range=(chunk["start"], chunk["stop"]), report_id=report_id, state_key=state)
+        sent = runtime_get(state, "sent_count", 0)
+        if is_stop_requested(state):
+            status = "stopped"
+    except Exception as e:
+        status = "failed"
+        print(f"❌ [{key}] 예약 발송 묶음 #{chunk['id']} 실패: {e}")
+
+    finished = now_kst().isoformat(timespec="seconds")
+    with _runtime_db(write=True) as conn:
+        conn.execute("UPDATE dispatch_chunks SET status=?, sent=?, finished_at=? WHERE id=?",
+                     (status, sent, finished, chunk["id"]))
+        if status == "stopped":
+            # 발송 중단 버튼 = 이 작업의 남은 예약도 취소
+            conn.execute("UPDATE dispatch_chunks SET status='canceled' WHERE job_id=? AND status='planned'",
+                         (chunk["job_id"],))
+        left = conn.execute("SELECT COUNT(*) FROM dispatch_chunks WHERE job_id=? AND status IN ('planned', 'running')",
+                            (chunk["job_id"],)).fetchone()[0]
+        job_status = "stopped" if status == "stopped" else ("running" if left else "done")
+        current = conn.execute("SELECT status FROM dispatch_jobs WHERE id=?", (chunk["job_id"],)).fetchone()
+        if current and current[0] == "canceled":
+            # 도는 중에 취소된 작업은 이 묶음이 끝나도 '취소'로 남김
+            job_status = "canceled"
+        conn.execute("UPDATE dispatch_jobs SET status=? WHERE id=?", (job_status, chunk["job_id"]))
+        if report_id is not None:
+            # 발송 기록은 작업 단위 — 남은 묶음이 있으면 '발송 중'
+            conn.execute("UPDATE send_reports SET status=? WHERE id=?",
+                         ("stopped" if job_status == "canceled" else job_status, report_id))
+    if job_status != "running":
+        try:
+            os.remove(chunk["file"])
+        except OSError:
+            pass
+    log_event("dispatch_chunk", key=key, job=chunk["job_id"], chunk=chunk["id"], status=status,
+              sent=sent, planned=chunk["stop"] - chunk["start"])
+
+def run_due_dispatches(now=None, wait=False):
+    """때가 된 묶음 실행. 담당자별로 스레드 1개 (wait=True면 이 스레드에서 차례로 실행)."""
+    started = []
+    while True:
+        chunk = _claim_due_chunk(now or now_kst())
+        if chunk is None:
+            break
+        if wait:
+            _run_dispatch_chunk(chunk)
+        else:
+            threading.Thread(target=_run_dispatch_chunk, args=(chunk,),
+                             name=f"dispatch-{chunk['key']}", daemon=True).start()
+        started.append(chunk["id"])
+    return started
+
+def cancel_dispatch(job_id):
+    with _runtime_db(write=True) as conn:
+        conn.execute("UPDATE dispatch_chunks SET status='canceled' WHERE job_id=? AND status='planned'", (job_id,))
+        running = conn.execute("SELECT COUNT(*) FROM dispatch_chunks WHERE job_id=? AND status='running'",
+                               (job_id,)).fetchone()[0]
+        row = conn.execute("SELECT file FROM dispatch_jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return False
+        # 도는 중인 묶음은 끝까지 보내고, 그 묶음이 끝나면 작업이 닫힘
+        conn.execute("UPDATE dispatch_jobs SET status='canceled' WHERE id=? AND status IN ('planned', 'running')",
+                     (job_id,))
+    if not running:
+        try:
+            os.remove(row[0])
+        except OSError:
+            pass
+    return True
+
+_dispatch_thread = None
+
+def start_dispatch_scheduler():
+    global _dispatch_thread
+    with _init_lock:
+        if _dispatch_thread is not None:
+            return False
+
+        def loop():
+            while True:
+                time.sleep(DISPATCH_POLL_SEC)
+                if not os.path.exists(RUNTIME_DB):
+                    continue
                 try:
-                    time.sleep(COOLDOWN_SEC)
-                except Exception:
-                    pass
-                sent_since_cooldown = 0
+                    run_due_dispatches()
+                except Exception as e:
+                    print(f"⚠️ 예약 발송 확인 실패: {e}")
+
+        _dispatch_thread = threading.Thread(target=loop, name="dispatch-scheduler", daemon=True)
+        _dispatch_thread.start()
+        return True
+
+def dispatch_calendar(year, month):
+    """달력 칸(날짜)별 계정 발송량 + 예약/완료 묶음."""
+    import calendar
+
+    first = f"{year:04d}-{month:02d}-01"
+    last = f"{year:04d}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
+    with _runtime_db() as conn:
+        usage = conn.execute("SELECT day, account, count FROM mail_usage WHERE day BETWEEN ? AND ? ORDER BY account",
+                             (first, last)).fetchall()
+        chunks = conn.execute(
+            "SELECT c.day, c.run_at, c.key, c.job_id, c.start, c.stop, c.status, c.sent, j.filename "
+            "FROM dispatch_chunks c JOIN dispatch_jobs j ON j.id = c.job_id "
+            "WHERE c.day BETWEEN ? AND ? AND c.status != 'moved' ORDER BY c.run_at, c.id", (first, last)).fetchall()
+    days = {}
+    for day, account, count in usage:
+        days.setdefault(day, {"usage": [], "chunks": []})["usage"].append({"account": account, "count": count})
+    for day, run_at, key, job_id, start, stop, status, sent, filename in chunks:
+        days.setdefault(day, {"usage": [], "chunks": []})["chunks"].append({
+            "time": run_at[11:16], "key": key, "job": job_id, "size": stop - start,
+            "status": status, "sent": sent, "filename": filename,
+        })
+    weeks = [[(f"{year:04d}-{month:02d}-{d:02d}" if d else None) for d in week]
+             for week in calendar.Calendar(firstweekday=6).monthdayscalendar(year, month)]
+    return weeks, days
+
+def dispatch_jobs(limit=30):
+    with _runtime_db() as conn:
+        rows = conn.execute(
+            "SELECT j.id, j.key, j.filename, j.send_date, j.total, j.created, j.status, "
+            "COALESCE(SUM(c.sent), 0), MIN(CASE WHEN c.status='planned' THEN c.run_at END), "
+            "MAX(CASE WHEN c.status IN ('planned', 'running') THEN c.day END) "
+            "FROM dispatch_jobs j LEFT JOIN dispatch_chunks c ON c.job_id = j.id "
+            "GROUP BY j.id ORDER BY j.id DESC LIMIT ?", (limit,)).fetchall()
+    return [dict(zip(("id", "key", "filename", "send_date", "total", "created", "status",
+                      "sent", "next_run", "last_day"), r)) for r in rows]
+
+DISPATCH_STATUS_LABELS = {
+    "planned": "예정", "running": "발송 중", "done": "완료", "stopped": "중단",
+    "failed": "실패", "canceled": "취소", "interrupted": "끊김",
+}
 
-        # ⬅️ 이 시트 처리 결과 반영 (시트 루프 안쪽)
-        summary_by_sheet[sheet_name] = sheet_summary
-
-
-    # === 결과 HTML 생성 ===
-    result_html = f"""
-    <html>
-    <head>
-      <meta charset='UTF-8'>
-      <link href="https://fonts.googleapis.com/css2?family=Nanum+Gothic&display=swap" rel="stylesheet">
-      <style>
-        :root {{
-          --bg: #f7f8fb;
-          --card: #ffffff;
-          --border: #e5e7eb;
-          --text: #1f2937;
-          --muted: #6b7280;
-          --brand: #1f3c88;
-          --shadow: 0 8px 24px rgba(15, 23, 42, 0.08);
-        }}
-        * {{ box-sizing: border-box; }}
-        body {{
-          margin: 0; padding: 48px 32px;
-          background: var(--bg);
-          font-family: 'Nanum Gothic', sans-serif; color: var(--text);
-        }}
-        .page {{ max-width: 1440px; margin: 0 auto; }}
-        .header {{ display:flex; align-items:center; gap:12px; margin-bottom:18px; }}
-        .title {{ font-size: 22px; font-weight: 800; color: var(--brand); }}
-        .badge {{
-          display:inline-block; background:#eef2ff; color:#3730a3;
-          border:1px solid #c7d2fe; padding:4px 10px; border-radius:999px;
-          font-size:13px; font-weight:700;
-        }}
-        .card {{
-          background: var(--card); border: 1px solid var(--border);
-          border-radius: 12px; box-shadow: var(--shadow);
-          padding: 18px;
-        }}
-        .sheet {{
-          border: 1px solid var(--border);
-          border-radius: 10px; padding: 16px; margin: 14px 0; background:#fff;
-        }}
-        .sheet-title {{ font-size:16px; font-weight:700; margin-bottom:12px; }}
-        .names {{
-          display: grid;
-          grid-template-columns: repeat(auto-fill, minmax(220px, 1fr));
-          gap: 6px 18px;
-          align-items: start; justify-items: start;
-        }}
-        .name-item {{
-          font-size:14px; line-height:1.5; white-space: nowrap;
-          overflow: hidden; text-overflow: ellipsis;
-        }}
-        .actions {{ margin-top:22px; text-align:center; }}
-        .btn {{
-          display:inline-block; background: var(--brand); color:#fff;
-          padding:10px 16px; border-radius:8px; text-decoration:none;
-          border:1px solid #1f3c88;
-        }}
-        .btn:hover {{ opacity:.92; }}
-      </style>
-    </head>
-    <body>
-      <div class="page">
-        <div class="header">
-          <div class="title">[지급명세서] 메일 발송 결과</div>
-          <span class="badge">총 {runtime[sender_key]["sent_count"]}명</span>
-        </div>
+DISPATCH_CALENDAR_HTML = """
+<!doctype html>
+<html lang="ko">
+<head>
+  <meta charset="utf-8">
+  <title>예약 발송 달력</title>
+  <style>
+    body { font-family: 'Nanum Gothic', sans-serif; margin: 32px; color: #1f2937; background: #f7f8fb; }
+    h2 { color: #1f3c88; }
+    table.cal { border-collapse: collapse; width: 100%; table-layout: fixed; background: #fff; }
+    table.cal th, table.cal td { border: 1px solid #e5e7eb; vertical-align: top; padding: 6px; font-size: 12px; }
+    table.cal td { height: 96px; }
+    .date { font-weight: bold; margin-bottom: 4px; }
+    .today { background: #eef2ff; }
+    .usage { color: #6b7280; }
+    .chunk { margin-top: 3px; padding: 2px 4px; border-radius: 4px; background: #f3f4f6; }
+    .chunk.planned { background: #fef3c7; } .chunk.running { background: #dbeafe; }
+    .chunk.done { background: #dcfce7; } .chunk.failed, .chunk.stopped, .chunk.interrupted { background: #fee2e2; }
+    .chunk.canceled { text-decoration: line-through; }
+    table.jobs { border-collapse: collapse; margin-top: 24px; background: #fff; }
+    table.jobs th, table.jobs td { border: 1px solid #e5e7eb; padding: 6px 10px; font-size: 13px; }
+  </style>
+</head>
+<body>
+  <h2>📅 예약 발송 달력 ({{ year }}년 {{ month }}월)</h2>
+  <p>
+    <a href="?month={{ prev_month }}">◀ 이전 달</a> |
+    <a href="?month={{ next_month }}">다음 달 ▶</a> |
+    계정 하루 한도: {% for key, quota in quotas %}{{ key }} {{ quota }}통{% if not loop.last %}, {% endif %}{% endfor %}
+    (예약 발송은 {{ reserve }}통을 남겨 둠) · 발송 시간대 {{ windows }}
+    | {% for key in operators %}<a href="/{{ key }}">{{ key }}</a>{% if not loop.last %} · {% endif %}{% endfor %}
+  </p>
+  <table class="cal">
+    <tr>{% for w in "일월화수목금토" %}<th>{{ w }}</th>{% endfor %}</tr>
+    {% for week in weeks %}
+    <tr>
+      {% for day in week %}
+      <td class="{{ 'today' if day == today else '' }}">
+        {% if day %}
+          <div class="date">{{ day[8:]|int }}</div>
+          {% for u in days.get(day, {}).get('usage', []) %}
+            <div class="usage">✉️ {{ u.account }}: {{ u.count }}통</div>
+          {% endfor %}
+          {% for c in days.get(day, {}).get('chunks', []) %}
+            <div class="chunk {{ c.status }}" title="{{ c.filename }}">
+              {{ c.time }} {{ c.key }} #{{ c.job }} · {{ c.size }}명
+              {{ labels.get(c.status, c.status) }}{% if c.status in ('done', 'stopped', 'running') %} {{ c.sent }}명{% endif %}
+            </div>
+          {% endfor %}
+        {% endif %}
+      </td>
+      {% endfor %}
+    </tr>
+    {% endfor %}
+  </table>
+
+  <table class="jobs">
+    <tr><th>#</th><th>담당</th><th>파일</th><th>지급일</th><th>진행</th><th>다음 발송</th><th>마지막 예정일</th><th>상태</th><th></th></tr>
+    {% for j in jobs %}
+    <tr>
+      <td>{{ j.id }}</td><td>{{ j.key }}</td><td>{{ j.filename }}</td><td>{{ j.send_date }}</td>
+      <td>{{ j.sent }} / {{ j.total }}명</td><td>{{ (j.next_run or '')[:16]|replace('T', ' ') }}</td>
+      <td>{{ j.last_day or '' }}</td><td>{{ labels.get(j.status, j.status) }}</td>
+      <td>
+        {% if j.status in ('planned', 'running') %}
+        <form method="post" action="/dispatch/{{ j.id }}/cancel" onsubmit="return confirm('남은 예약 발송을 취소할까요?')">
+          <button type="submit">예약 취소</button>
+        </form>
+        {% endif %}
+      </td>
+    </tr>
+    {% else %}
+    <tr><td colspan="9">예약 발송 내역이 없습니다.</td></tr>
+    {% endfor %}
+  </table>
+</body>
+</html>
+"""
 
-        <div class="card">
-    """
-    for sheet, names in summary_by_sheet.items():
-        result_html += f"""
-          <div class="sheet">
-            <div class="sheet-title">시트명: {sheet} (총 {len(names)}명)</div>
-            <div class="names">
-        """
-        for entry in names:
-            result_html += f"<div class='name-item'>• {entry}</div>"
-        result_html += "</div></div>"
-
-    result_html += f"""
-        </div>
-      </div>
-      <br><img src="https://www.saedam.org/img_sub/logo.gif" alt="로고" style="display:block; margin:0 auto; height:48px; width:auto;"><br><br>
-    </body>
-    </html>
-    """
-    return result_html
+@app.get("/dispatch")
+def dispatch_calendar_view():
+    today = now_kst().date()
+    try:
+        year, month = (int(x) for x in request.args.get("month", "").split("-"))
+        datetime(year, month, 1)
+    except ValueError:
+        year, month = today.year, today.month
+    weeks, days = dispatch_calendar(year, month)
+    prev_y, prev_m = (year, month - 1) if month > 1 else (year - 1, 12)
+    next_y, next_m = (year, month + 1) if month < 12 else (year + 1, 1)
+    return render_template_string(
+        DISPATCH_CALENDAR_HTML, year=year, month=month, weeks=weeks, days=days, jobs=dispatch_jobs(),
+        today=today.isoformat(), labels=DISPATCH_STATUS_LABELS,
+        prev_month=f"{prev_y:04d}-{prev_m:02d}", next_month=f"{next_y:04d}-{next_m:02d}",
+        quotas=[(key, mail_daily_quota(key)) for key in SENDER_KEYS], reserve=MAIL_QUOTA_RESERVE,
+        operators=SENDER_KEYS,
+        windows=", ".join(f"{a:%H:%M}-{b:%H:%M}" for a, b in dispatch_windows()),
+    )
+
+@app.post("/dispatch/<int:job_id>/cancel")
+def dispatch_cancel(job_id):
+    cancel_dispatch(job_id)
+    return redirect(url_for("dispatch_calendar_view"))
 
 
 # =============================
@@ -664,59 +3188,135 @@ def process_excel_multi(sender_key, filepath):
 
 # wkhtmltopdf configuration (Render compatible)
 WKHTMLTOPDF_PATH = shutil.which("wkhtmltopdf") or "/usr/bin/wkhtmltopdf"
-config = pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_PATH)
-
-# PDF output folders
-pdf_folder1 = os.path.join(BASE_DIR, "output_pdfs01")
-pdf_folder2 = os.path.join(BASE_DIR, "output_pdfs02")
-os.makedirs(pdf_folder1, exist_ok=True)
-os.makedirs(pdf_folder2, exist_ok=True)
-
-# System passwords
-USER_PASSWORDS = {
-    "system01": os.environ.get("USER_PW_SYS01", "0070"),
-    "system02": os.environ.get("USER_PW_SYS02", "0070"),
-}
+config = None  # pdfkit 설정은 첫 PDF 생성(또는 warm-up) 때 만듦
 
-ADMIN_PASSWORDS = {
-    "system01": os.environ.get("ADMIN_PW_SYS01", "1900"),
-    "system02": os.environ.get("ADMIN_PW_SYS02", "8016"),
-}
+def _init_certificate():
+    global config
+    # PDF output folders (지점별 output_pdfsXX)
+    for system in CERT_SYSTEMS:
+        os.makedirs(pdf_dir(system), exist_ok=True)
+    config = pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_PATH)
+    optimized_seal_path()
 
-# Admin notification targets
-ADMIN_EMAILS = {
-    "system01": os.environ.get("ADMIN_EMAIL_SYS01", "edu197@naver.com"),
-    "system02": os.environ.get("ADMIN_EMAIL_SYS02", "comedu74@nate.com"),
-}
+_initializers["certificate"] = _init_certificate
+
+# System passwords / Admin notification targets (tenants.json 의 certificate_systems)
+USER_PASSWORDS = {system: conf["user_password"] for system, conf in CERT_SYSTEMS.items()}
+ADMIN_PASSWORDS = {system: conf["admin_password"] for system, conf in CERT_SYSTEMS.items()}
+ADMIN_EMAILS = {system: conf["admin_email"] for system, conf in CERT_SYSTEMS.items()}
+
+@app.url_value_preprocessor
+def _check_system(endpoint, values):
+    # /<system>/... 라우트는 등록된 지점만 (없는 지점 이름으로 파일이 생기지 않도록)
+    if values and "system" in values and values["system"] not in CERT_SYSTEMS:
+        abort(404)
 
 SEAL_IMAGE = "seal.gif"
 
+# 직인: 템플릿에서 본문(750px)의 17% ≈ 128px로 표시 → 인쇄 품질용으로 400px까지만 유지
+SEAL_MAX_WIDTH = 400
+SEAL_OPTIMIZED = os.path.join(BASE_DIR, "cache", "seal_opt.png")
+
+def optimized_seal_path():
+    """
+    직인 GIF를 표시 크기 PNG(투명 유지)로 1회 변환해 두고 그 경로를 반환.
+    원본이 더 최신이면 다시 만들고, Pillow가 없거나 실패하면 원본 경로를 반환.
+    """
+    src = os.path.abspath(SEAL_IMAGE)
+    if not Image:
+        return src
+    try:
+        if (os.path.exists(SEAL_OPTIMIZED)
+                and os.path.getmtime(SEAL_OPTIMIZED) >= os.path.getmtime(src)):
+            return os.path.abspath(SEAL_OPTIMIZED)
+
+        im = Image.open(src)
+        im = im.convert("RGBA")
+        if im.width > SEAL_MAX_WIDTH:
+            height = round(im.height * SEAL_MAX_WIDTH / im.width)
+            im = im.resize((SEAL_MAX_WIDTH, height), Image.LANCZOS)
+        # 팔레트로 다시 줄여 PNG 용량 최소화 (직인은 단색 계열이라 품질 손실 거의 없음)
+        im = im.quantize(colors=256, method=Image.FASTOCTREE)
+
+        os.makedirs(os.path.dirname(SEAL_OPTIMIZED), exist_ok=True)
+        tmp = SEAL_OPTIMIZED + ".tmp"
+        im.save(tmp, format="PNG", optimize=True)
+        if os.path.getsize(tmp) >= os.path.getsize(src):
+            os.remove(tmp)
+            return src
+        os.replace(tmp, SEAL_OPTIMIZED)
+        return os.path.abspath(SEAL_OPTIMIZED)
+    except Exception as e:
+        print(f"⚠️ 직인 최적화 실패(원본 사용): {e}")
+        return src
+
 # Issue number helpers
 
+try:
+    import fcntl
+except ImportError:  # Windows 로컬 실행: 프로세스 내 잠금만
+    fcntl = None
+
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+@contextmanager
+def _file_lock(lock_path):
+    """프로세스 내 스레드 잠금 + (가능하면) flock으로 워커 프로세스 간 잠금."""
+    with _file_locks_guard:
+        thread_lock = _file_locks.setdefault(lock_path, threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(lock_path, "a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
 def get_year_prefix():
     return now_kst().strftime('%y')
 
+def _issue_counter_path(year_prefix):
+    return os.path.join(BASE_DIR, f"last_number_{year_prefix}.txt")
+
+def peek_issue_numbers(n):
+    """다음에 나갈 발급번호 n개 (번호를 쓰지는 않음 — 초안 PDF 미리 만들기용)."""
+    year_prefix = get_year_prefix()
+    try:
+        with open(_issue_counter_path(year_prefix), 'r') as f:
+            last = int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        last = 0
+    return [f"제{year_prefix}-{last + i:04d}호" for i in range(1, n + 1)]
+
 def get_next_issue_number():
     year_prefix = get_year_prefix()
-    file_name = os.path.join(BASE_DIR, f"last_number_{year_prefix}.txt")
+    file_name = _issue_counter_path(year_prefix)
 
-    if not os.path.exists(file_name):
-        last = 0
-    else:
-        with open(file_name, 'r') as f:
-            try:
-                last = int(f.read().strip())
-            except ValueError:
-                last = 0
+    # 여러 워커/스레드가 동시에 발급해도 같은 번호가 나가지 않도록 읽기~쓰기 구간을 잠금
+    with _file_lock(file_name + ".lock"):
+        if not os.path.exists(file_name):
+            last = 0
+        else:
+            with open(file_name, 'r') as f:
+                try:
+                    last = int(f.read().strip())
+                except ValueError:
+                    last = 0
 
-    next_number = last + 1
-    with open(file_name, 'w') as f:
-        f.write(str(next_number))
+        next_number = last + 1
+        with open(file_name, 'w') as f:
+            f.write(str(next_number))
 
     return f"제{year_prefix}-{next_number:04d}호"
 
 
-def send_admin_notification(system, name, cert_type):
+def send_admin_notification(system, name, cert_type, duplicate_count=0):
+    from email.mime.text import MIMEText
+
     to_email = ADMIN_EMAILS.get(system)
     if not to_email:
         print(f"❌ 시스템에 맞는 이메일 없음: {system}")
@@ -724,29 +3324,188 @@ def send_admin_notification(system, name, cert_type):
 
     from_addr, from_pw = _system_email_login_params(system)
 
-    msg = MIMEText(
-        f"새담 홈페이지를 통해 새로운 강사 경력증명발급 신청이 접수되었습니다.\n\n시스템: {system}\n\n신청자: {name}\n\n증명서 종류: {cert_type}"
-    )
-    msg['Subject'] = f'[{system.upper()}] 새담 강사경력증명서 신청 알림 (신청자: {name})'
+    body = f"새담 홈페이지를 통해 새로운 강사 경력증명발급 신청이 접수되었습니다.\n\n시스템: {system}\n\n신청자: {name}\n\n증명서 종류: {cert_type}"
+    if duplicate_count:
+        body += f"\n\n※ 같은 내용의 기존 신청이 {duplicate_count}건 있습니다 (관리자 화면에서 '중복'으로 표시됨)."
+    msg = MIMEText(body)
+    msg['Subject'] = f'[{system.upper()}] 새담 강사경력증명서 신청 알림 (신청자: {name})' + (" [중복]" if duplicate_count else "")
     msg['From'] = from_addr
     msg['To'] = to_email
 
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-            smtp.login(from_addr, from_pw)
-            smtp.send_message(msg)
-            print(f"✅ 신청 알림 메일 전송됨: {to_email}")
+        deliver_mail(system, msg, from_addr, from_pw, priority="admin")
+        print(f"✅ 신청 알림 메일 전송됨: {to_email}")
     except Exception as e:
         print(f"❌ 메일 전송 실패: {e}")
 
 
+def read_submissions(data_path):
+    # 신청 목록(pending_submissions_XX.xlsx) 읽기 — 파일 크기에 따라 느려지므로 시간 측정
+    # 모든 칸을 문자열로 읽음: 빈 열(발급일 등)이 숫자형으로 잡혀 나중에 문자열을 못 넣는 문제 방지
+    with timed("excel_read", file=os.path.basename(data_path)):
+        df = pd.read_excel(data_path, dtype=str)
+    _refresh_submission_index(data_path, df)
+    return df
+
+
+def write_submissions(df, data_path):
+    with timed("excel_write", file=os.path.basename(data_path)):
+        df.to_excel(data_path, index=False)
+    _refresh_submission_index(data_path, df)
+    bump_submissions_version(data_path)
+
+
+# ---- 신청 목록 인덱스 (중복 신청 + 발급번호 조회) ----
+# 같은 사람이 같은 내용(성명, 주민번호, 증명서종류, 근무장소, 근무기간)으로 다시 신청하는 경우를 찾음.
+# 엑셀을 읽고/쓸 때마다 그 DataFrame으로 정규화 키 → 행 목록, 발급번호 → 발급 기록을 다시 만들어 두므로
+# submit/admin/generate/verify 는 dict 조회만 하면 됨. 파일이 다른 워커에서 바뀌면(mtime) 다음 읽기 때 갱신.
+#   DUPLICATE_POLICY=flag  (기본) 저장은 하되 신청자/관리자에게 중복임을 알림
+#   DUPLICATE_POLICY=merge 새 행을 만들지 않고 기존 신청으로 안내
+DUPLICATE_KEY_FIELDS = ("성명", "주민번호", "증명서종류", "근무장소", "근무시작일", "근무종료일")
+DUPLICATE_POLICY = os.environ.get("DUPLICATE_POLICY", "flag").strip().lower()
+
+_submission_index = {}   # data_path -> {"sig", "row_keys", "groups", "issued", "by_issue_no"}
+_submission_index_lock = threading.Lock()
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None
+
+def submission_keys(df):
+    """행별 정규화 키 (공백/대소문자/주민번호 하이픈/날짜 형식 차이 무시). 성명이 없으면 ""."""
+    parts = []
+    for col in DUPLICATE_KEY_FIELDS:
+        col_values = df[col] if col in df.columns else pd.Series("", index=df.index)
+        col_values = col_values.fillna("").astype(str).str.strip()
+        if col == "주민번호":
+            col_values = col_values.str.replace(r"\D", "", regex=True)
+        elif col in ("근무시작일", "근무종료일"):
+            col_values = col_values.str.slice(0, 10)     # "2020-01-01 00:00:00" → "2020-01-01"
+        else:
+            col_values = col_values.str.replace(r"\s+", "", regex=True).str.lower()
+        parts.append(col_values)
+    keys = parts[0]
+    for part in parts[1:]:
+        keys = keys + "|" + part
+    return keys.where(parts[0] != "", "")
+
+def submission_key(row):
+    return submission_keys(pd.DataFrame([row])).iloc[0]
+
+def normalize_issue_no(value):
+    """"제26-0001호" / "26-1" / "2026-0001" → "26-0001" (형식이 아니면 "")."""
+    m = re.search(r"(\d{2,4})\D+(\d{1,6})", str(value or ""))
+    return f"{m.group(1)[-2:]}-{int(m.group(2)):04d}" if m else ""
+
+def _refresh_submission_index(data_path, df):
+    keys = submission_keys(df).tolist()
+    groups, issued, by_issue_no = {}, {}, {}
+
+    def column(name):
+        return df[name].fillna("").astype(str).tolist() if name in df.columns else [""] * len(df)
+
+    status, issue_nos = column("상태"), column("발급번호")
+    names, cert_types, issued_dates = column("성명"), column("증명서종류"), column("발급일")
+    for i, key in enumerate(keys):
+        is_issued = status[i] == "발급완료" and issue_nos[i].strip()
+        if is_issued:
+            # 조회용으로 공개 가능한 최소 항목만 보관
+            by_issue_no.setdefault(normalize_issue_no(issue_nos[i]), []).append({
+                "발급번호": issue_nos[i].strip(), "성명": names[i].strip(), "증명서종류": cert_types[i].strip(),
+                "발급일": issued_dates[i][:10],
+            })
+        if not key:
+            continue
+        groups.setdefault(key, []).append(i)
+        if is_issued:
+            issued[key] = i       # 가장 최근(아래쪽) 발급 행
+    with _submission_index_lock:
+        _submission_index[data_path] = {
+            "sig": _file_signature(data_path), "row_keys": keys, "groups": groups, "issued": issued,
+            "by_issue_no": by_issue_no,
+        }
+
+def submission_index(data_path):
+    """최신 인덱스 반환 (파일이 바뀌었으면 다시 읽어서 갱신)."""
+    with _submission_index_lock:
+        index = _submission_index.get(data_path)
+    if index is None or index["sig"] != _file_signature(data_path):
+        read_submissions(data_path)
+        with _submission_index_lock:
+            index = _submission_index[data_path]
+    return index
+
+def find_duplicates(data_path, key):
+    """같은 키의 기존 행 번호들(원본 순서)."""
+    return list(submission_index(data_path)["groups"].get(key, [])) if key else []
+
+def issued_twin(data_path, df, original_index):
+    """이 행과 같은 내용으로 이미 발급된 다른 행 (없으면 None). df는 원본 순서."""
+    index = submission_index(data_path)
+    if original_index >= len(index["row_keys"]):
+        return None
+    key = index["row_keys"][original_index]
+    twin = index["issued"].get(key) if key else None
+    if twin is None or twin == original_index or twin >= len(df):
+        return None
+    return df.iloc[twin]
+
+def certificate_pdf_path(system, row):
+    cert_type = str(row.get("증명서종류", "증명서")).replace(" ", "")
+    return os.path.join(pdf_dir(system), f"{row['발급번호']}_{row['성명']}_{cert_type}.pdf")
+
+def submissions_lock(data_path):
+    """
+    신청 목록 읽기~쓰기 구간 잠금. 신청/수정/삭제/발급/일괄 등록/보관이 모두 같은 잠금을 써야
+    서로 읽은 뒤 덮어써서 행이 사라지는 일이 없음.
+    """
+    return _file_lock(data_path + ".lock")
+
+def locate_submission(df, row, hint):
+    """앞서 읽은 row가 지금 df(원본 순서)의 몇 번째 행인지 (hint 자리 먼저). 없으면 None."""
+    cols = [c for c in row.index if c in df.columns]
+    values = row[cols].fillna("").astype(str)
+    if 0 <= hint < len(df) and df.iloc[hint][cols].fillna("").astype(str).equals(values):
+        return hint
+    matches = (df[cols].fillna("").astype(str) == values).all(axis=1)
+    hits = matches.index[matches]
+    return int(hits[0]) if len(hits) else None
+
+def remove_certificate_pdfs(system, df, drop):
+    """
+    df(원본 순서)에서 지울 행들(drop)의 PDF 삭제. 남는 행이 같은 PDF를 가리키면
+    (같은 발급번호, 또는 재발송 행의 원발급번호) 지우지 않음.
+    """
+    drop = set(drop)
+    numbers = df["발급번호"].fillna("").astype(str).str.strip()
+    if "원발급번호" in df.columns:
+        numbers = numbers.where(numbers != "", df["원발급번호"].fillna("").astype(str).str.strip())
+    paths = {i: certificate_pdf_path(system, {**df.iloc[i], "발급번호": numbers.iloc[i]})
+             for i in range(len(df)) if numbers.iloc[i]}
+    kept = {path for i, path in paths.items() if i not in drop}
+    for i in sorted(drop):
+        path = paths.get(i)
+        if path is None:
+            continue
+        if path in kept:
+            print(f"ℹ️ 다른 신청이 같은 PDF를 가리켜 남겨 둠: {os.path.basename(path)}")
+        elif os.path.exists(path):
+            os.remove(path)
+            print(f"✅ 삭제됨: {os.path.basename(path)}")
+        else:
+            print(f"❌ PDF 없음: {os.path.basename(path)}")
+
+
 def ensure_data_file(data_path):
     if not os.path.exists(data_path):
-        pd.DataFrame(columns=[
+        write_submissions(pd.DataFrame(columns=[
             "신청일", "증명서종류", "성명", "주민번호", "자택주소",
             "근무시작일", "근무종료일", "근무장소", "강의과목", "용도", "직책",
             "이메일주소", "상태", "발급일", "발급번호", "종료사유"
-        ]).to_excel(data_path, index=False)
+        ]), data_path)
 
 
 def format_korean_date(date_str):
@@ -756,6 +3515,10 @@ def format_korean_date(date_str):
 
 
 def send_certificate_email(system, to_email, name, pdf_path, certificate_type):
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.mime.application import MIMEApplication
+
     from_addr, from_pw = _system_email_login_params(system)
 
     msg = MIMEMultipart()
@@ -768,12 +3531,11 @@ def send_certificate_email(system, to_email, name, pdf_path, certificate_type):
         part = MIMEApplication(f.read(), _subtype="pdf")
         part.add_header("Content-Disposition", "attachment", filename=os.path.basename(pdf_path))
         msg.attach(part)
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-        server.login(from_addr, from_pw)
-        server.send_message(msg)
+    deliver_mail(system, msg, from_addr, from_pw)
 
 
-def generate_pdf(row, issue_no, system):
+def render_certificate_html(row, issue_no, issued_on=None):
+    """certificate_template.html 렌더 (직인은 wkhtmltopdf가 읽을 절대 경로로)."""
     template_path = "certificate_template.html"
     with open(template_path, "r", encoding="utf-8") as f:
         template = Template(f.read())
@@ -788,64 +3550,209 @@ def generate_pdf(row, issue_no, system):
     else:
         masked_resident = resident_raw
 
-    html = template.render(
-        증명서종류=row.get("증명서종류", ""),
-        성명=row["성명"],
-        주민번호=masked_resident,
-        주소=row["자택주소"],
-        과목=row["강의과목"],
-        용도=row.get("용도", ""),
-        직책=row.get("직책", ""),
-        장소=row["근무장소"],
-        시작=fmt(row["근무시작일"]),
-        종료=fmt(row["근무종료일"]),
-        종료사유=row.get("종료사유", ""),
-        발급일자=now_kst().strftime("%Y년 %m월 %d일"),
-        발급번호=issue_no
-    )
+    with timed("template_render", template=template_path):
+        html = template.render(
+            증명서종류=row.get("증명서종류", ""),
+            성명=row["성명"],
+            주민번호=masked_resident,
+            주소=row["자택주소"],
+            과목=row["강의과목"],
+            용도=row.get("용도", ""),
+            직책=row.get("직책", ""),
+            장소=row["근무장소"],
+            시작=fmt(row["근무시작일"]),
+            종료=fmt(row["근무종료일"]),
+            종료사유=row.get("종료사유", ""),
+            발급일자=format_korean_date(str(issued_on)[:10]) if issued_on else now_kst().strftime("%Y년 %m월 %d일"),
+            발급번호=issue_no
+        )
 
     # Seal absolute path for wkhtmltopdf
-    seal_path = os.path.abspath(SEAL_IMAGE)
-    html = html.replace('src="seal.gif"', f'src="file:///{seal_path}"')
+    seal_path = optimized_seal_path()
+    return html.replace('src="seal.gif"', f'src="file:///{seal_path}"')
+
+def generate_pdf(row, issue_no, system, issued_on=None, output_dir=None):
+    """
+    증명서 PDF 생성. issued_on("YYYY-MM-DD")을 주면 그 날짜로 발급일자를 찍음(누락분 재생성용),
+    output_dir을 주면 output_pdfsXX 대신 그 폴더에 저장.
+    """
+    ensure_initialized("certificate")
+    html = render_certificate_html(row, issue_no, issued_on)
 
-    output_dir = os.path.join(BASE_DIR, f"output_pdfs{system[-2:]}")
+    output_dir = output_dir or pdf_dir(system)
     os.makedirs(output_dir, exist_ok=True)
     cert_type = row.get("증명서종류", "증명서").replace(" ", "")
     output_path = os.path.join(output_dir, f"{issue_no}_{row['성명']}_{cert_type}.pdf")
     options = {'enable-local-file-access': ''}
-    pdfkit.from_string(html, output_path, configuration=config, options=options)
+    with timed("pdf_render", system=system):
+        pdfkit.from_string(html, output_path, configuration=config, options=options)
     return output_path
 
 
-# ---- Convenience redirects for system roots ----
-@app.route("/system01/")
-def redirect_system01():
-    return redirect(url_for("form_login", system="system01"))
+# ---- 발급 전 초안 PDF (발급 때는 번호만 찍음) ----
+# 발급(generate) 시간의 대부분은 wkhtmltopdf 렌더링. 신청 저장(submit)·수정(update_submission) 직후
+# 백그라운드 스레드가 대기 행마다 발급번호 칸만 비운 초안 PDF(발급일자 = 오늘)를 draft_pdfsXX 에 만들고,
+# 다음에 나갈 발급번호 몇 개는 번호만 보이는 투명한 "번호 도장" PDF로 미리 만들어 둠
+# (번호 위치는 증명서종류 제목 줄에만 달려 있으므로 증명서종류별로 한 벌).
+# 발급 때는 초안 + 번호 도장을 pypdf로 겹치기만 함. 초안 이름이 행 내용·날짜·템플릿의 해시라
+# 수정됐거나 날짜가 지난 초안은 맞지 않아 평소대로 전체 렌더링하고, 다음 정리 때 지워짐
+# (삭제된 행, 발급된 행, 이미 쓴 번호의 도장도 같이 정리). pypdf 없거나 CERT_PRERENDER=0 이면 끔.
+CERT_PRERENDER = os.environ.get("CERT_PRERENDER", "1").strip() != "0"
+CERT_PRERENDER_MAX = int(os.environ.get("CERT_PRERENDER_MAX", "50"))      # 지점당 초안 최대 개수 (최근 신청부터)
+CERT_PRERENDER_STAMPS = int(os.environ.get("CERT_PRERENDER_STAMPS", "3"))  # 증명서종류별로 미리 찍어 둘 번호 수
+CERTIFICATE_FIELDS = ("증명서종류", "성명", "주민번호", "자택주소", "강의과목", "용도", "직책",
+                      "근무장소", "근무시작일", "근무종료일", "종료사유")
+
+DRAFT_STYLE = "<style>.code { visibility: hidden; }</style>"
+STAMP_STYLE = "<style>html, body { background: transparent; visibility: hidden; } .code { visibility: visible; }</style>"
+
+_prerender_pending = set()           # 초안 정리를 기다리는 지점
+_prerender_cond = threading.Condition()
+_prerender_thread = None
+_drafts_synced = {}                  # system -> 마지막으로 정리한 날짜
+
+def _certificate_template_sig():
+    return (_file_signature("certificate_template.html"), _file_signature(SEAL_IMAGE))
+
+def draft_pdf_path(system, row, issued_on):
+    values = [str(row.get(f, "")) for f in CERTIFICATE_FIELDS]
+    digest = hashlib.sha1(repr((values, issued_on, _certificate_template_sig())).encode("utf-8")).hexdigest()
+    return os.path.join(draft_dir(system), f"draft_{digest[:20]}.pdf")
+
+def stamp_pdf_path(system, cert_type, issue_no):
+    digest = hashlib.sha1(repr((str(cert_type), _certificate_template_sig())).encode("utf-8")).hexdigest()
+    return os.path.join(draft_dir(system), f"stamp_{digest[:12]}_{normalize_issue_no(issue_no)}.pdf")
+
+def _render_partial_pdf(html, style, output_path, system, **extra_options):
+    # 임시 파일에 렌더링 후 교체 → 발급 쪽에서 반쯤 쓴 파일을 볼 일이 없음
+    html = html.replace("</head>", style + "</head>", 1)
+    tmp_path = f"{output_path}.{uuid.uuid4().hex[:8]}.tmp"
+    options = {'enable-local-file-access': '', **extra_options}
+    try:
+        with timed("pdf_prerender", system=system):
+            pdfkit.from_string(html, tmp_path, configuration=config, options=options)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-@app.route("/system02/")
-def redirect_system02():
-    return redirect(url_for("form_login", system="system02"))
+def sync_drafts(system):
+    """대기 행의 초안 + 다음 번호 도장을 만들고, 더 이상 맞지 않는 파일은 지움. 반환: (새로 만든 수, 지운 수)"""
+    ensure_initialized("certificate")
+    data_path = submissions_path(system)
+    if not os.path.exists(data_path):
+        return 0, 0
+    folder = draft_dir(system)
+    os.makedirs(folder, exist_ok=True)
+    today = now_kst().strftime("%Y-%m-%d")
+    df = read_submissions(data_path)
+    pending = df[df["상태"] == "대기"].iloc[::-1].head(CERT_PRERENDER_MAX)
+
+    drafts, stamps = {}, {}
+    numbers = peek_issue_numbers(CERT_PRERENDER_STAMPS)
+    for _, row in pending.iterrows():
+        drafts.setdefault(draft_pdf_path(system, row, today), row)
+        for issue_no in numbers:
+            stamps.setdefault(stamp_pdf_path(system, row.get("증명서종류", ""), issue_no), (row, issue_no))
+
+    removed = 0
+    for fn in os.listdir(folder):
+        path = os.path.join(folder, fn)
+        if fn.endswith(".pdf") and path not in drafts and path not in stamps:
+            os.remove(path)
+            removed += 1
+
+    created = 0
+    for path, row in drafts.items():
+        if not os.path.exists(path):
+            _render_partial_pdf(render_certificate_html(row, numbers[0], today), DRAFT_STYLE, path, system)
+            created += 1
+    for path, (row, issue_no) in stamps.items():
+        if not os.path.exists(path):
+            _render_partial_pdf(render_certificate_html(row, issue_no, today), STAMP_STYLE, path, system,
+                                **{'no-background': ''})
+            created += 1
+    _drafts_synced[system] = today
+    if created or removed:
+        print(f"🗂️ [{system}] 초안 PDF 준비: 새로 {created}개, 정리 {removed}개 (대기 {len(pending)}건)")
+    return created, removed
+
+def _prerender_loop():
+    while True:
+        with _prerender_cond:
+            while not _prerender_pending:
+                _prerender_cond.wait()
+            system = _prerender_pending.pop()
+        try:
+            sync_drafts(system)
+        except Exception as e:
+            print(f"⚠️ [{system}] 초안 PDF 준비 실패: {e}")
+
+def schedule_prerender(system):
+    """초안 정리를 백그라운드에 맡김 (같은 지점 요청이 밀려 있으면 한 번으로 합침)."""
+    global _prerender_thread
+    if not CERT_PRERENDER or not pypdf:
+        return False
+    with _prerender_cond:
+        _prerender_pending.add(system)
+        if _prerender_thread is None:
+            _prerender_thread = threading.Thread(target=_prerender_loop, name="cert-prerender", daemon=True)
+            _prerender_thread.start()
+        _prerender_cond.notify()
+    return True
+
+def stamp_draft_pdf(row, issue_no, system, issued_on):
+    """초안 + 번호 도장 → 발급 PDF (output_pdfsXX). 둘 중 하나라도 없거나 실패하면 None (→ generate_pdf)."""
+    if not CERT_PRERENDER or not pypdf:
+        return None
+    draft_path = draft_pdf_path(system, row, issued_on)
+    stamp_path = stamp_pdf_path(system, row.get("증명서종류", ""), issue_no)
+    if not (os.path.exists(draft_path) and os.path.exists(stamp_path)):
+        return None
+    output_path = certificate_pdf_path(system, {**row, "발급번호": issue_no})
+    try:
+        with timed("pdf_stamp", system=system):
+            reader = pypdf.PdfReader(draft_path)
+            writer = pypdf.PdfWriter()
+            for i, page in enumerate(reader.pages):
+                if i == 0:
+                    page.merge_page(pypdf.PdfReader(stamp_path).pages[0])
+                writer.add_page(page)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, "wb") as f:
+                writer.write(f)
+    except Exception as e:
+        print(f"⚠️ [{system}] 초안 PDF 사용 실패, 전체 렌더링으로: {e}")
+        return None
+    for path in (draft_path, stamp_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return output_path
+
+
+# ---- Convenience redirects for system roots ----
+@app.route("/<system>/")
+def redirect_system(system):
+    return redirect(url_for("form_login", system=system))
 
 
 # ---- CRUD & Workflows ----
 @app.route('/<system>/update/<int:idx>', methods=['POST'])
 def update_submission(system, idx):
-    data_path = os.path.join(BASE_DIR, f"pending_submissions_{system[-2:]}.xlsx")
+    data_path = submissions_path(system)
     page = int(request.form.get("page", 1))
-    df = pd.read_excel(data_path)
-    df = df.iloc[::-1].reset_index(drop=True)
     form_data = dict(request.form)
 
-    # apply edits
-    for key in form_data:
-        df.at[idx, key] = form_data[key]
-
     # save in original order
-    original_df = pd.read_excel(data_path)
-    original_index = len(original_df) - 1 - idx
-    for key in form_data:
-        original_df.at[original_index, key] = form_data[key]
-    original_df.to_excel(data_path, index=False)
+    with submissions_lock(data_path):
+        original_df = read_submissions(data_path)
+        original_index = len(original_df) - 1 - idx
+        for key in form_data:
+            original_df.at[original_index, key] = form_data[key]
+        write_submissions(original_df, data_path)
+    schedule_prerender(system)
     flash('수정이 완료되었습니다')
     return redirect(url_for('admin', system=system, page=page))
 
@@ -853,34 +3760,27 @@ def update_submission(system, idx):
 @app.route('/<system>/delete/<int:idx>')
 def delete_submission_simple(system, idx):
     """Delete row AND corresponding PDF if exists (merged behavior)."""
-    data_path = os.path.join(BASE_DIR, f"pending_submissions_{system[-2:]}.xlsx")
+    data_path = submissions_path(system)
     page = int(request.args.get("page", 1))
-    df = pd.read_excel(data_path)
-    df = df.iloc[::-1].reset_index(drop=True)
-
-    # remove PDF if present
-    row = df.iloc[idx]
-    issue_no = str(row.get("발급번호", "")).strip()
-    name = str(row.get("성명", "")).strip()
-    cert_type = str(row.get("증명서종류", "증명서")).replace(" ", "")
-    pdf_dir = os.path.join(BASE_DIR, f"output_pdfs{system[-2:]}")
-    pdf_filename = f"{issue_no}_{name}_{cert_type}.pdf"
-    pdf_path = os.path.join(pdf_dir, pdf_filename)
-    if os.path.exists(pdf_path):
-        os.remove(pdf_path)
-
-    # drop row and save back in original order
-    df = df.drop(index=idx).reset_index(drop=True)
-    final_df = df.iloc[::-1].reset_index(drop=True)
-    final_df.to_excel(data_path, index=False)
+    with submissions_lock(data_path):
+        df = read_submissions(data_path)
+        df = df.iloc[::-1].reset_index(drop=True)
+
+        # remove PDF if present (다른 행이 같은 PDF를 쓰면 남김)
+        remove_certificate_pdfs(system, df, [idx])
+
+        # drop row and save back in original order
+        df = df.drop(index=idx).reset_index(drop=True)
+        final_df = df.iloc[::-1].reset_index(drop=True)
+        write_submissions(final_df, data_path)
+    schedule_prerender(system)
     return redirect(url_for('admin', system=system, page=page))
 
 
 @app.route('/<system>/submit', methods=['POST'])
 def submit(system):
-    data_path = os.path.join(BASE_DIR, f"pending_submissions_{system[-2:]}.xlsx")
+    data_path = submissions_path(system)
     ensure_data_file(data_path)
-    df = pd.read_excel(data_path)
 
     form_data = dict(request.form)
     form_data["근무종료일"] = "현재까지" if form_data.get("종료일선택") == "현재까지" else form_data.get("근무종료일", "")
@@ -897,22 +3797,260 @@ def submit(system):
         "이메일주소", "상태", "발급일", "발급번호", "종료사유"
     ]
 
-    if "종료사유" not in df.columns:
-        df["종료사유"] = ""
-
     row_data = {col: form_data.get(col, "") for col in ordered_fields}
     row_data["종료사유"] = 종료사유
 
-    df.loc[len(df)] = row_data
-    df.to_excel(data_path, index=False)
+    # 읽기~중복 확인~쓰기를 한 잠금 안에서 (동시에 들어온 신청/보관/일괄 등록과 섞이지 않도록)
+    with submissions_lock(data_path):
+        df = read_submissions(data_path)
+        if "종료사유" not in df.columns:
+            df["종료사유"] = ""
+
+        # 같은 내용의 기존 신청 (인덱스 조회 — 방금 읽은 df 기준)
+        duplicates = find_duplicates(data_path, submission_key(row_data))
+        duplicate_of = df.iloc[duplicates[-1]].fillna("").to_dict() if duplicates else None
+        merged = bool(duplicate_of) and DUPLICATE_POLICY == "merge"
+        if not merged:
+            df.loc[len(df)] = row_data
+            write_submissions(df, data_path)
 
     # keep user session authenticated
     session[f'user_authenticated_{system}'] = True
 
+    if merged:
+        # 새 행을 만들지 않고 기존 신청을 안내 (관리자 알림도 생략)
+        return render_template(system_template(system, "success.html"), system=system, duplicate_of=duplicate_of,
+                               merged=True, **row_data)
+
+    schedule_prerender(system)
+
     # notify admins
-    send_admin_notification(system, row_data["성명"], row_data["증명서종류"])
+    send_admin_notification(system, row_data["성명"], row_data["증명서종류"], duplicate_count=len(duplicates))
+
+    return render_template(system_template(system, "success.html"), system=system, duplicate_of=duplicate_of, **row_data)
+
+
+# ---- 신청 일괄 등록 (엑셀/CSV) ----
+# 오프라인으로 모은 신청을 한 명씩 다시 입력하지 않도록 파일 하나로 등록.
+# 검증·정규화는 열 단위로 한 번에(submit/신청서와 같은 규칙), 통과한 행은 잠금 안에서 한 번에 이어 쓰고
+# 관리자 알림은 건별이 아니라 요약 1통. action=check 면 점검 결과만 보여주고 저장하지 않음.
+IMPORT_CERT_TYPES = ("강사 활동증명서", "강사 해촉증명서")      # form.html 선택지
+IMPORT_END_REASONS = ("개인사정", "계약만료", "계약해지")       # 해촉증명서 계약종료사유
+IMPORT_COLUMN_ALIASES = {"이메일": "이메일주소", "주소": "자택주소", "과목": "강의과목", "근무학교": "근무장소",
+                         "증명용도": "용도", "계약종료사유": "종료사유", "종류": "증명서종류"}
+IMPORT_REQUIRED = ("성명", "자택주소", "근무장소", "강의과목", "용도", "직책")
+SUBMISSION_FIELDS = [
+    "신청일", "증명서종류", "성명", "주민번호", "자택주소",
+    "근무시작일", "근무종료일", "근무장소", "강의과목", "용도", "직책",
+    "이메일주소", "상태", "발급일", "발급번호", "종료사유"
+]
+
+def read_import_file(path):
+    """xlsx 또는 CSV(utf-8, 안 되면 cp949) → 모든 칸 문자열 DataFrame (열 이름 별칭 정리)."""
+    if path.lower().endswith(".csv"):
+        try:
+            df = pd.read_csv(path, dtype=str, encoding="utf-8-sig")
+        except UnicodeDecodeError:
+            df = pd.read_csv(path, dtype=str, encoding="cp949")
+    else:
+        df = pd.read_excel(path, dtype=str)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df.rename(columns={k: v for k, v in IMPORT_COLUMN_ALIASES.items() if v not in df.columns})
+
+def _import_dates(col):
+    # "2020-01-01 00:00:00" / "2020.1.1" / "2020년 1월 1일" → "2020-01-01" (못 읽으면 NaN)
+    s = col.str.replace(r"\s*(년|월)\s*", "-", regex=True).str.replace(r"\s*일\s*$", "", regex=True)
+    return pd.to_datetime(s.str.slice(0, 10).str.rstrip(". "), errors="coerce", format="mixed").dt.strftime("%Y-%m-%d")
+
+def validate_import_requests(df):
+    """
+    열 단위 검증/정규화. 반환: (저장할 행 DataFrame(SUBMISSION_FIELDS 순서), 제외 목록[{행, 성명, 사유}]).
+    행 번호는 엑셀 기준(헤더 1행 → 데이터는 2행부터).
+    """
+    df = df.reindex(columns=sorted(set(df.columns) | set(SUBMISSION_FIELDS) - {"신청일", "상태", "발급일", "발급번호"}))
+    df = df.fillna("").astype(str).apply(lambda c: c.str.strip())
+    df = df[(df != "").any(axis=1)]                                  # 완전히 빈 줄은 무시
+    reasons = pd.Series("", index=df.index)
+
+    def flag(mask, message):
+        nonlocal reasons
+        reasons = reasons.where(~mask, reasons + message + "; ")
+
+    for col in IMPORT_REQUIRED:
+        flag(df[col] == "", f"{col} 없음")
+
+    cert_key = df["증명서종류"].str.replace(r"\s+", "", regex=True)
+    known = {t.replace(" ", ""): t for t in IMPORT_CERT_TYPES}
+    df["증명서종류"] = cert_key.map(known).fillna(df["증명서종류"])
+    flag(~cert_key.isin(known), "증명서종류 확인")
+    dismissal = df["증명서종류"] == "강사 해촉증명서"
+
+    resident = df["주민번호"].str.replace(r"\D", "", regex=True)
+    flag(resident.str.len() != 13, "주민번호 형식")
+    df["주민번호"] = resident.str.slice(0, 6) + "-" + resident.str.slice(6)
+
+    email = (df["이메일주소"].str.normalize("NFKC").str.replace(r"\s+", "", regex=True)
+             .str.replace(r"^mailto:", "", case=False, regex=True).str.rstrip(".").str.lower())
+    flag(~email.str.fullmatch(EMAIL_RE.pattern), "이메일 형식")
+    df["이메일주소"] = email
+
+    start = _import_dates(df["근무시작일"])
+    flag(start.isna(), "근무시작일 형식")
+    until_now = df["근무종료일"].isin(["", "현재", "현재까지"])
+    end = _import_dates(df["근무종료일"])
+    flag(~until_now & end.isna(), "근무종료일 형식")
+    flag(~until_now & end.notna() & start.notna() & (end < start), "근무종료일이 시작일보다 빠름")
+    flag(dismissal & until_now, "해촉증명서는 근무종료일 필요")
+    df["근무시작일"] = start.fillna(df["근무시작일"])
+    df["근무종료일"] = end.where(~until_now, "현재까지").fillna(df["근무종료일"])
+
+    flag(dismissal & ~df["종료사유"].isin(IMPORT_END_REASONS), "종료사유 확인")
+    df["종료사유"] = df["종료사유"].where(dismissal, "")            # submit 과 같음: 해촉증명서만 보관
+
+    # 파일 안에서 같은 내용이 반복되면 첫 줄만
+    keys = submission_keys(df)
+    flag((keys != "") & keys.duplicated() & (reasons == ""), "파일 안 중복")
+
+    bad = reasons != ""
+    rejected = [{"행": int(i) + 2, "성명": name, "사유": reason.rstrip("; ")}
+                for i, name, reason in zip(df.index[bad], df.loc[bad, "성명"], reasons[bad])]
+    good = df[~bad].copy()
+    good["신청일"] = now_kst().strftime("%Y-%m-%d")
+    good["상태"] = "대기"
+    good["발급일"] = ""
+    good["발급번호"] = ""
+    return good[SUBMISSION_FIELDS].reset_index(drop=True), rejected
+
+def import_submissions(system, rows):
+    """검증된 행들을 잠금 안에서 한 번에 이어 씀. 반환: (저장 건수, 기존 신청과 중복 건수, 건너뛴 건수)"""
+    data_path = submissions_path(system)
+    ensure_data_file(data_path)
+    with submissions_lock(data_path):
+        df = read_submissions(data_path)
+        groups = submission_index(data_path)["groups"]
+        existing = submission_keys(rows).map(lambda k: bool(k) and k in groups)
+        skipped = 0
+        if DUPLICATE_POLICY == "merge":
+            skipped = int(existing.sum())
+            rows, existing = rows[~existing], existing[~existing]
+        if len(rows):
+            write_submissions(pd.concat([df, rows], ignore_index=True), data_path)
+    return len(rows), int(existing.sum()), skipped
+
+def send_import_notification(system, filename, imported, duplicate_count=0, names=()):
+    """일괄 등록 요약 알림 (건별 알림 대신 1통)."""
+    from email.mime.text import MIMEText
+
+    to_email = ADMIN_EMAILS.get(system)
+    if not to_email:
+        print(f"❌ 시스템에 맞는 이메일 없음: {system}")
+        return
+
+    from_addr, from_pw = _system_email_login_params(system)
+    preview = ", ".join(list(names)[:20]) + (f" 외 {len(names) - 20}명" if len(names) > 20 else "")
+    body = (f"새담 강사 경력증명발급 신청 {imported}건이 일괄 등록되었습니다.\n\n시스템: {system}\n\n"
+            f"파일: {filename}\n\n신청자: {preview}")
+    if duplicate_count:
+        body += f"\n\n※ 이 중 {duplicate_count}건은 같은 내용의 기존 신청이 있습니다 (관리자 화면에서 '중복'으로 표시됨)."
+    msg = MIMEText(body)
+    msg['Subject'] = f'[{system.upper()}] 새담 강사경력증명서 일괄 등록 알림 ({imported}건)'
+    msg['From'] = from_addr
+    msg['To'] = to_email
+
+    try:
+        deliver_mail(system, msg, from_addr, from_pw, priority="admin")
+        print(f"✅ 일괄 등록 알림 메일 전송됨: {to_email}")
+    except Exception as e:
+        print(f"❌ 메일 전송 실패: {e}")
+
+IMPORT_HTML = """
+<!doctype html>
+<html lang="ko">
+<head>
+  <meta charset="utf-8">
+  <title>신청 일괄 등록 ({{ system }})</title>
+  <style>
+    body { font-family: 'Nanum Gothic', sans-serif; margin: 32px; color: #1f2937; background: #f7f8fb; }
+    h2 { color: #1f3c88; }
+    .box { background: #fff; border: 1px solid #e5e7eb; border-radius: 10px; padding: 16px; margin: 12px 0; }
+    table { border-collapse: collapse; background: #fff; }
+    th, td { border: 1px solid #e5e7eb; padding: 6px 10px; font-size: 13px; }
+    .bad { color: #b91c1c; }
+  </style>
+</head>
+<body>
+  <h2>📥 신청 일괄 등록 ({{ system }})</h2>
+  <div class="box">
+    <form method="post" enctype="multipart/form-data">
+      <input type="file" name="file" accept=".xlsx,.csv" required>
+      <button type="submit" name="action" value="check">점검만</button>
+      <button type="submit" name="action" value="import">점검 후 등록</button>
+    </form>
+    <p style="font-size:13px; color:#6b7280;">
+      1행 헤더: {{ fields|join(', ') }} (근무종료일 비우면 '현재까지', 종료사유는 해촉증명서만).
+      증명서종류: {{ cert_types|join(' / ') }}
+    </p>
+  </div>
+  {% if result %}
+  <div class="box">
+    <b>{{ result.filename }}</b> — 통과 {{ result.ok }}건{% if result.rejected %}, <span class="bad">제외 {{ result.rejected|length }}건</span>{% endif %}
+    {% if result.imported is not none %}
+      → <b>{{ result.imported }}건 등록</b>{% if result.duplicates %} (기존 신청과 중복 {{ result.duplicates }}건){% endif %}
+      {% if result.skipped %}, 기존 신청이 있어 건너뜀 {{ result.skipped }}건{% endif %}
+    {% else %}
+      (점검만 — 저장하지 않음)
+    {% endif %}
+  </div>
+  {% if result.rejected %}
+  <table>
+    <tr><th>행</th><th>성명</th><th>사유</th></tr>
+    {% for r in result.rejected %}<tr><td>{{ r['행'] }}</td><td>{{ r['성명'] }}</td><td class="bad">{{ r['사유'] }}</td></tr>{% endfor %}
+  </table>
+  {% endif %}
+  {% endif %}
+  <p><a href="/{{ system }}/admin">관리자 화면으로</a></p>
+</body>
+</html>
+"""
+
+@app.route("/<system>/import", methods=["GET", "POST"])
+def import_requests(system):
+    if not session.get(f"{system}_authenticated"):
+        return redirect(url_for("admin", system=system))
+    page = dict(system=system, fields=[f for f in SUBMISSION_FIELDS if f not in ("신청일", "상태", "발급일", "발급번호")],
+                cert_types=IMPORT_CERT_TYPES, result=None)
+    if request.method == "GET":
+        return render_template_string(IMPORT_HTML, **page)
 
-    return render_template(f"{system}/success.html", system=system, **row_data)
+    up = request.files.get("file")
+    if not (up and up.filename.lower().endswith((".xlsx", ".csv"))):
+        flash("엑셀(.xlsx) 또는 CSV 파일만 올릴 수 있습니다.")
+        return redirect(url_for("import_requests", system=system))
+    import tempfile
+
+    suffix = os.path.splitext(up.filename)[1].lower()
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        up.save(tmp)
+    try:
+        with timed("certificate_import", system=system):
+            rows, rejected = validate_import_requests(read_import_file(tmp.name))
+    except Exception as e:
+        return f"파일을 읽는 중 오류 발생: {e}"
+    finally:
+        os.remove(tmp.name)
+
+    result = {"filename": up.filename, "ok": len(rows), "rejected": rejected,
+              "imported": None, "duplicates": 0, "skipped": 0}
+    if request.form.get("action") == "import" and len(rows):
+        result["imported"], result["duplicates"], result["skipped"] = import_submissions(system, rows)
+        if result["imported"]:
+            schedule_prerender(system)
+            send_import_notification(system, up.filename, result["imported"], result["duplicates"],
+                                     rows["성명"].tolist())
+    log_event("certificate_import", system=system, ok=len(rows), rejected=len(rejected),
+              imported=result["imported"] or 0, duplicates=result["duplicates"])
+    page["result"] = result
+    return render_template_string(IMPORT_HTML, **page)
 
 
 # ---- Auth gates ----
@@ -927,7 +4065,7 @@ def form_login(system):
             flash("비밀번호가 틀렸습니다.")
             return redirect(url_for('form_login', system=system))
 
-    return render_template(f"{system}/form_login.html", system=system, title="경력증명서 신청")
+    return render_template(system_template(system, "form_login.html"), system=system, title="경력증명서 신청")
 
 
 @app.route('/<system>/form_page', methods=['GET', 'POST'])
@@ -936,7 +4074,73 @@ def show_form(system):
         flash("접근 권한이 없습니다.")
         return redirect(url_for('form_login', system=system))
 
-    return render_template(f"{system}/form.html", system=system)
+    return render_template(system_template(system, "form.html"), system=system)
+
+
+# ---- 신청 목록 버전 + 관리자 화면 조건부 GET / 행 캐시 ----
+# 신청 목록을 저장(write_submissions)할 때마다 버전 +1 (runtime DB라 워커 간 공유).
+# 관리자 화면은 버전 + 파일 서명(앱 밖에서 엑셀을 고친 경우) + 페이지/쿼리 + 템플릿으로 ETag를 만들고,
+# 브라우저가 같은 ETag를 보내면 엑셀을 읽지 않고 304. 플래시 메시지가 있을 때는 항상 새로 그림.
+# 행 HTML(admin_row.html)은 행 내용·표시 위치별로 캐시해서 바뀐 행만 다시 렌더링.
+ADMIN_ROW_CACHE_MAX = int(os.environ.get("ADMIN_ROW_CACHE_MAX", "2000"))
+
+from collections import OrderedDict
+
+_admin_rows = OrderedDict()    # (템플릿, 서명, 행 내용, 위치...) -> 렌더링된 행 HTML
+_admin_rows_lock = threading.Lock()
+
+def _submissions_version_key(data_path):
+    return f"submissions:{os.path.basename(data_path)}"
+
+def bump_submissions_version(data_path):
+    runtime_add(_submissions_version_key(data_path), version=1)
+
+def submissions_version(data_path):
+    """(저장 횟수, 파일 서명) — 둘 중 하나라도 바뀌면 신청 목록이 바뀐 것."""
+    return (runtime_get(_submissions_version_key(data_path), "version", 0), _file_signature(data_path))
+
+def admin_etag(system, data_path, page):
+    templates = [system_template(system, name) for name in ("admin.html", "admin_row.html")]
+    parts = (system, page, submissions_version(data_path), sorted(request.args.items(multi=True)),
+             [_file_signature(os.path.join(app.root_path, t)) for t in templates])
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+# 행 HTML은 위치 값 자리에 표시만 남겨 캐시하고, 화면마다 실제 값으로 채움
+_ADMIN_ROW_SLOTS = ("idx", "pos", "page", "no")
+_admin_row_slot_re = re.compile("\x00(" + "|".join(_ADMIN_ROW_SLOTS) + ")\x00")
+
+def render_admin_rows(system, submissions, duplicates, page, total_count):
+    """
+    화면 행들의 HTML 목록. 캐시 키는 행 내용(+중복 표시)뿐이라 새 신청·삭제로 행이 밀려도 다시 렌더링하지 않음.
+    위치에 따라 바뀌는 값(idx 링크, 표시 번호, page)은 캐시된 HTML에 채워 넣음.
+    """
+    from markupsafe import Markup
+
+    name = system_template(system, "admin_row.html")
+    sig = _file_signature(os.path.join(app.root_path, name))
+    slots = {slot: Markup(f"\x00{slot}\x00") for slot in _ADMIN_ROW_SLOTS}
+    start = (page - 1) * 10
+    rows, rendered = [], 0
+    for pos, row in enumerate(submissions):
+        dup = duplicates[pos] if duplicates else None
+        idx = start + pos
+        key = (name, sig, system, tuple(row.items()), tuple(sorted(dup.items())) if dup else None)
+        with _admin_rows_lock:
+            html = _admin_rows.get(key)
+            if html is not None:
+                _admin_rows.move_to_end(key)
+        if html is None:
+            html = app.jinja_env.get_template(name).render(row=row, dup=dup, system=system, **slots)
+            rendered += 1
+            with _admin_rows_lock:
+                _admin_rows[key] = html
+                while len(_admin_rows) > ADMIN_ROW_CACHE_MAX:
+                    _admin_rows.popitem(last=False)
+        values = {"idx": idx, "pos": pos, "page": page, "no": total_count - idx}
+        rows.append(Markup(_admin_row_slot_re.sub(lambda m: str(values[m.group(1)]), html)))
+    if METRICS_JSON_LOG == "all":
+        log_event("admin_rows", system=system, page=page, rows=len(rows), rendered=rendered)
+    return rows
 
 
 @app.route("/<system>/admin", defaults={'page': 1}, methods=["GET", "POST"])
@@ -950,14 +4154,25 @@ def admin(system, page):
             return redirect(url_for("admin", system=system, page=page))
         else:
             flash("비밀번호가 틀렸습니다.")
-            return render_template(f"{system}/admin_login.html", system=system)
+            return render_template(system_template(system, "admin_login.html"), system=system)
 
     if not session.get(f"{system}_authenticated"):
-        return render_template(f"{system}/admin_login.html", system=system)
+        return render_template(system_template(system, "admin_login.html"), system=system)
 
-    data_path = os.path.join(BASE_DIR, f"pending_submissions_{system[-2:]}.xlsx")
+    maybe_archive(system)
+    if _drafts_synced.get(system) != now_kst().strftime("%Y-%m-%d"):
+        schedule_prerender(system)     # 날짜가 바뀌면 초안의 발급일자가 지났으므로 다시
+    data_path = submissions_path(system)
     ensure_data_file(data_path)
-    df = pd.read_excel(data_path)
+    has_flashes = bool(session.get("_flashes"))
+    etag = admin_etag(system, data_path, page)
+    if not has_flashes and request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    df = read_submissions(data_path)
     df = df.iloc[::-1].reset_index(drop=True)
 
     total_count = len(df)
@@ -969,9 +4184,27 @@ def admin(system, page):
     end = start + 10
     submissions = df.iloc[start:end].fillna("").to_dict(orient="records")
 
-    return render_template(
-        f"{system}/admin.html",
+    # 중복 신청 그룹 표시: 화면 행 → 원본 행 번호 → 같은 키의 행 수 / 이미 발급된 번호
+    index = submission_index(data_path)
+    duplicates = []
+    for display_idx in range(start, start + len(submissions)):
+        key = index["row_keys"][total_count - 1 - display_idx]
+        group = index["groups"].get(key, []) if key else []
+        twin = index["issued"].get(key) if len(group) > 1 else None
+        duplicates.append({
+            "count": len(group) if len(group) > 1 else 0,
+            # 행 위치가 아니라 내용 키로 이름을 붙여야 행 캐시(render_admin_rows)가 삭제·추가 뒤에도 맞음
+            "group": f"dup{hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:10]}" if len(group) > 1 else "",
+            "issued_no": df.iloc[total_count - 1 - twin]["발급번호"] if twin is not None else "",
+        })
+    duplicate_groups = sum(1 for g in index["groups"].values() if len(g) > 1)
+
+    response = app.make_response(render_template(
+        system_template(system, "admin.html"),
+        rows=render_admin_rows(system, submissions, duplicates, page, total_count),
         submissions=submissions,
+        duplicates=duplicates,
+        duplicate_groups=duplicate_groups,
         df=df,
         total_count=total_count,
         issued_count=issued_count,
@@ -979,7 +4212,12 @@ def admin(system, page):
         total_pages=total_pages,
         page=page,
         system=system
-    )
+    ))
+    # 플래시 메시지(alert)가 들어간 화면은 캐시 재사용하면 알림이 다시 뜨므로 ETag 없이
+    if not has_flashes:
+        response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
 
 @app.route("/<system>/bulk_delete", methods=["POST"])
@@ -992,28 +4230,20 @@ def bulk_delete(system):
         return redirect(url_for('admin', system=system, page=page))
 
     selected_indices = [int(i) for i in ids_str.split(',') if i.isdigit()]
-    data_path = os.path.join(BASE_DIR, f"pending_submissions_{system[-2:]}.xlsx")
-    pdf_folder = os.path.join(BASE_DIR, f"output_pdfs{system[-2:]}")
-
-    original_df = pd.read_excel(data_path)
-    total_len = len(original_df)
-
-    # map visible indices to original order
-    original_indices = [total_len - 1 - i for i in selected_indices]
-
-    for idx in sorted(original_indices, reverse=True):
-        row = original_df.iloc[idx]
-        pdf_filename = f"{row['발급번호']}_{row['성명']}_{row['증명서종류'].replace(' ', '')}.pdf"
-        pdf_path = os.path.join(pdf_folder, pdf_filename)
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
-            print(f"✅ 삭제됨: {pdf_filename}")
-        else:
-            print(f"❌ PDF 없음: {pdf_filename}")
-        original_df.drop(index=idx, inplace=True)
+    data_path = submissions_path(system)
 
-    original_df.reset_index(drop=True, inplace=True)
-    original_df.to_excel(data_path, index=False)
+    with submissions_lock(data_path):
+        original_df = read_submissions(data_path)
+        total_len = len(original_df)
+
+        # map visible indices to original order
+        original_indices = [total_len - 1 - i for i in selected_indices if 0 <= i < total_len]
+
+        remove_certificate_pdfs(system, original_df, original_indices)
+        original_df.drop(index=original_indices, inplace=True)
+        original_df.reset_index(drop=True, inplace=True)
+        write_submissions(original_df, data_path)
+    schedule_prerender(system)
 
     flash(f"{len(selected_indices)}건이 삭제되었습니다.")
     return redirect(url_for('admin', system=system, page=page))
@@ -1027,39 +4257,621 @@ def logout(system):
 
 @app.route('/<system>/pdf/<filename>')
 def download_pdf(system, filename):
-    pdf_dir = os.path.join(BASE_DIR, f"output_pdfs{system[-2:]}")
-    return send_from_directory(pdf_dir, filename)
+    return send_from_directory(pdf_dir(system), filename)
 
 
 @app.route("/<system>/generate/<int:idx>")
 def generate(system, idx):
-    data_path = os.path.join(BASE_DIR, f"pending_submissions_{system[-2:]}.xlsx")
+    data_path = submissions_path(system)
     page = int(request.args.get("page", 1))
     ensure_data_file(data_path)
-    df = pd.read_excel(data_path)
-    df = df.iloc[::-1].reset_index(drop=True)
-    row = df.iloc[idx]
-
-    issue_no = get_next_issue_number()
-    pdf_path = generate_pdf(row, issue_no, system)
+    df = read_submissions(data_path)
+    original_index = len(df) - 1 - idx
+    row = df.iloc[original_index]
+
+    # 같은 내용으로 이미 발급된 증명서가 있으면 새 번호를 쓰지 않고 그 PDF를 다시 보냄 (?force=1 이면 새로 발급)
+    # 재발송한 신청은 발급완료가 아니라 '재발송' + 원발급번호로 남김 (같은 번호의 발급완료 행은 하나뿐)
+    twin = None if request.args.get("force") == "1" else issued_twin(data_path, df, len(df) - 1 - idx)
+    resend = twin is not None and os.path.exists(certificate_pdf_path(system, twin))
+    if resend:
+        issue_no = twin["발급번호"]
+        pdf_path = certificate_pdf_path(system, twin)
+        flash(f"같은 내용으로 이미 발급된 {issue_no} 증명서를 다시 보냈습니다 (새 번호 미사용).")
+    else:
+        issue_no = get_next_issue_number()
+        pdf_path = stamp_draft_pdf(row, issue_no, system, now_kst().strftime("%Y-%m-%d")) \
+            or generate_pdf(row, issue_no, system)
+    issued_on = now_kst().strftime("%Y-%m-%d")
     send_certificate_email(system, row["이메일주소"], row["성명"], pdf_path, row["증명서종류"])
 
-    original_df = pd.read_excel(data_path)
-    original_index = len(original_df) - 1 - idx
-    original_df.at[original_index, "상태"] = "발급완료"
-    original_df.at[original_index, "발급일"] = now_kst().strftime("%Y-%m-%d")
-    original_df.at[original_index, "발급번호"] = issue_no
-    original_df.to_excel(data_path, index=False)
+    # PDF/메일은 잠금 밖에서, 상태 기록만 잠금 안에서 (그 사이 들어온 신청으로 행 위치가 바뀌었을 수 있어 다시 찾음)
+    with submissions_lock(data_path):
+        original_df = read_submissions(data_path)
+        original_index = locate_submission(original_df, row, original_index)
+        if original_index is None:
+            flash(f"{issue_no} 발송은 했지만, 그 사이 신청이 삭제/수정되어 상태를 저장하지 못했습니다.")
+            return redirect(url_for("admin", system=system, page=page))
+        if resend:
+            if "원발급번호" not in original_df.columns:
+                original_df["원발급번호"] = ""
+            original_df.at[original_index, "상태"] = "재발송"
+            original_df.at[original_index, "발급일"] = issued_on
+            original_df.at[original_index, "원발급번호"] = issue_no
+        else:
+            original_df.at[original_index, "상태"] = "발급완료"
+            original_df.at[original_index, "발급일"] = issued_on
+            original_df.at[original_index, "발급번호"] = issue_no
+        write_submissions(original_df, data_path)
+    schedule_prerender(system)     # 쓴 번호의 도장 정리 + 다음 번호 도장
 
     return redirect(url_for("admin", system=system, page=page))
 
 
+# ---- 발급번호 진위 확인 (공개) ----
+# 외부 기관이 "이 증명서가 실제로 발급됐는지" 확인하는 용도. 발급번호 인덱스 조회만 하고,
+# 공개 항목은 증명서종류/성명(가림)/발급일/PDF SHA-256 뿐 (주민번호·주소·이메일은 내보내지 않음).
+# 같은 번호 조회가 몰려도 VERIFY_CACHE_SEC 동안은 메모리 캐시 + HTTP 캐시로 응답.
+VERIFY_CACHE_SEC = int(os.environ.get("VERIFY_CACHE_SEC", "60"))
+VERIFY_CACHE_MAX = 4096
+
+_verify_cache = {}     # (system, 번호) -> (만료 시각, 인덱스 sig, 결과)
+_pdf_hash_cache = {}   # pdf 경로 -> (파일 sig, sha256)
+
+def mask_name(name):
+    name = str(name or "").strip()
+    if len(name) <= 1:
+        return name
+    if len(name) == 2:
+        return name[0] + "*"
+    return name[0] + "*" * (len(name) - 2) + name[-1]
+
+def _pdf_sha256(path):
+    sig = _file_signature(path)
+    if sig is None:
+        return ""
+    cached = _pdf_hash_cache.get(path)
+    if cached and cached[0] == sig:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    _pdf_hash_cache[path] = (sig, digest.hexdigest())
+    return digest.hexdigest()
+
+def verify_certificate(system, issue_no):
+    key = normalize_issue_no(issue_no)
+    data_path = submissions_path(system)
+    if not key or not os.path.exists(data_path):
+        return {"valid": False, "발급번호": str(issue_no or "")}
+
+    index = submission_index(data_path)
+    now = time.time()
+    cached = _verify_cache.get((system, key))
+    if cached and cached[0] > now and cached[1] == index["sig"]:
+        return cached[2]
+
+    records = index["by_issue_no"].get(key)
+    pdf_hash = None
+    if not records:
+        # 지난 연도 발급분은 연도별 보관 파일에서 (번호 앞 두 자리 = 발급 연도)
+        archived = load_archive(system, 2000 + int(key[:2]))
+        records = archived["by_issue_no"].get(key) if archived else None
+        if records:
+            pdf_hash = archived["pdf_sha256"](records[0])
+    if not records:
+        result = {"valid": False, "발급번호": str(issue_no)}
+    else:
+        record = records[0]
+        result = {
+            "valid": True,
+            "발급번호": record["발급번호"],
+            "증명서종류": record["증명서종류"],
+            "성명": mask_name(record["성명"]),
+            "발급일": record["발급일"],
+            "pdf_sha256": pdf_hash if pdf_hash is not None else _pdf_sha256(certificate_pdf_path(system, record)),
+        }
+    if len(_verify_cache) >= VERIFY_CACHE_MAX:
+        _verify_cache.clear()
+    _verify_cache[(system, key)] = (now + VERIFY_CACHE_SEC, index["sig"], result)
+    return result
+
+VERIFY_HTML = """
+<!doctype html><html lang="ko"><head><meta charset="utf-8"><title>증명서 진위 확인</title>
+<style>
+body{font-family:'Nanum Gothic',sans-serif;text-align:center;padding:60px 20px}
+.box{display:inline-block;border:2px solid #ccc;border-radius:12px;padding:30px 40px;background:#f8f8f8;text-align:left;min-width:380px}
+.ok{color:#1f7a1f}.no{color:#c0392b} code{font-size:12px;word-break:break-all}
+</style></head><body>
+<h2>(사)새담청소년교육문화원 증명서 진위 확인</h2>
+<form method="get"><input name="no" value="{{ no or '' }}" placeholder="예: 제25-0001호"> <button>조회</button></form><br>
+{% if result %}
+<div class="box">
+{% if result.valid %}
+  <p class="ok"><strong>✅ 발급된 증명서입니다.</strong></p>
+  <p>발급번호: {{ result.발급번호 }}</p>
+  <p>증명서 종류: {{ result.증명서종류 }}</p>
+  <p>성명: {{ result.성명 }}</p>
+  <p>발급일: {{ result.발급일 }}</p>
+  {% if result.pdf_sha256 %}<p>PDF SHA-256:<br><code>{{ result.pdf_sha256 }}</code></p>{% endif %}
+{% else %}
+  <p class="no"><strong>❌ 발급 기록이 없는 번호입니다: {{ result.발급번호 }}</strong></p>
+{% endif %}
+</div>
+{% endif %}
+</body></html>
+"""
+
+@app.get("/<system>/verify")
+@app.get("/<system>/verify/<path:issue_no>")
+def verify(system, issue_no=None):
+    if system not in ADMIN_PASSWORDS:
+        abort(404)
+    issue_no = issue_no or request.args.get("no", "").strip()
+    result = verify_certificate(system, issue_no) if issue_no else None
+    if request.args.get("format") == "json" or request.accept_mimetypes.best == "application/json":
+        if result is None:
+            return jsonify({"error": "발급번호(no)를 입력하세요"}), 400
+        response = jsonify(result)
+    else:
+        response = app.make_response(render_template_string(VERIFY_HTML, result=result, no=issue_no))
+    response.headers["Cache-Control"] = f"public, max-age={VERIFY_CACHE_SEC}"
+    return response
+
+
+# ---- 발급 PDF 묶음 내려받기 (ZIP 스트리밍) ----
+# 기간(발급일 from~to) 또는 관리자 화면에서 선택한 행의 PDF를 ZIP으로 묶어 바로 흘려보냄.
+# 파일 하나씩 읽어 조각 단위로 내보내므로 ZIP 전체를 메모리에 올리지 않음.
+# PDF가 없으면(디스크 교체 등) 원래 발급번호·발급일로 다시 만들어 넣고, 목록(manifest.xlsx)을 마지막에 추가.
+EXPORT_CHUNK = 256 * 1024
+
+class _ZipStream(io.RawIOBase):
+    """zipfile이 쓰는 바이트를 모아 두었다가 generator가 꺼내 가는 쓰기 전용 스트림 (seek 불가)."""
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _export_rows(system, date_from=None, date_to=None, selected=None):
+    """
+    내보낼 발급완료 행 목록 [(행 dict, 보관 연도 또는 None)].
+    selected: 관리자 화면 표시 순서 번호 목록 (bulk_delete 와 같은 규칙).
+    """
+    data_path = submissions_path(system)
+    frames = []
+    if os.path.exists(data_path):
+        df = read_submissions(data_path).fillna("")
+        if selected is not None:
+            df = df.iloc[[len(df) - 1 - i for i in selected if 0 <= i < len(df)]]
+        frames.append((df, None))
+    if selected is None and date_from:
+        # 기간이 지난 연도에 걸치면 보관분도 포함
+        for year in archive_years(system):
+            if int(date_from[:4]) <= year <= int((date_to or "9999")[:4]):
+                frames.append((load_archive(system, year)["df"], year))
+    rows = []
+    for df, year in frames:
+        issued = df[(df["상태"] == "발급완료") & (df["발급번호"].str.strip() != "")]
+        if date_from:
+            issued = issued[issued["발급일"].str.slice(0, 10) >= date_from]
+        if date_to:
+            issued = issued[issued["발급일"].str.slice(0, 10) <= date_to]
+        rows.extend((record, year) for record in issued.to_dict(orient="records"))
+    rows.sort(key=lambda item: (item[0]["발급일"], item[0]["발급번호"]))
+    return rows
+
+def stream_certificate_zip(system, rows):
+    """(행, 보관 연도) 목록 → ZIP 바이트 조각 generator."""
+    import tempfile
+
+    sink = _ZipStream()
+    manifest = []
+    with tempfile.TemporaryDirectory(prefix="export_") as tmp_dir:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+            for row, year in rows:
+                pdf_path = certificate_pdf_path(system, row)
+                name = os.path.basename(pdf_path)
+                status = "포함"
+                try:
+                    if year is not None and name in load_archive(system, year)["pdf_names"]:
+                        with zipfile.ZipFile(archive_path(system, year)) as archived:
+                            data = archived.read(f"pdfs/{name}")
+                        source = io.BytesIO(data)
+                    else:
+                        if not os.path.exists(pdf_path):
+                            # 누락분은 원래 번호/발급일로 재생성 (보관분은 임시 폴더에)
+                            pdf_path = generate_pdf(row, row["발급번호"], system, issued_on=row["발급일"],
+                                                    output_dir=tmp_dir if year is not None else None)
+                            status = "재생성"
+                        source = open(pdf_path, "rb")
+                    with source, zf.open(zipfile.ZipInfo(f"pdfs/{name}", date_time=now_kst().timetuple()[:6]), "w") as dest:
+                        for chunk in iter(lambda: source.read(EXPORT_CHUNK), b""):
+                            dest.write(chunk)
+                            yield sink.drain()
+                except Exception as e:
+                    status = f"실패: {e}"
+                    print(f"❌ [{system}] 내보내기 실패 {name}: {e}")
+                manifest.append({
+                    "발급번호": row["발급번호"], "성명": row["성명"], "증명서종류": row["증명서종류"],
+                    "발급일": row["발급일"][:10], "신청일": row["신청일"], "근무장소": row["근무장소"],
+                    "파일명": name, "보관연도": year or "", "처리": status,
+                })
+                yield sink.drain()
+
+            buff = io.BytesIO()
+            pd.DataFrame(manifest, columns=["발급번호", "성명", "증명서종류", "발급일", "신청일", "근무장소",
+                                            "파일명", "보관연도", "처리"]).to_excel(buff, index=False)
+            zf.writestr(zipfile.ZipInfo("manifest.xlsx", date_time=now_kst().timetuple()[:6]), buff.getvalue(),
+                        compress_type=zipfile.ZIP_DEFLATED)
+        yield sink.drain()
+    log_event("certificate_export", system=system, files=len(manifest),
+              regenerated=sum(1 for m in manifest if m["처리"] == "재생성"),
+              failed=sum(1 for m in manifest if m["처리"].startswith("실패")))
+
+@app.route("/<system>/export", methods=["GET", "POST"])
+def export_certificates(system):
+    if not session.get(f"{system}_authenticated"):
+        return redirect(url_for("admin", system=system))
+    values = request.values
+    ids = values.get("selected_ids", "")
+    selected = [int(i) for i in ids.split(",") if i.strip().isdigit()] if ids else None
+    date_from = values.get("from", "").strip()[:10] or None
+    date_to = values.get("to", "").strip()[:10] or None
+    if selected is None and not (date_from or date_to):
+        flash("기간을 입력하거나 내려받을 항목을 선택하세요.")
+        return redirect(url_for("admin", system=system))
+
+    rows = _export_rows(system, date_from, date_to, selected)
+    if not rows:
+        flash("조건에 맞는 발급완료 증명서가 없습니다.")
+        return redirect(url_for("admin", system=system))
+
+    label = f"{date_from or ''}_{date_to or ''}" if selected is None else f"선택{len(rows)}건"
+    filename = f"{system}_증명서_{label}.zip"
+    from urllib.parse import quote
+    return Response(
+        stream_with_context(stream_certificate_zip(system, rows)),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=\"{system}_certificates.zip\"; filename*=UTF-8''{quote(filename)}"},
+    )
+
+
+# ---- 인쇄용 묶음 PDF (여러 장을 wkhtmltopdf 한 번으로) ----
+# 종이 발급 때 한 명씩 PDF를 만들면 사람마다 wkhtmltopdf를 새로 띄움(시작·폰트·직인 로딩 반복).
+# 발급완료 행들을 한 HTML 문서의 페이지로 이어 붙여 한 번에 렌더하고, 신청자마다 책갈피(outline)를 닮.
+# split=1 이면 책갈피 기준으로 다시 잘라 개별 PDF도 함께 줌 (pypdf 없으면 개별 PDF는 한 명씩 생성).
+CERT_PRINT_MAX = int(os.environ.get("CERT_PRINT_MAX", "300"))  # 한 문서에 넣을 최대 인원
+
+CERT_PRINT_STYLE = """
+<style>
+  body { max-width: none; margin: 0; padding: 0; }
+  .cert-page { max-width: 750px; margin: auto; padding: 50px; page-break-after: always; }
+  .cert-page:last-child { page-break-after: auto; }
+  h1.bookmark { font-size: 1px; line-height: 0; height: 0; margin: 0; padding: 0; border: 0; color: #fff; }
+</style>
+"""
+
+def render_certificate_batch_html(rows):
+    """발급완료 행들 → 한 문서 (신청자마다 .cert-page 한 덩어리 + 책갈피용 h1)."""
+    from markupsafe import escape
+
+    head, pages = None, []
+    for row in rows:
+        html = render_certificate_html(row, row["발급번호"], row["발급일"])
+        if head is None:
+            head = html[:html.index("</head>")] + CERT_PRINT_STYLE + "</head>"
+        body = re.search(r"<body[^>]*>(.*)</body>", html, re.S).group(1)
+        title = escape(f"{row['성명']} ({row['발급번호']})")
+        pages.append(f'<div class="cert-page"><h1 class="bookmark">{title}</h1>{body}</div>')
+    return f"{head}<body>{''.join(pages)}</body></html>"
+
+def generate_batch_pdf(rows, system, output_path):
+    """rows(발급완료 행 dict) 전체를 PDF 하나로. 반환: output_path"""
+    ensure_initialized("certificate")
+    html = render_certificate_batch_html(rows)
+    options = {'enable-local-file-access': '', 'outline': '', 'outline-depth': '1'}
+    with timed("pdf_render", system=system, batch="print"):
+        pdfkit.from_string(html, output_path, configuration=config, options=options)
+    return output_path
+
+def split_batch_pdf(batch_path, rows, system, output_dir):
+    """묶음 PDF를 책갈피(신청자 시작 페이지) 기준으로 개별 PDF로 나눔. 반환: 파일 경로 목록"""
+    paths = [os.path.join(output_dir, os.path.basename(certificate_pdf_path(system, row))) for row in rows]
+    starts = None
+    if pypdf:
+        reader = pypdf.PdfReader(batch_path)
+        starts = [reader.get_destination_page_number(d) for d in reader.outline if not isinstance(d, list)]
+    if starts is None or len(starts) != len(rows):
+        # pypdf 없음 / 책갈피를 못 읽음(outline 미지원 wkhtmltopdf) → 한 명씩 생성
+        return [generate_pdf(row, row["발급번호"], system, issued_on=row["발급일"], output_dir=output_dir)
+                for row in rows]
+    for i, path in enumerate(paths):
+        writer = pypdf.PdfWriter()
+        for page in reader.pages[starts[i]:starts[i + 1] if i + 1 < len(starts) else len(reader.pages)]:
+            writer.add_page(page)
+        with open(path, "wb") as f:
+            writer.write(f)
+    return paths
+
+@app.route("/<system>/print", methods=["GET", "POST"])
+def print_certificates(system):
+    if not session.get(f"{system}_authenticated"):
+        return redirect(url_for("admin", system=system))
+    values = request.values
+    ids = values.get("selected_ids", "")
+    selected = [int(i) for i in ids.split(",") if i.strip().isdigit()] if ids else None
+    date_from = values.get("from", "").strip()[:10] or None
+    date_to = values.get("to", "").strip()[:10] or None
+    if selected is None and not (date_from or date_to):
+        flash("기간을 입력하거나 인쇄할 항목을 선택하세요.")
+        return redirect(url_for("admin", system=system))
+
+    rows = [row for row, _ in _export_rows(system, date_from, date_to, selected)]
+    if not rows:
+        flash("조건에 맞는 발급완료 증명서가 없습니다.")
+        return redirect(url_for("admin", system=system))
+    if len(rows) > CERT_PRINT_MAX:
+        flash(f"한 번에 {CERT_PRINT_MAX}건까지 인쇄용 PDF로 묶을 수 있습니다 ({len(rows)}건 선택). 기간을 나눠 주세요.")
+        return redirect(url_for("admin", system=system))
+
+    import tempfile
+    from urllib.parse import quote
+    label = f"{date_from or ''}_{date_to or ''}" if selected is None else f"선택{len(rows)}건"
+    with tempfile.TemporaryDirectory(prefix="print_") as tmp_dir:
+        started = time.perf_counter()
+        with profile_job("certificate_print", system=system, count=len(rows)):
+            batch_path = generate_batch_pdf(rows, system, os.path.join(tmp_dir, "batch.pdf"))
+            split = values.get("split") == "1"
+            if split:
+                split_dir = os.path.join(tmp_dir, "pdfs")
+                os.makedirs(split_dir)
+                parts = split_batch_pdf(batch_path, rows, system, split_dir)
+        log_event("certificate_print", system=system, count=len(rows), split=split,
+                  seconds=round(time.perf_counter() - started, 2))
+        if not split:
+            with open(batch_path, "rb") as f:
+                data, mimetype, ext = f.read(), "application/pdf", "pdf"
+        else:
+            buff = io.BytesIO()
+            with zipfile.ZipFile(buff, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                zf.write(batch_path, f"{system}_인쇄용_{label}.pdf")
+                for path in parts:
+                    zf.write(path, f"pdfs/{os.path.basename(path)}")
+            data, mimetype, ext = buff.getvalue(), "application/zip", "zip"
+    filename = f"{system}_인쇄용_{label}.{ext}"
+    return Response(data, mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=\"{system}_print.{ext}\"; filename*=UTF-8''{quote(filename)}"})
+
+
+# ---- 연도별 보관(아카이브) ----
+# 발급번호는 해마다 새로 시작(last_number_YY.txt)하므로, 지난 연도에 발급 완료된 신청은
+# archive/<system>/<연도>.zip (submissions.xlsx + pdfs/*.pdf) 으로 옮기고 작업 파일에서 뺌.
+# → 관리자 화면/수정/발급은 올해 분량만 읽고 씀. 보관분은 /<system>/archive 에서 검색·다운로드.
+#   ARCHIVE_AUTO=1        (기본) 관리자 화면을 열 때 하루 1번 자동 점검
+#   ARCHIVE_KEEP_YEARS=N  올해 외에 작업 파일에 더 남겨 둘 연도 수 (기본 0)
+# 발급 대기 중인 신청은 연도와 관계없이 옮기지 않음.
+ARCHIVE_DIR = os.path.join(BASE_DIR, "archive")
+ARCHIVE_AUTO = os.environ.get("ARCHIVE_AUTO", "1") == "1"
+ARCHIVE_KEEP_YEARS = int(os.environ.get("ARCHIVE_KEEP_YEARS", "0"))
+ARCHIVE_DATA_NAME = "submissions.xlsx"
+
+_archive_checked = {}   # system -> 마지막 자동 점검 날짜
+_archive_cache = {}     # zip 경로 -> {"sig", "df", "by_issue_no", ...}
+_archive_lock = threading.Lock()
+
+def archive_path(system, year):
+    return os.path.join(ARCHIVE_DIR, system, f"{year}.zip")
+
+def archive_years(system):
+    folder = os.path.join(ARCHIVE_DIR, system)
+    if not os.path.isdir(folder):
+        return []
+    return sorted((int(fn[:-4]) for fn in os.listdir(folder) if fn.endswith(".zip") and fn[:-4].isdigit()),
+                  reverse=True)
+
+def _partition_years(df):
+    """행별 보관 연도: 발급일 연도 (없으면 신청일 연도)."""
+    issued = df["발급일"].fillna("").astype(str).str.slice(0, 4)
+    applied = df["신청일"].fillna("").astype(str).str.slice(0, 4)
+    return pd.to_numeric(issued.where(issued.str.len() == 4, applied), errors="coerce")
+
+def _write_archive(system, year, part):
+    """해당 연도 zip에 행 + PDF 추가 (기존 내용 유지, 임시 파일에 쓴 뒤 교체)."""
+    path = archive_path(system, year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    frames = []
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as out:
+        names = set()
+        if os.path.exists(path):
+            with zipfile.ZipFile(path) as old:
+                for info in old.infolist():
+                    if info.filename == ARCHIVE_DATA_NAME:
+                        frames.append(pd.read_excel(io.BytesIO(old.read(info)), dtype=str))
+                    else:
+                        out.writestr(info, old.read(info))
+                        names.add(info.filename)
+        for _, row in part.iterrows():
+            pdf_path = certificate_pdf_path(system, row)
+            member = f"pdfs/{os.path.basename(pdf_path)}"
+            if member not in names and os.path.exists(pdf_path):
+                out.write(pdf_path, member)
+                names.add(member)
+        frames.append(part)
+        combined = pd.concat(frames, ignore_index=True).drop_duplicates()
+        buff = io.BytesIO()
+        combined.to_excel(buff, index=False)
+        out.writestr(ARCHIVE_DATA_NAME, buff.getvalue())
+    os.replace(tmp_path, path)
+
+def archive_closed_years(system):
+    """지난 연도 발급완료 신청을 보관 파일로 이동. 반환: {연도: 옮긴 건수}."""
+    data_path = submissions_path(system)
+    if not os.path.exists(data_path):
+        return {}
+    cutoff = now_kst().year - ARCHIVE_KEEP_YEARS
+    with submissions_lock(data_path):
+        df = read_submissions(data_path)
+        years = _partition_years(df)
+        closed = df["상태"].fillna("").isin(["발급완료", "재발송"]) & (years < cutoff)
+        if not closed.any():
+            return {}
+        moved = {}
+        for year, part in df[closed].groupby(years[closed]):
+            _write_archive(system, int(year), part)
+            moved[int(year)] = len(part)
+        # 보관 파일을 다 쓴 뒤에 작업 파일/PDF 정리 (중간에 실패해도 자료가 사라지지 않도록)
+        write_submissions(df[~closed].reset_index(drop=True), data_path)
+        remove_certificate_pdfs(system, df, [i for i, c in enumerate(closed) if c])
+    log_event("archive", system=system, moved=moved)
+    print(f"📦 [{system}] 보관 이동: {moved}")
+    return moved
+
+def maybe_archive(system):
+    """ARCHIVE_AUTO 이면 하루에 한 번 보관 점검 (관리자 화면 진입 시)."""
+    today = now_kst().date()
+    if not ARCHIVE_AUTO or _archive_checked.get(system) == today:
+        return
+    _archive_checked[system] = today
+    try:
+        moved = archive_closed_years(system)
+        if moved:
+            flash("지난 연도 발급분을 보관함으로 옮겼습니다: " + ", ".join(f"{y}년 {n}건" for y, n in sorted(moved.items())))
+    except Exception as e:
+        print(f"⚠️ [{system}] 보관 이동 실패: {e}")
+
+def load_archive(system, year):
+    """보관 zip의 신청 목록 + 발급번호 인덱스 (zip이 바뀌기 전까지 캐시). 없으면 None."""
+    path = archive_path(system, year)
+    sig = _file_signature(path)
+    if sig is None:
+        return None
+    with _archive_lock:
+        cached = _archive_cache.get(path)
+        if cached and cached["sig"] == sig:
+            return cached
+    with zipfile.ZipFile(path) as zf:
+        df = pd.read_excel(io.BytesIO(zf.read(ARCHIVE_DATA_NAME)), dtype=str).fillna("")
+        pdf_names = {n[len("pdfs/"):] for n in zf.namelist() if n.startswith("pdfs/")}
+    by_issue_no = {}
+    issued = df[df["발급번호"].str.strip() != ""]
+    for record in issued[["발급번호", "성명", "증명서종류", "발급일"]].to_dict(orient="records"):
+        record["발급일"] = record["발급일"][:10]
+        by_issue_no.setdefault(normalize_issue_no(record["발급번호"]), []).append(record)
+
+    def pdf_sha256(record):
+        name = os.path.basename(certificate_pdf_path(system, record))
+        if name not in pdf_names:
+            return ""
+        with zipfile.ZipFile(path) as zf:
+            return hashlib.sha256(zf.read(f"pdfs/{name}")).hexdigest()
+
+    entry = {"sig": sig, "df": df, "pdf_names": pdf_names, "by_issue_no": by_issue_no, "pdf_sha256": pdf_sha256}
+    with _archive_lock:
+        _archive_cache[path] = entry
+    return entry
+
+ARCHIVE_HTML = """
+<!doctype html><html lang="ko"><head><meta charset="utf-8"><title>{{ system }} 보관함</title>
+<style>
+body{font-family:'Nanum Gothic',sans-serif;margin:30px} table{border-collapse:collapse;margin-top:10px}
+td,th{border:1px solid #ddd;padding:4px 10px;font-size:13px} th{background:#fce473}
+.btn{padding:4px 10px;border:1px solid #999;border-radius:5px;background:#fff;cursor:pointer;text-decoration:none;color:#333}
+</style></head><body>
+<p><a href="{{ url_for('admin', system=system) }}">← 관리자 화면</a></p>
+<h2>{{ system }} 연도별 보관함</h2>
+{% with messages = get_flashed_messages() %}{% for m in messages %}<p style="color:#1f3c88">{{ m }}</p>{% endfor %}{% endwith %}
+<table><tr><th>연도</th><th>건수</th><th>PDF</th><th>크기</th><th>내려받기</th></tr>
+{% for y in years %}
+<tr><td>{{ y.year }}</td><td>{{ y.rows }}</td><td>{{ y.pdfs }}</td><td>{{ y.size_mb }} MB</td>
+<td><a class="btn" href="{{ url_for('archive_download', system=system, year=y.year) }}">{{ y.year }}.zip</a></td></tr>
+{% else %}<tr><td colspan="5">보관된 연도가 없습니다.</td></tr>{% endfor %}
+</table>
+<form method="post" action="{{ url_for('archive_run', system=system) }}" style="margin-top:10px"
+      onsubmit="return confirm('지난 연도 발급완료 건을 보관함으로 옮길까요?')">
+  <button class="btn">지금 보관 점검</button>
+</form>
+<h3>보관분 검색</h3>
+<form method="get"><input name="q" value="{{ q }}" placeholder="성명 또는 발급번호"> <button class="btn">검색</button></form>
+{% if q %}
+<table><tr><th>연도</th><th>신청일</th><th>증명서종류</th><th>성명</th><th>근무장소</th><th>발급일</th><th>발급번호</th></tr>
+{% for r in results %}
+<tr><td>{{ r.year }}</td><td>{{ r.신청일 }}</td><td>{{ r.증명서종류 }}</td><td>{{ r.성명 }}</td><td>{{ r.근무장소 }}</td>
+<td>{{ r.발급일 }}</td><td>{% if r.pdf %}<a href="{{ url_for('archive_pdf', system=system, year=r.year, filename=r.pdf) }}" target="_blank">{{ r.발급번호 }}</a>{% else %}{{ r.발급번호 }}{% endif %}</td></tr>
+{% else %}<tr><td colspan="7">검색 결과가 없습니다.</td></tr>{% endfor %}
+</table>
+{% endif %}
+</body></html>
+"""
+
+@app.get("/<system>/archive")
+def archive_index(system):
+    if not session.get(f"{system}_authenticated"):
+        return redirect(url_for("admin", system=system))
+    q = request.args.get("q", "").strip()
+    years, results = [], []
+    q_issue = normalize_issue_no(q)
+    for year in archive_years(system):
+        archived = load_archive(system, year)
+        years.append({"year": year, "rows": len(archived["df"]), "pdfs": len(archived["pdf_names"]),
+                      "size_mb": round(os.path.getsize(archive_path(system, year)) / 1048576, 1)})
+        if not q:
+            continue
+        df = archived["df"]
+        if q_issue:
+            hits = df[df["발급번호"].map(normalize_issue_no) == q_issue]
+        else:
+            hits = df[df["성명"].str.replace(" ", "").str.contains(q.replace(" ", ""), regex=False)]
+        for record in hits.head(200 - len(results)).to_dict(orient="records"):
+            pdf = os.path.basename(certificate_pdf_path(system, record))
+            results.append({**record, "year": year, "pdf": pdf if pdf in archived["pdf_names"] else ""})
+    return render_template_string(ARCHIVE_HTML, system=system, years=years, q=q, results=results)
+
+@app.post("/<system>/archive/run")
+def archive_run(system):
+    if not session.get(f"{system}_authenticated"):
+        return redirect(url_for("admin", system=system))
+    moved = archive_closed_years(system)
+    flash("보관 이동: " + ", ".join(f"{y}년 {n}건" for y, n in sorted(moved.items())) if moved else "옮길 지난 연도 발급분이 없습니다.")
+    return redirect(url_for("archive_index", system=system))
+
+@app.get("/<system>/archive/<int:year>.zip")
+def archive_download(system, year):
+    if not session.get(f"{system}_authenticated"):
+        return redirect(url_for("admin", system=system))
+    path = archive_path(system, year)
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, as_attachment=True, download_name=f"{system}_{year}_보관.zip", mimetype="application/zip")
+
+@app.get("/<system>/archive/<int:year>/pdf/<filename>")
+def archive_pdf(system, year, filename):
+    if not session.get(f"{system}_authenticated"):
+        return redirect(url_for("admin", system=system))
+    archived = load_archive(system, year)
+    if not archived or filename not in archived["pdf_names"]:
+        abort(404)
+    with zipfile.ZipFile(archive_path(system, year)) as zf:
+        data = zf.read(f"pdfs/{filename}")
+    return send_file(io.BytesIO(data), mimetype="application/pdf", download_name=filename)
+
+
 # ===== (입금용 엑셀 생성기) Blueprint — 기존 코드 수정 없이 추가 =====
 
 from flask import Blueprint, request, send_file, render_template_string, abort, current_app
 import io, os, re, zipfile
-import pandas as pd
 from datetime import datetime
+# pandas는 위의 지연 import(pd) 사용
 
 trweb_bp = Blueprint("trweb", __name__)
 DEPOSIT_CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE", "200"))  # 시트 누적 인원 기준 (기본 200)
@@ -1080,6 +4892,46 @@ def deposit_clean_account(acc):
     # s = s.replace("-", "")  # 필요 시 하이픈 제거
     return s
 
+def deposit_clean_accounts(col: "pd.Series") -> "pd.Series":
+    """deposit_clean_account 를 열 단위로 (행마다 apply 하지 않음). 지수표기 행만 개별 변환."""
+    s = col.fillna("").astype(str).str.strip()
+    sci = s.str.fullmatch(r"\d+(\.\d+)?[eE][+-]?\d+")
+    if sci.any():
+        s = s.copy()
+        s[sci] = s[sci].map(deposit_clean_account)
+    return s.str.replace(r"\.0$", "", regex=True).str.replace(" ", "", regex=False)
+
+# 은행 이름 → 금융결제원 은행코드 (대량이체 업로드 파일용). 별칭은 공백/'은행' 떼고 대문자로 비교.
+DEPOSIT_BANK_CODES = {
+    "산업": "002", "기업": "003", "국민": "004", "수협": "007", "농협": "011", "지역농협": "012",
+    "우리": "020", "SC제일": "023", "씨티": "027", "대구": "031", "부산": "032", "광주": "034",
+    "제주": "035", "전북": "037", "경남": "039", "새마을금고": "045", "신협": "048", "저축은행": "050",
+    "산림조합": "064", "우체국": "071", "하나": "081", "신한": "088", "케이뱅크": "089",
+    "카카오뱅크": "090", "토스뱅크": "092",
+}
+DEPOSIT_BANK_ALIASES = {
+    "KDB": "산업", "KDB산업": "산업", "IBK": "기업", "IBK기업": "기업", "KB": "국민", "KB국민": "국민",
+    "NH": "농협", "NH농협": "농협", "단위농협": "지역농협", "농축협": "지역농협", "SC": "SC제일", "제일": "SC제일",
+    "한국씨티": "씨티", "IM뱅크": "대구", "IM": "대구", "새마을": "새마을금고", "MG새마을금고": "새마을금고",
+    "우체국예금": "우체국", "KEB하나": "하나", "외환": "하나", "K뱅크": "케이뱅크", "카카오": "카카오뱅크",
+    "토스": "토스뱅크",
+}
+
+def _deposit_bank_key(s: "pd.Series") -> "pd.Series":
+    return (s.fillna("").astype(str).str.replace(r"\s+", "", regex=True)
+             .str.replace(r"은행$", "", regex=True).str.upper())
+
+_DEPOSIT_BANK_LOOKUP = {
+    **{k.upper(): k for k in DEPOSIT_BANK_CODES},
+    **{k.upper(): v for k, v in DEPOSIT_BANK_ALIASES.items()},
+}
+
+def deposit_normalize_banks(col: "pd.Series"):
+    """(표준 은행 이름, 은행코드) — 표에 없는 이름은 원래 값 그대로, 코드는 빈 문자열."""
+    canonical = _deposit_bank_key(col).map(_DEPOSIT_BANK_LOOKUP)
+    names = canonical.fillna(col.fillna("").astype(str).str.strip())
+    return names, canonical.map(DEPOSIT_BANK_CODES).fillna("")
+
 DEPOSIT_INDEX_HTML = """
 <!doctype html>
 <html lang="ko">
@@ -1117,6 +4969,13 @@ DEPOSIT_INDEX_HTML = """
         <label for="file">엑셀 파일 업로드 (.xlsx)</label>
         <input id="file" name="file" type="file" accept=".xlsx" required />
         <div class="hint">예: sss.xlsx</div>
+        <label>출력 형식 (여러 개 고르면 ZIP으로 한 번에)</label>
+        <div>
+          <label style="display:inline; font-weight:400;"><input type="checkbox" name="formats" value="xlsx" checked> 엑셀(.xlsx)</label>
+          <label style="display:inline; font-weight:400; margin-left:12px;"><input type="checkbox" name="formats" value="csv"> 이체용 CSV</label>
+          <label style="display:inline; font-weight:400; margin-left:12px;"><input type="checkbox" name="formats" value="fixed"> 은행 고정폭(.txt)</label>
+        </div>
+        <div class="hint">CSV/고정폭: 은행코드·계좌번호(숫자만)·예금주·입금액·적요, {{ encoding }} 인코딩</div>
         <button class="btn" type="submit">변환 & 다운로드</button>
       </form>
     </div>
@@ -1127,6 +4986,7 @@ DEPOSIT_INDEX_HTML = """
         <li>각 시트에서 <code>은행/계좌번호/예금주/입금액</code>이 모두 있으면 추출</li>
         <li><code>예금주</code>가 있는 행만 사용</li>
         <li><code>계좌번호</code>는 <b>문자</b>로 강제(선행 0 보존), 지수표기/공백/".0" 정리</li>
+        <li><code>은행</code>은 표준 이름으로 통일 (예: KB국민은행 → 국민), CSV/고정폭은 은행코드를 모르면 중단</li>
         <li>각 결과 파일에서 시트 구간 마지막 행 아래에 <b>시트별 합계(H/I)</b></li>
         <li>전체 총합은 <b>H2/I2</b>, 모든 데이터 행의 <b>F열</b>에 "새담청소년교육"</li>
       </ul>
@@ -1150,7 +5010,7 @@ DEPOSIT_INDEX_HTML = """
 
 @trweb_bp.get("/")
 def deposit_index():
-    return render_template_string(DEPOSIT_INDEX_HTML, chunk_size=DEPOSIT_CHUNK_SIZE)
+    return render_template_string(DEPOSIT_INDEX_HTML, chunk_size=DEPOSIT_CHUNK_SIZE, encoding=DEPOSIT_TEXT_ENCODING)
 
 @trweb_bp.post("/process")
 def deposit_process():
@@ -1167,43 +5027,52 @@ def deposit_process():
     input_path = os.path.join(upload_root, f"_upload_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
     up.save(input_path)
 
-    try:
-        sheets = deposit_read_sheets_as_list(input_path)
-        if not sheets:
-            abort(400, "추출할 데이터가 없습니다. (열 이름/헤더 3행 확인)")
-
-        parts = deposit_split_by_sheet_boundary(sheets, DEPOSIT_CHUNK_SIZE)
-        today = datetime.today().strftime("%Y-%m-%d")
-
-        # 파트 1개면 단일 파일
-        if len(parts) == 1:
-            merged = pd.concat([df for _, df in parts[0]], ignore_index=True)
-            xlsx_bytes = deposit_build_excel_bytes(merged, file_label=today)
-            return send_file(
-                io.BytesIO(xlsx_bytes),
-                as_attachment=True,
-                download_name=f"입금내역_{today}.xlsx",
-                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-
-        # 여러 파트면 ZIP
-        buff = io.BytesIO()
-        with zipfile.ZipFile(buff, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+    with profile_job("deposit", file=up.filename):
+        try:
+            sheets = deposit_read_sheets_as_list(input_path)
+            if not sheets:
+                abort(400, "추출할 데이터가 없습니다. (열 이름/헤더 3행 확인)")
+
+            # 출력 형식 (여러 개 선택 가능, 없으면 기존처럼 xlsx)
+            formats = [f for f in DEPOSIT_FORMATS if f in request.form.getlist("formats")] or ["xlsx"]
+            if any(DEPOSIT_FORMATS[f]["bank_code"] for f in formats):
+                unknown = sorted({name for _, df in sheets for name in df.loc[df["_은행코드"] == "", "은행"]})
+                if unknown:
+                    abort(400, f"은행코드를 알 수 없는 은행: {', '.join(map(str, unknown))} (은행 이름 확인)")
+
+            parts = deposit_split_by_sheet_boundary(sheets, DEPOSIT_CHUNK_SIZE)
+            today = datetime.today().strftime("%Y-%m-%d")
+
+            # 한 번 읽은 데이터로 파트 × 형식별 파일을 만듦
+            files = []
             for i, part in enumerate(parts, start=1):
                 merged = pd.concat([df for _, df in part], ignore_index=True)
-                part_no = f"{i:02d}"
-                fname = f"입금내역_{today}_part{part_no}.xlsx"
-                xlsx_bytes = deposit_build_excel_bytes(merged, file_label=f"{today} part {part_no}")
-                zf.writestr(fname, xlsx_bytes)
-
-        buff.seek(0)
-        return send_file(buff, as_attachment=True, download_name=f"입금내역_{today}_split.zip", mimetype="application/zip")
-
-    finally:
-        try:
-            os.remove(input_path)
-        except Exception:
-            pass
+                suffix, label = ("", today) if len(parts) == 1 else (f"_part{i:02d}", f"{today} part {i:02d}")
+                for fmt in formats:
+                    conf = DEPOSIT_FORMATS[fmt]
+                    files.append((f"입금내역_{today}{suffix}.{conf['ext']}", conf["build"](merged, label),
+                                  conf["mimetype"]))
+
+            # 파일 1개면 그대로
+            if len(files) == 1:
+                fname, data, mimetype = files[0]
+                return send_file(io.BytesIO(data), as_attachment=True, download_name=fname, mimetype=mimetype)
+
+            # 여러 파트/형식이면 ZIP
+            buff = io.BytesIO()
+            with zipfile.ZipFile(buff, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                for fname, data, _ in files:
+                    zf.writestr(fname, data)
+
+            buff.seek(0)
+            name = "split" if len(parts) > 1 else "_".join(formats)
+            return send_file(buff, as_attachment=True, download_name=f"입금내역_{today}_{name}.zip", mimetype="application/zip")
+
+        finally:
+            try:
+                os.remove(input_path)
+            except Exception:
+                pass
 
 def deposit_read_sheets_as_list(input_path: str):
     """[(sheet_name, df_with__시트), ...]"""
@@ -1216,7 +5085,8 @@ def deposit_read_sheets_as_list(input_path: str):
             filtered = df[target].dropna(subset=["예금주"]).copy()
             if filtered.empty:
                 continue
-            filtered["계좌번호"] = filtered["계좌번호"].apply(deposit_clean_account)
+            filtered["계좌번호"] = deposit_clean_accounts(filtered["계좌번호"])
+            filtered["은행"], filtered["_은행코드"] = deposit_normalize_banks(filtered["은행"])
             filtered["입금액"] = pd.to_numeric(filtered["입금액"], errors="coerce")
             filtered["_시트"] = sheet_name
             out.append((sheet_name, filtered))
@@ -1242,9 +5112,9 @@ def deposit_split_by_sheet_boundary(sheet_dfs, chunk_size: int):
         parts.append(current)
     return parts
 
-def deposit_build_excel_bytes(df_with_sheet: pd.DataFrame, file_label: str) -> bytes:
-    """'_시트'는 계산용(출력 제외). 시트 구간 마지막 행 아래 H/I에 합계, H2/I2에 총합, F열 '새담청소년교육'."""
-    visible_cols = [c for c in df_with_sheet.columns if c != "_시트"]
+def deposit_build_excel_bytes(df_with_sheet: "pd.DataFrame", file_label: str) -> bytes:
+    """'_시트'/'_은행코드'는 계산용(출력 제외). 시트 구간 마지막 행 아래 H/I에 합계, H2/I2에 총합, F열 '새담청소년교육'."""
+    visible_cols = [c for c in df_with_sheet.columns if not c.startswith("_")]
     result_df = df_with_sheet[visible_cols].copy()
 
     output = io.BytesIO()
@@ -1297,10 +5167,107 @@ def deposit_build_excel_bytes(df_with_sheet: pd.DataFrame, file_label: str) -> b
     output.seek(0)
     return output.getvalue()
 
+# 은행 대량이체 업로드용 텍스트 파일 (은행 프로그램이 한글을 CP949로 읽는 경우가 많아 기본 cp949)
+DEPOSIT_TEXT_ENCODING = os.environ.get("DEPOSIT_TEXT_ENCODING", "cp949")
+DEPOSIT_MEMO = "새담청소년교육"
+
+def _deposit_transfer_frame(df: "pd.DataFrame") -> "pd.DataFrame":
+    """이체 파일 공통 열: 은행코드/은행/계좌번호(숫자만)/예금주/입금액(정수)/적요."""
+    return pd.DataFrame({
+        "은행코드": df["_은행코드"],
+        "은행": df["은행"],
+        "계좌번호": df["계좌번호"].str.replace(r"\D", "", regex=True),
+        "예금주": df["예금주"].fillna("").astype(str).str.strip(),
+        "입금액": pd.to_numeric(df["입금액"], errors="coerce").fillna(0).round().astype("int64"),
+        "적요": DEPOSIT_MEMO,
+    })
+
+def deposit_build_csv_bytes(df_with_sheet: "pd.DataFrame", file_label: str) -> bytes:
+    return _deposit_transfer_frame(df_with_sheet).to_csv(index=False).encode(DEPOSIT_TEXT_ENCODING, errors="replace")
+
+# 고정폭 레코드: (열, 바이트 수, 정렬) — 숫자는 오른쪽 정렬 0 채움, 문자는 왼쪽 정렬 공백 채움
+DEPOSIT_FIXED_LAYOUT = [("은행코드", 3, "left"), ("계좌번호", 16, "left"), ("입금액", 13, "zero"),
+                        ("예금주", 20, "left"), ("적요", 20, "left")]
+
+def _fixed_text(value: str, width: int) -> str:
+    # 한글은 CP949에서 2바이트 → 바이트 기준으로 자르고 채움 (글자 중간에서 잘리지 않게)
+    raw = value.encode(DEPOSIT_TEXT_ENCODING, errors="replace")[:width]
+    text = raw.decode(DEPOSIT_TEXT_ENCODING, errors="ignore")
+    return text + " " * (width - len(text.encode(DEPOSIT_TEXT_ENCODING)))
+
+def deposit_build_fixed_bytes(df_with_sheet: "pd.DataFrame", file_label: str) -> bytes:
+    frame = _deposit_transfer_frame(df_with_sheet)
+    columns = []
+    for col, width, align in DEPOSIT_FIXED_LAYOUT:
+        values = frame[col].astype(str)
+        if align == "zero":
+            columns.append(values.str.zfill(width).str[-width:])
+        elif values.map(str.isascii).all():
+            columns.append(values.str[:width].str.ljust(width))
+        else:
+            columns.append(values.map(lambda v, w=width: _fixed_text(v, w)))
+    lines = pd.concat(columns, axis=1).agg("".join, axis=1) if len(frame) else pd.Series([], dtype=str)
+    return ("\r\n".join(lines) + "\r\n").encode(DEPOSIT_TEXT_ENCODING, errors="replace")
+
+DEPOSIT_FORMATS = {
+    "xlsx": {"ext": "xlsx", "build": deposit_build_excel_bytes, "bank_code": False,
+             "mimetype": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "csv": {"ext": "csv", "build": deposit_build_csv_bytes, "bank_code": True, "mimetype": "text/csv"},
+    "fixed": {"ext": "txt", "build": deposit_build_fixed_bytes, "bank_code": True, "mimetype": "text/plain"},
+}
+
 # === 블루프린트 등록 (모든 라우트 정의 끝난 뒤, Entry Point 위 한 줄) ===
 app.register_blueprint(trweb_bp, url_prefix="/trweb")
 
 
+# =============================
+# Warm-up (지연 초기화를 부팅 직후 백그라운드에서 미리 수행)
+# =============================
+def _init_deposit():
+    # 입금 엑셀 생성기가 쓰는 pandas + 엑셀 엔진 미리 import
+    importlib.import_module("pandas")
+    importlib.import_module("openpyxl")
+    importlib.import_module("xlsxwriter")
+
+_initializers["deposit"] = _init_deposit
+
+_warmup_thread = None
+
+def start_warmup():
+    """아직 초기화되지 않은 하위 시스템을 백그라운드 스레드에서 초기화 (중복 실행 안 함)."""
+    global _warmup_thread
+    with _init_lock:
+        if _warmup_thread is not None:
+            return False
+
+        def run():
+            for name in ("deposit", "payroll", "certificate"):
+                try:
+                    ensure_initialized(name)
+                except Exception as e:
+                    print(f"⚠️ warm-up 실패({name}): {e}")
+
+        _warmup_thread = threading.Thread(target=run, name="warmup", daemon=True)
+        _warmup_thread.start()
+        return True
+
+@app.route("/warmup", methods=["GET", "POST"])
+def warmup():
+    started = start_warmup()
+    return jsonify({
+        "started": started,
+        "running": bool(_warmup_thread and _warmup_thread.is_alive()),
+        "initialized_ms": dict(_initialized),   # 하위 시스템별 초기화 소요 시간
+        "pending": [n for n in _initializers if n not in _initialized],
+    })
+
+if os.environ.get("WARMUP_ON_BOOT") == "1":
+    start_warmup()
+
+if os.environ.get("DISPATCH_SCHEDULER", "1") != "0":
+    start_dispatch_scheduler()
+
+
 
 # =============================
 # Entry Point
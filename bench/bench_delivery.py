@@ -0,0 +1,75 @@
+"""
+발송 엔진 처리량 비교: 기존 순차 루프(send_mail 1통씩) vs asyncio 엔진(deliver_batch).
+
+로컬 SMTP 대역 서버(bench/smtp_sink.py)를 띄워 실제 메일 없이 측정한다.
+--latency 로 원격 SMTP의 응답 지연을 흉내내면 차이가 잘 드러남.
+
+    python bench/bench_delivery.py --messages 200 --latency 0.05 --connections 5
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smtp_sink import start_sink  # noqa: E402
+
+
+def build_messages(app, count):
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    msgs = []
+    for i in range(count):
+        msg = MIMEMultipart('related')
+        msg['Subject'] = f'[bench] {i}'
+        msg['From'] = 'bench@localhost'
+        msg['To'] = f'user{i}@example.com'
+        alt = MIMEMultipart('alternative')
+        alt.attach(MIMEText('<p>' + 'x' * 8000 + '</p>', 'html'))
+        msg.attach(alt)
+        for cid, rel in (('logo_image', 'send01/logo01.jpg'), ('ad1_image', 'send01/ad1.jpg')):
+            part = app.get_mime_image(rel, cid)
+            if part is not None:
+                msg.attach(part)
+        msgs.append(msg)
+    return msgs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="SMTP 대역 서버 응답 지연(초)")
+    parser.add_argument("--connections", type=int, default=5, help="async 엔진 계정당 연결 수")
+    args = parser.parse_args()
+
+    port, stats, stop = start_sink(latency=args.latency)
+    os.environ["MAIL_TRANSPORT"] = f"smtp://127.0.0.1:{port}"
+    os.environ["ASYNC_SMTP_CONNECTIONS"] = str(args.connections)
+
+    import app
+    msgs = build_messages(app, args.messages)
+
+    # 1) 기존 방식: 메일마다 연결 -> 발송 -> 종료
+    t0 = time.perf_counter()
+    for msg in msgs:
+        app.send_mail("send01", msg, "bench@localhost", "")
+    sync_sec = time.perf_counter() - t0
+
+    # 2) async 엔진: 계정당 N개 연결을 유지하며 동시 발송
+    jobs = [{"msg": m, "from_addr": "bench@localhost", "password": ""} for m in msgs]
+    t0 = time.perf_counter()
+    ok, fail = app.deliver_batch("send01", jobs, connections=args.connections)
+    async_sec = time.perf_counter() - t0
+
+    stop()
+    print(f"messages={args.messages} latency={args.latency}s connections={args.connections} "
+          f"engine={'aiosmtplib' if app.aiosmtplib else 'threads'}")
+    print(f"  sync loop : {sync_sec:7.2f}s  {args.messages / sync_sec:8.1f} msg/s")
+    print(f"  async     : {async_sec:7.2f}s  {args.messages / async_sec:8.1f} msg/s  (ok={ok}, fail={fail})")
+    print(f"  speedup   : {sync_sec / async_sec:.1f}x   sink received={stats.messages}, max_concurrent={stats.max_concurrent}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+콜드 스타트 측정: 새 파이썬 프로세스에서 `import app` 에 걸리는 시간.
+
+Render 무료 플랜은 잠들었다 깨어날 때마다 이 비용을 치르므로 예산(--budget-ms)을 넘으면
+종료 코드 1로 실패. --top 으로 import 시간이 큰 모듈을 함께 보여줌.
+
+    python bench/bench_startup.py --runs 5 --budget-ms 300 --top 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = (
+    "import time; t = time.perf_counter(); import app; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def measure(runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def top_imports(limit):
+    # -X importtime: "import time: self [us] | cumulative | imported package"
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        name = name[1:].rstrip()
+        # app이 직접 import한 모듈(들여쓰기 2칸)만 — 그 하위 모듈 시간은 cumulative에 포함됨
+        if name.startswith("  ") and not name.startswith("   "):
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="import app 중앙값 허용 상한(ms)")
+    parser.add_argument("--top", type=int, default=0, help="import 시간 상위 N개 모듈 출력")
+    args = parser.parse_args()
+
+    samples = measure(args.runs)
+    median = statistics.median(samples)
+    print(f"import app: median {median:.0f} ms, min {min(samples):.0f} ms, max {max(samples):.0f} ms "
+          f"({args.runs} runs, budget {args.budget_ms:.0f} ms)")
+
+    if args.top:
+        print("top imports (cumulative):")
+        for cumulative_us, name in top_imports(args.top):
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    if median > args.budget_ms:
+        print("❌ 콜드 스타트 예산 초과")
+        sys.exit(1)
+    print("✅ 예산 이내")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+파이프라인 벤치마크: 합성 엑셀(bench/workbooks.py) + 로컬 SMTP 대역(bench/smtp_sink.py), 발송 지연 없이.
+
+  payroll : /send01 업로드 → process_excel_multi (메일 렌더 + 발송)
+  pdf     : generate_pdf (wkhtmltopdf 없으면 건너뜀)
+  admin   : 관리자 목록/수정/삭제/일괄삭제/신청 — pending_submissions_01.xlsx 크기별
+  trweb   : /trweb/process 입금 엑셀 생성
+
+행 수마다 새 프로세스에서 돌려(DATA_DIR=임시 폴더) 최대 메모리(ru_maxrss)를 따로 잼.
+결과는 bench/results.jsonl 에 커밋 해시와 함께 한 줄씩 추가 → --compare 로 이전 커밋과 비교.
+
+    python bench/bench_suite.py --rows 100,1000,10000 --sheets 10
+    python bench/bench_suite.py --pipelines admin,trweb --rows 50000 --compare
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+DEFAULT_RESULTS = os.path.join(BENCH_DIR, "results.jsonl")
+PIPELINES = ("payroll", "pdf", "admin", "trweb")
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2) if samples else 0.0,
+        "total_sec": round(sum(samples), 3),
+    }
+
+
+def max_rss_mb():
+    # Linux: KB, macOS: bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ---------------------------------------------------------------------------
+# child: 파이프라인 1개 x 크기 1개 (새 프로세스)
+# ---------------------------------------------------------------------------
+def _capture_observations(app):
+    """app.observe 를 감싸서 구간 타이머(timed)의 원시 샘플을 모음 — p50/p95 계산용."""
+    samples = {}
+    original = app.observe
+
+    def observe(name, seconds, **labels):
+        samples.setdefault(name, []).append(seconds)
+        original(name, seconds, **labels)
+
+    app.observe = observe
+    return samples
+
+
+def _timed_call(samples, op, fn):
+    started = time.perf_counter()
+    result = fn()
+    samples.setdefault(op, []).append(time.perf_counter() - started)
+    return result
+
+
+def run_payroll(app, args, data_dir, sink_stats):
+    from workbooks import payroll_workbook
+
+    path = os.path.join(data_dir, "payroll.xlsx")
+    rows = payroll_workbook(path, args.rows, args.sheets)
+    client = app.app.test_client()
+    with open(path, "rb") as f:
+        payload = f.read()
+    ops = {}
+    started = time.perf_counter()
+    # 업로드 → 발송 전 점검 보고서 → 확인(발송)
+    resp = _timed_call(ops, "preflight_request", lambda: client.post(
+        "/send01", data={"send_date": "2025-01-10", "excel": (io.BytesIO(payload), "payroll.xlsx")}))
+    token = re.search(r'name="token" value="([0-9a-f]+)"', resp.get_data(as_text=True))
+    if token:
+        resp = _timed_call(ops, "upload_request", lambda: client.post(
+            "/send01/confirm", data={"token": token.group(1), "action": "send"}))
+    elapsed = time.perf_counter() - started
+    sent = app.runtime_get("send01", "sent_count", 0)
+    return {
+        "status": resp.status_code, "rows": rows, "elapsed_sec": round(elapsed, 3),
+        "throughput_per_sec": round(sent / elapsed, 2) if elapsed else 0,
+        "sent": sent, "sink_received": sink_stats.messages, "ops": ops,
+    }
+
+
+def run_pdf(app, args, data_dir, sink_stats):
+    if not os.path.exists(app.WKHTMLTOPDF_PATH):
+        return {"skipped": f"wkhtmltopdf 없음 ({app.WKHTMLTOPDF_PATH})"}
+    import random
+    from workbooks import submission_row
+
+    rng = random.Random(1)
+    count = min(args.rows, args.pdf_max)
+    ops = {}
+    started = time.perf_counter()
+    for i in range(count):
+        row = submission_row(rng, i)
+        _timed_call(ops, "generate_pdf", lambda: app.generate_pdf(row, f"제2025-{i + 1:04d}호", "system01"))
+    elapsed = time.perf_counter() - started
+    return {"rows": count, "elapsed_sec": round(elapsed, 3),
+            "throughput_per_sec": round(count / elapsed, 2) if elapsed else 0, "ops": ops}
+
+
+def run_admin(app, args, data_dir, sink_stats):
+    from workbooks import submissions_workbook
+
+    data_path = os.path.join(data_dir, "pending_submissions_01.xlsx")
+    submissions_workbook(data_path, args.rows)
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess["system01_authenticated"] = True
+
+    last_page = max(1, (args.rows - 1) // 10 + 1)
+    form = {"성명": "벤치", "증명서종류": "경력증명서", "주민번호": "900101-1234567", "자택주소": "서울",
+            "근무시작일": "2020-01-01", "근무종료일": "2021-01-01", "근무장소": "벤치초", "강의과목": "코딩",
+            "이메일주소": "bench@example.com"}
+    ops = {}
+    started = time.perf_counter()
+    for i in range(args.repeat):
+        _timed_call(ops, "admin_page_1", lambda: client.get("/system01/admin"))
+        _timed_call(ops, "admin_page_last", lambda: client.get(f"/system01/admin/{last_page}"))
+        _timed_call(ops, "update", lambda: client.post("/system01/update/0", data={"page": "1", "용도": f"수정{i}"}))
+        _timed_call(ops, "submit", lambda: client.post("/system01/submit", data=form))
+        _timed_call(ops, "delete", lambda: client.get("/system01/delete/0?page=1"))
+        _timed_call(ops, "bulk_delete", lambda: client.post(
+            "/system01/bulk_delete", data={"selected_ids": "1,2", "page": "1"}))
+    elapsed = time.perf_counter() - started
+    count = sum(len(v) for v in ops.values())
+    return {"rows": args.rows, "elapsed_sec": round(elapsed, 3),
+            "throughput_per_sec": round(count / elapsed, 2) if elapsed else 0, "ops": ops}
+
+
+def run_trweb(app, args, data_dir, sink_stats):
+    from workbooks import deposit_workbook
+
+    path = os.path.join(data_dir, "deposit.xlsx")
+    deposit_workbook(path, args.rows, args.sheets)
+    with open(path, "rb") as f:
+        payload = f.read()
+    client = app.app.test_client()
+    ops = {}
+    started = time.perf_counter()
+    status = None
+    for _ in range(args.repeat):
+        resp = _timed_call(ops, "process", lambda: client.post(
+            "/trweb/process", data={"file": (io.BytesIO(payload), "deposit.xlsx")}))
+        status = resp.status_code
+    elapsed = time.perf_counter() - started
+    return {"status": status, "rows": args.rows, "elapsed_sec": round(elapsed, 3),
+            "throughput_per_sec": round(args.rows * args.repeat / elapsed, 2) if elapsed else 0, "ops": ops}
+
+
+def child_main(args):
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, ROOT)
+    from smtp_sink import start_sink
+
+    port, sink_stats, stop = start_sink(latency=args.smtp_latency)
+    os.environ.update(
+        MAIL_TRANSPORT=f"smtp://127.0.0.1:{port}",
+        EMAIL_ADDRESS="bench@localhost", APP_PASSWORD="bench",
+        # 발송 속도 제어 끔 — 순수 처리 시간만
+        SEND_DELAY_SEC="0", SEND_JITTER_SEC="0", COOLDOWN_EVERY="0",
+        DELIVERY_ENGINE=args.engine, METRICS_JSON_LOG="off",
+        ARCHIVE_AUTO="0",  # 합성 데이터가 지난 연도라도 커밋 간 비교가 되도록 보관 이동은 끔
+    )
+    os.chdir(ROOT)  # 템플릿/정적 파일은 저장소 기준 상대 경로
+    import app
+
+    rss_after_import = max_rss_mb()
+    observed = _capture_observations(app)
+    runner = {"payroll": run_payroll, "pdf": run_pdf, "admin": run_admin, "trweb": run_trweb}[args.child]
+    result = runner(app, args, os.environ["DATA_DIR"], sink_stats)
+    stop()
+
+    ops = result.pop("ops", {})
+    result["ops"] = {name: summarize(s) for name, s in ops.items()}
+    result["stages"] = {name: summarize(s) for name, s in observed.items() if name != "http_request"}
+    result["peak_rss_mb"] = max_rss_mb()
+    result["rss_after_import_mb"] = rss_after_import
+    print(json.dumps(result, ensure_ascii=False))
+
+
+# ---------------------------------------------------------------------------
+# parent: 조합별로 child 실행 → 결과 파일에 추가
+# ---------------------------------------------------------------------------
+def git_revision():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return rev, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def run_child(pipeline, rows, args):
+    data_dir = tempfile.mkdtemp(prefix="saedam_bench_")
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", pipeline, "--rows", str(rows),
+           "--sheets", str(args.sheets), "--repeat", str(args.repeat), "--engine", args.engine,
+           "--smtp-latency", str(args.smtp_latency), "--pdf-max", str(args.pdf_max)]
+    try:
+        out = subprocess.run(cmd, env={**os.environ, "DATA_DIR": data_dir},
+                             capture_output=True, text=True, timeout=args.timeout)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    if out.returncode != 0:
+        return {"error": (out.stderr or out.stdout).strip().splitlines()[-1:] or ["unknown"]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def load_previous(path, commit):
+    """같은 조합(pipeline, rows, sheets, engine)의 가장 최근 다른 커밋 결과."""
+    previous = {}
+    if not os.path.exists(path):
+        return previous
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get("commit") != commit:
+                previous[(rec["pipeline"], rec["rows"], rec["sheets"], rec["engine"])] = rec
+    return previous
+
+
+def _delta(new, old):
+    if not old:
+        return ""
+    return f" ({(new - old) / old * 100:+.0f}%)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 데이터 파이프라인 벤치마크")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES))
+    parser.add_argument("--rows", default="100,1000", help="쉼표 구분 (예: 100,1000,10000,50000)")
+    parser.add_argument("--sheets", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3, help="admin/trweb 반복 횟수")
+    parser.add_argument("--engine", choices=["sync", "async"], default="sync", help="payroll 발송 엔진")
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="SMTP 대역 서버 응답 지연(초)")
+    parser.add_argument("--pdf-max", type=int, default=20, help="pdf 파이프라인은 최대 이만큼만 생성")
+    parser.add_argument("--timeout", type=int, default=3600)
+    parser.add_argument("--results", default=DEFAULT_RESULTS)
+    parser.add_argument("--compare", action="store_true", help="이전 커밋 결과와 비교해서 출력")
+    parser.add_argument("--child", choices=PIPELINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.rows = int(args.rows)
+        child_main(args)
+        return
+
+    commit, dirty = git_revision()
+    previous = load_previous(args.results, commit) if args.compare else {}
+    pipelines = [p.strip() for p in args.pipelines.split(",") if p.strip()]
+    sizes = [int(r) for r in args.rows.split(",") if r.strip()]
+
+    print(f"commit={commit}{'+dirty' if dirty else ''} engine={args.engine} sheets={args.sheets}")
+    for pipeline in pipelines:
+        for rows in sizes:
+            result = run_child(pipeline, rows, args)
+            record = {
+                "ts": datetime.now().isoformat(timespec="seconds"), "commit": commit, "dirty": dirty,
+                "python": platform.python_version(), "pipeline": pipeline, "rows": rows,
+                "sheets": args.sheets, "engine": args.engine, **result,
+            }
+            with open(args.results, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+            if "error" in result or "skipped" in result:
+                print(f"  {pipeline:8s} rows={rows:<6d} {result.get('skipped') or result.get('error')}")
+                continue
+            old = previous.get((pipeline, rows, args.sheets, args.engine), {})
+            print(f"  {pipeline:8s} rows={rows:<6d} {result['elapsed_sec']:8.2f}s{_delta(result['elapsed_sec'], old.get('elapsed_sec'))}"
+                  f"  {result['throughput_per_sec']:9.1f}/s  peak={result['peak_rss_mb']}MB"
+                  f"{_delta(result['peak_rss_mb'], old.get('peak_rss_mb'))}")
+            for name, s in {**result["ops"], **result["stages"]}.items():
+                old_p95 = old.get("ops", {}).get(name, old.get("stages", {}).get(name, {})).get("p95_ms")
+                print(f"      {name:22s} n={s['count']:<6d} p50={s['p50_ms']:9.2f}ms  "
+                      f"p95={s['p95_ms']:9.2f}ms{_delta(s['p95_ms'], old_p95)}")
+    print(f"results -> {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+신청 폭주 부하 테스트: 동시 사용자가 form_login → form_page → submit 을 실제 HTTP로 수행.
+
+기본은 임시 DATA_DIR로 앱을 직접 띄움(gunicorn 있으면 gunicorn, 없으면 Flask threaded 서버)
++ 로컬 SMTP 대역(bench/smtp_sink.py). 끝나면 pending_submissions_XX.xlsx 를 다시 읽어
+이번 실행의 신청이 빠짐없이, 중복 없이 저장됐는지 확인. 하나라도 어긋나면 종료 코드 1.
+
+    python bench/loadtest.py --users 200 --concurrency 20 --workers 2 --threads 4
+    python bench/loadtest.py --url http://127.0.0.1:5000 --data-dir /mnt/data   # 이미 떠 있는 앱
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_suite import percentile  # noqa: E402
+from smtp_sink import start_sink  # noqa: E402
+
+SYSTEMS = ("system01", "system02")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(data_dir, smtp_port, args):
+    port = _free_port()
+    env = {
+        **os.environ, "DATA_DIR": data_dir, "MAIL_TRANSPORT": f"smtp://127.0.0.1:{smtp_port}",
+        "EMAIL_ADDRESS": "loadtest@localhost", "APP_PASSWORD": "loadtest", "METRICS_JSON_LOG": "off",
+    }
+    if args.server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "--threads", str(args.threads),
+               "-b", f"127.0.0.1:{port}", "--log-level", "warning", "app:app"]
+    else:
+        cmd = [sys.executable, "-c",
+               f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True, debug=False)"]
+    # 서버 로그는 파일로 (PIPE로 받고 안 읽으면 버퍼가 차서 앱이 멈춤)
+    log_path = os.path.join(data_dir, "server.log")
+    log = open(log_path, "wb")
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            with open(log_path, "rb") as f:
+                raise SystemExit(f"앱 실행 실패:\n{f.read().decode(errors='replace')[-2000:]}")
+        try:
+            urllib.request.urlopen(url + "/system01/form", timeout=1).read()
+            return proc, url
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit("앱이 30초 안에 뜨지 않았습니다")
+
+
+class Session:
+    """사용자 1명 — 쿠키(세션) 유지, 리다이렉트 따라감."""
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        with self.opener.open(self.base_url + path, data=body, timeout=self.timeout) as resp:
+            return resp.status, resp.geturl(), resp.read()
+
+
+def run_user(base_url, system, password, marker, index, args, results, lock):
+    """form_login(GET/POST) → form_page → submit. 단계별 지연/오류 기록."""
+    session = Session(base_url, args.timeout)
+    name = f"부하{index:05d}"
+    steps = [
+        ("form_login", f"/{system}/form", None),
+        ("login_post", f"/{system}/form", {"password": password}),
+        ("form_page", f"/{system}/form_page", None),
+        ("submit", f"/{system}/submit", {
+            "성명": name, "증명서종류": "경력증명서", "주민번호": "900101-1234567",
+            "자택주소": "서울", "근무시작일": "2020-01-01", "종료일선택": "현재까지",
+            "근무장소": "부하초등학교", "강의과목": "코딩", "용도": marker,
+            "이메일주소": f"load{index}@example.com",
+        }),
+    ]
+    for step, path, data in steps:
+        started = time.perf_counter()
+        error = None
+        try:
+            status, final_url, body = session.request(path, data)
+            if step == "login_post" and "/form_page" not in final_url:
+                error = "login_rejected"
+            elif step == "submit" and name.encode() not in body:
+                error = "submit_not_confirmed"
+        except urllib.error.HTTPError as e:
+            error = f"http_{e.code}"
+        except Exception as e:  # 타임아웃/연결 끊김 등
+            error = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            results.setdefault((system, step), {"latency": [], "errors": {}})
+            entry = results[(system, step)]
+            entry["latency"].append(elapsed)
+            if error:
+                entry["errors"][error] = entry["errors"].get(error, 0) + 1
+        if error:
+            return name, False
+    return name, True
+
+
+def check_integrity(data_dir, system, marker, submitted):
+    """이번 실행(marker)의 신청 행을 세서 누락/중복 확인."""
+    import pandas as pd
+
+    path = os.path.join(data_dir, f"pending_submissions_{system[-2:]}.xlsx")
+    if not os.path.exists(path):
+        return {"expected": len(submitted), "found": 0, "lost": len(submitted), "duplicated": 0, "unexpected": 0}
+    df = pd.read_excel(path)
+    mine = df[df["용도"].astype(str) == marker]
+    counts = mine["성명"].value_counts()
+    found = set(counts.index)
+    return {
+        "expected": len(submitted),
+        "found": int(len(mine)),
+        "lost": len(set(submitted) - found),
+        "duplicated": int((counts > 1).sum()),
+        "unexpected": len(found - set(submitted)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="신청(submit) 폭주 부하 테스트")
+    parser.add_argument("--url", help="이미 실행 중인 앱 주소 (없으면 임시로 띄움)")
+    parser.add_argument("--data-dir", help="--url 사용 시 무결성 검사에 쓸 앱의 DATA_DIR")
+    parser.add_argument("--systems", default=",".join(SYSTEMS))
+    parser.add_argument("--users", type=int, default=100, help="시스템당 사용자 수")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--server", choices=["gunicorn", "flask"], default=None)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn 워커 수")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn 워커당 스레드 수")
+    parser.add_argument("--smtp-latency", type=float, default=0.05, help="알림 메일 SMTP 응답 지연(초)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", help="결과를 JSON 파일로도 저장")
+    args = parser.parse_args()
+
+    if args.server is None:
+        try:
+            import gunicorn  # noqa: F401
+            args.server = "gunicorn"
+        except ImportError:
+            args.server = "flask"
+
+    systems = [s.strip() for s in args.systems.split(",") if s.strip()]
+    passwords = {
+        "system01": os.environ.get("USER_PW_SYS01", "0070"),
+        "system02": os.environ.get("USER_PW_SYS02", "0070"),
+    }
+    marker = f"loadtest-{uuid.uuid4().hex[:8]}"
+
+    proc = None
+    stop_sink = None
+    own_data_dir = None
+    sink_stats = None
+    if args.url:
+        base_url, data_dir = args.url.rstrip("/"), args.data_dir
+    else:
+        own_data_dir = data_dir = tempfile.mkdtemp(prefix="saedam_load_")
+        smtp_port, sink_stats, stop_sink = start_sink(latency=args.smtp_latency)
+        proc, base_url = start_app(data_dir, smtp_port, args)
+
+    results, lock = {}, threading.Lock()
+    submitted = {s: [] for s in systems}
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [
+                (system, pool.submit(run_user, base_url, system, passwords.get(system, ""), marker, i,
+                                     args, results, lock))
+                for i in range(args.users) for system in systems
+            ]
+            for system, future in futures:
+                name, ok = future.result()
+                if ok:
+                    submitted[system].append(name)
+        elapsed = time.perf_counter() - started
+
+        server_desc = (f"{args.server} workers={args.workers} threads={args.threads}"
+                       if args.server == "gunicorn" and not args.url else (args.url or args.server))
+        print(f"server={server_desc} users={args.users}/system concurrency={args.concurrency} "
+              f"elapsed={elapsed:.1f}s marker={marker}")
+        report = {"marker": marker, "elapsed_sec": round(elapsed, 3), "systems": {}}
+        failed = False
+        for system in systems:
+            ok = len(submitted[system])
+            print(f"\n[{system}] sessions ok={ok}/{args.users}  throughput={ok / elapsed:.1f} submit/s")
+            sys_report = {"steps": {}}
+            for step in ("form_login", "login_post", "form_page", "submit"):
+                entry = results.get((system, step))
+                if not entry:
+                    continue
+                lat = entry["latency"]
+                errors = sum(entry["errors"].values())
+                sys_report["steps"][step] = {
+                    "count": len(lat), "errors": entry["errors"],
+                    "error_rate": round(errors / len(lat), 4),
+                    "p50_ms": round(percentile(lat, 50) * 1000, 1),
+                    "p95_ms": round(percentile(lat, 95) * 1000, 1),
+                    "p99_ms": round(percentile(lat, 99) * 1000, 1),
+                    "max_ms": round(max(lat) * 1000, 1),
+                }
+                s = sys_report["steps"][step]
+                print(f"  {step:11s} n={s['count']:<5d} err={errors:<4d} p50={s['p50_ms']:8.1f}ms "
+                      f"p95={s['p95_ms']:8.1f}ms p99={s['p99_ms']:8.1f}ms max={s['max_ms']:8.1f}ms"
+                      + (f"  {entry['errors']}" if errors else ""))
+            if data_dir:
+                integrity = check_integrity(data_dir, system, marker, submitted[system])
+                sys_report["integrity"] = integrity
+                bad = integrity["lost"] or integrity["duplicated"] or integrity["unexpected"]
+                failed = failed or bool(bad)
+                print(f"  integrity   {'❌' if bad else '✅'} expected={integrity['expected']} "
+                      f"found={integrity['found']} lost={integrity['lost']} duplicated={integrity['duplicated']}")
+            report["systems"][system] = sys_report
+        if sink_stats is not None:
+            # 알림 메일은 응답 후 비동기로 나갈 수 있으므로 잠깐 기다림
+            time.sleep(1)
+            report["notifications_received"] = sink_stats.messages
+            print(f"\nadmin notifications received by SMTP sink: {sink_stats.messages}")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if stop_sink is not None:
+            stop_sink()
+        if own_data_dir:
+            shutil.rmtree(own_data_dir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
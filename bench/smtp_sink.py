@@ -0,0 +1,144 @@
+"""
+로컬 SMTP 대역(stand-in) 서버 — 실제로 메일을 보내지 않고 받아서 버림.
+
+벤치마크/부하 테스트에서 MAIL_TRANSPORT=smtp://127.0.0.1:<port> 로 지정해 사용.
+--latency 로 메일 1통당 응답 지연(초)을 줘서 Gmail 같은 원격 서버의 왕복 시간을 흉내낼 수 있음.
+
+    python bench/smtp_sink.py --port 1025 --latency 0.05
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+
+class SinkStats:
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+        self.connections = 0
+        self.max_concurrent = 0
+        self._open = 0
+        self.lock = threading.Lock()
+
+    def opened(self):
+        with self.lock:
+            self.connections += 1
+            self._open += 1
+            self.max_concurrent = max(self.max_concurrent, self._open)
+
+    def closed(self):
+        with self.lock:
+            self._open -= 1
+
+    def received(self, size):
+        with self.lock:
+            self.messages += 1
+            self.bytes += size
+
+
+async def _handle(reader, writer, stats, latency):
+    stats.opened()
+
+    async def reply(line):
+        writer.write((line + "\r\n").encode())
+        await writer.drain()
+
+    try:
+        await reply("220 smtp-sink ready")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            cmd = line.decode("utf-8", "replace").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                writer.write(b"250-smtp-sink\r\n250-8BITMIME\r\n250-AUTH PLAIN LOGIN\r\n250 SIZE 52428800\r\n")
+                await writer.drain()
+            elif verb == "AUTH":
+                # AUTH LOGIN은 사용자/비밀번호를 두 번 더 받음 — 내용은 검사하지 않음
+                if cmd.upper().startswith("AUTH LOGIN"):
+                    for _ in range(2 if len(cmd.split()) == 2 else 1):
+                        await reply("334 VXNlcm5hbWU6")
+                        await reader.readline()
+                await reply("235 2.7.0 Authentication successful")
+            elif verb == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    chunk = await reader.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    size += len(chunk)
+                if latency:
+                    await asyncio.sleep(latency)
+                stats.received(size)
+                await reply("250 2.0.0 OK queued")
+            elif verb == "QUIT":
+                await reply("221 Bye")
+                break
+            elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                await reply("250 OK")
+            else:
+                await reply("502 Command not implemented")
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        stats.closed()
+        writer.close()
+
+
+def start_sink(host="127.0.0.1", port=0, latency=0.0):
+    """
+    백그라운드 스레드에서 싱크 서버 시작.
+    반환: (실제 포트, SinkStats, stop 함수)
+    """
+    stats = SinkStats()
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    holder = {}
+
+    async def main():
+        server = await asyncio.start_server(
+            lambda r, w: _handle(r, w, stats, latency), host, port)
+        holder["server"] = server
+        holder["port"] = server.sockets[0].getsockname()[1]
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(main())
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait(5)
+
+    def stop():
+        loop.call_soon_threadsafe(holder["server"].close)
+        for task in asyncio.all_tasks(loop):
+            loop.call_soon_threadsafe(task.cancel)
+        thread.join(5)
+
+    return holder["port"], stats, stop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 SMTP 대역 서버 (메일을 받아서 버림)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency", type=float, default=0.0, help="메일 1통당 응답 지연(초)")
+    args = parser.parse_args()
+
+    port, stats, stop = start_sink(args.host, args.port, args.latency)
+    print(f"📮 SMTP sink listening on {args.host}:{port} (latency={args.latency}s)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"  messages={stats.messages} bytes={stats.bytes} connections={stats.connections} max_concurrent={stats.max_concurrent}")
+    except KeyboardInterrupt:
+        stop()
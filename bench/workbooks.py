@@ -0,0 +1,141 @@
+"""
+벤치마크/부하 테스트용 합성 엑셀 생성기.
+
+실제 업로드 파일과 같은 모양(1행 제목, 3행 헤더)으로 만들어서 process_excel_multi,
+/trweb 입금 엑셀 생성기, 관리자 화면(pending_submissions_XX.xlsx)을 그대로 태울 수 있음.
+행 수가 많아도 빠르도록 openpyxl write_only 모드 사용. 같은 seed면 같은 파일.
+
+    python bench/workbooks.py payroll /tmp/payroll.xlsx --rows 5000 --sheets 10
+"""
+import argparse
+import random
+
+import openpyxl
+
+# process_excel_multi 의 template_rules 키워드와 맞춘 시트 제목 (1행)
+PAYROLL_TITLES = [
+    "2025년 강사 수수료 지급명세",
+    "2025년 직원근로자 급여 지급명세",
+    "2025년 직원사업자 수수료 지급명세",
+    "2025년 퇴직자 지급명세",
+]
+PAYROLL_HEADER = ["강사명", "이메일", "학교명", "과목", "은행", "계좌번호",
+                  "지급총액", "공제총액", "근로소득세", "지방소득세", "강사전달비고"]
+
+DEPOSIT_HEADER = ["은행", "계좌번호", "예금주", "입금액"]
+
+SUBMISSION_COLUMNS = [
+    "신청일", "증명서종류", "성명", "주민번호", "자택주소",
+    "근무시작일", "근무종료일", "근무장소", "강의과목", "용도", "직책",
+    "이메일주소", "상태", "발급일", "발급번호", "종료사유",
+]
+
+BANKS = ["국민", "신한", "우리", "하나", "농협", "기업", "카카오뱅크", "새마을금고", "우체국"]
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN = "민서지현준우영수하은도윤예진성호태희"
+CERT_TYPES = ["경력증명서", "강사 위촉증명서", "강사 해촉증명서"]
+
+
+def _name(rng):
+    return rng.choice(SURNAMES) + rng.choice(GIVEN) + rng.choice(GIVEN)
+
+
+def _account(rng):
+    return f"{rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(100000, 999999)}"
+
+
+def _split(rows, sheets):
+    sheets = max(1, min(sheets, rows or 1))
+    base, extra = divmod(rows, sheets)
+    return [base + (1 if i < extra else 0) for i in range(sheets)]
+
+
+def payroll_workbook(path, rows, sheets=1, seed=1, domain="example.com"):
+    """급여명세서 발송용 (send01/send02 업로드 양식)."""
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    n = 0
+    for s, count in enumerate(_split(rows, sheets)):
+        ws = wb.create_sheet(f"시트{s + 1}")
+        ws.append([PAYROLL_TITLES[s % len(PAYROLL_TITLES)]])
+        ws.append([])
+        ws.append(PAYROLL_HEADER)
+        for _ in range(count):
+            total = rng.randint(10, 500) * 10000
+            deduction = total * 33 // 1000
+            ws.append([
+                _name(rng), f"user{n}@{domain}", f"{rng.choice('가나다라마')}초등학교",
+                rng.choice(["미술", "코딩", "바둑", "과학", "체육"]), rng.choice(BANKS), _account(rng),
+                total, deduction, deduction * 10 // 11, deduction // 11, "",
+            ])
+            n += 1
+    wb.save(path)
+    return n
+
+
+def deposit_workbook(path, rows, sheets=1, seed=1):
+    """/trweb 입금용 엑셀 생성기 입력 (은행/계좌번호/예금주/입금액, 3행 헤더)."""
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    for s, count in enumerate(_split(rows, sheets)):
+        ws = wb.create_sheet(f"시트{s + 1}")
+        ws.append([f"입금 명세 {s + 1}"])
+        ws.append([])
+        ws.append(DEPOSIT_HEADER)
+        for _ in range(count):
+            ws.append([rng.choice(BANKS), _account(rng), _name(rng), rng.randint(10, 500) * 10000])
+    wb.save(path)
+    return rows
+
+
+def submission_row(rng, i, issued=False):
+    start = f"20{rng.randint(15, 23)}-{rng.randint(1, 12):02d}-01"
+    cert = rng.choice(CERT_TYPES)
+    return {
+        "신청일": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "증명서종류": cert,
+        "성명": _name(rng),
+        "주민번호": f"{rng.randint(600101, 991231)}-{rng.randint(1, 2)}{rng.randint(0, 999999):06d}",
+        "자택주소": f"서울시 {rng.choice('가나다라')}구 {i}번지",
+        "근무시작일": start,
+        "근무종료일": "현재까지" if rng.random() < 0.5 else "2024-12-31",
+        "근무장소": f"{rng.choice('가나다라마')}초등학교",
+        "강의과목": rng.choice(["미술", "코딩", "바둑", "과학"]),
+        "용도": "제출용",
+        "직책": "강사",
+        "이메일주소": f"applicant{i}@example.com",
+        "상태": "발급완료" if issued else "대기",
+        "발급일": "2025-01-02" if issued else "",
+        "발급번호": f"제25-{i + 1:04d}호" if issued else "",
+        "종료사유": "계약만료" if cert == "강사 해촉증명서" else "",
+    }
+
+
+def submissions_workbook(path, rows, seed=1, issued_ratio=0.5):
+    """pending_submissions_XX.xlsx (관리자 화면 데이터)."""
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(SUBMISSION_COLUMNS)
+    for i in range(rows):
+        row = submission_row(rng, i, issued=rng.random() < issued_ratio)
+        ws.append([row[c] for c in SUBMISSION_COLUMNS])
+    wb.save(path)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="합성 엑셀 생성")
+    parser.add_argument("kind", choices=["payroll", "deposit", "submissions"])
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--sheets", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.kind == "payroll":
+        payroll_workbook(args.path, args.rows, args.sheets, args.seed)
+    elif args.kind == "deposit":
+        deposit_workbook(args.path, args.rows, args.sheets, args.seed)
+    else:
+        submissions_workbook(args.path, args.rows, args.seed)
+    print(f"✅ {args.kind}: {args.rows}행 -> {args.path}")
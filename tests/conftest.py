@@ -0,0 +1,52 @@
+"""
+테스트 공통 설정: app 을 import 하기 전에 임시 DATA_DIR / 메모리 메일 트랜스포트로 고정.
+    python -m pytest -q        (저장소 루트에서)
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.update(
+    DATA_DIR=tempfile.mkdtemp(prefix="saedam-test-"),
+    MAIL_TRANSPORT="memory",
+    DISPATCH_SCHEDULER="0",
+    METRICS_JSON_LOG="off",
+    EMAIL_ADDRESS="ops@example.com",
+    APP_PASSWORD="test",
+    SEND_DELAY_SEC="0",
+    SEND_JITTER_SEC="0",
+    COOLDOWN_EVERY="0",
+    CERT_PRERENDER="0",          # wkhtmltopdf 없이 돌도록 초안 PDF 미리 만들기 끔
+)
+# app.py 는 templates/ 등을 상대 경로로 읽음
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def runtime_db():
+    """runtime SQLite(발송 한도/예약 묶음/발송 기록/상태)를 비운 채로 시작."""
+    import app
+
+    with app._runtime_db(write=True) as conn:
+        for table in ("runtime_state", "runtime_names", "mail_usage", "dispatch_jobs", "dispatch_chunks",
+                      "send_reports", "send_report_rows"):
+            conn.execute(f"DELETE FROM {table}")
+    return app
+
+
+@pytest.fixture
+def submissions():
+    """system01 신청 목록을 빈 파일로 시작. 반환: 파일 경로."""
+    import app
+
+    path = app.submissions_path("system01")
+    if os.path.exists(path):
+        os.remove(path)
+    app.ensure_data_file(path)
+    return path
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import shutil
+import zipfile
+
+import pandas as pd
+import pytest
+
+import app
+
+
+def record(name, status, applied, issued="", no="", **extra):
+    return {"신청일": applied, "증명서종류": "강사 활동증명서", "성명": name, "주민번호": "900101-2345678",
+            "자택주소": "서울", "근무시작일": "2020-03-01", "근무종료일": "현재까지", "근무장소": "새담초",
+            "강의과목": "코딩", "용도": "제출용", "직책": "강사", "이메일주소": f"{name}@example.com",
+            "상태": status, "발급일": issued, "발급번호": no, "종료사유": "", **extra}
+
+
+@pytest.fixture
+def archive_env(submissions):
+    shutil.rmtree(os.path.join(app.ARCHIVE_DIR, "system01"), ignore_errors=True)
+    shutil.rmtree(app.pdf_dir("system01"), ignore_errors=True)
+    os.makedirs(app.pdf_dir("system01"))
+    app._verify_cache.clear()
+    this_year = app.now_kst().year
+    rows = [
+        record("김지난", "발급완료", "2024-12-20", "2025-01-05", "제25-0001호"),
+        record("이지난", "발급완료", "2025-02-01", "2025-02-02 10:00:00", "제25-0002호"),
+        record("이대기", "대기", "2025-03-01"),                                        # 대기는 연도와 관계없이 남음
+        record("최올해", "발급완료", f"{this_year}-01-02", f"{this_year}-01-03",
+               f"제{this_year % 100}-0001호"),
+    ]
+    app.write_submissions(pd.DataFrame(rows), submissions)
+    for row in rows:
+        if row["발급번호"]:
+            with open(app.certificate_pdf_path("system01", row), "wb") as f:
+                f.write(f"%PDF {row['발급번호']}".encode())
+    return rows
+
+
+def test_closed_years_move_to_archive_with_pdfs(archive_env, submissions):
+    old_pdf = app.certificate_pdf_path("system01", archive_env[0])
+    assert app.archive_closed_years("system01") == {2025: 2}
+
+    left = app.read_submissions(submissions)
+    assert list(left["성명"]) == ["이대기", "최올해"]
+    assert not os.path.exists(old_pdf)
+    assert os.path.exists(app.certificate_pdf_path("system01", archive_env[3]))
+
+    with zipfile.ZipFile(app.archive_path("system01", 2025)) as zf:
+        names = sorted(zf.namelist())
+    assert names == ["pdfs/제25-0001호_김지난_강사활동증명서.pdf", "pdfs/제25-0002호_이지난_강사활동증명서.pdf",
+                     app.ARCHIVE_DATA_NAME]
+    assert app.archive_years("system01") == [2025]
+    assert app.archive_closed_years("system01") == {}                  # 두 번째는 옮길 것 없음
+
+
+def test_archiving_again_appends_without_duplicates(archive_env, submissions):
+    app.archive_closed_years("system01")
+    late = record("박늦게", "발급완료", "2025-11-01", "2025-11-02", "제25-0003호")
+    df = app.read_submissions(submissions)
+    app.write_submissions(pd.concat([df, pd.DataFrame([late])], ignore_index=True), submissions)
+    assert app.archive_closed_years("system01") == {2025: 1}
+    archived = app.load_archive("system01", 2025)
+    assert sorted(archived["df"]["성명"]) == ["김지난", "박늦게", "이지난"]
+
+
+def test_keep_years_leaves_recent_years_in_working_file(archive_env, monkeypatch):
+    monkeypatch.setattr(app, "ARCHIVE_KEEP_YEARS", app.now_kst().year - 2025)
+    assert app.archive_closed_years("system01") == {}
+
+
+def test_verify_finds_archived_numbers_with_pdf_hash(archive_env):
+    app.archive_closed_years("system01")
+    result = app.verify_certificate("system01", "25-2")
+    assert result["valid"] and result["발급번호"] == "제25-0002호"
+    assert result["성명"] == "이*난" and result["발급일"] == "2025-02-02"
+    assert result["pdf_sha256"] == hashlib.sha256("%PDF 제25-0002호".encode()).hexdigest()
+
+    this_year = app.now_kst().year % 100
+    assert app.verify_certificate("system01", f"제{this_year}-0001호")["valid"]     # 작업 파일
+    assert not app.verify_certificate("system01", "제25-0099호")["valid"]
+    assert not app.verify_certificate("system01", "아무거나")["valid"]
+
+
+def test_archive_search_and_pdf_download(archive_env):
+    app.archive_closed_years("system01")
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess["system01_authenticated"] = True
+    page = client.get("/system01/archive?q=이 지난").get_data(as_text=True)
+    assert "제25-0002호" in page and "제25-0001호" not in page
+    pdf = client.get("/system01/archive/2025/pdf/제25-0001호_김지난_강사활동증명서.pdf")
+    assert pdf.status_code == 200 and pdf.data == "%PDF 제25-0001호".encode()
+    assert client.get("/system01/archive/2025/pdf/없음.pdf").status_code == 404
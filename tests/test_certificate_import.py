@@ -0,0 +1,102 @@
+import io
+
+import pandas as pd
+
+import app
+
+GOOD = {
+    "성명": "김하나", "주민번호": "900101-2345678", "자택주소": "서울시 중구", "근무장소": "새담초등학교",
+    "강의과목": "코딩", "용도": "제출용", "직책": "강사", "이메일주소": "hana@example.com",
+    "증명서종류": "강사 활동증명서", "근무시작일": "2024-03-01", "근무종료일": "", "종료사유": "",
+}
+
+
+def rows(*overrides):
+    return pd.DataFrame([{**GOOD, **o} for o in overrides])
+
+
+def reasons(rejected):
+    return {r["행"]: r["사유"] for r in rejected}
+
+
+def test_valid_row_is_normalised():
+    good, rejected = app.validate_import_requests(rows({
+        "주민번호": "9001012345678", "이메일주소": " MAILTO:Hana@Example.COM. ", "증명서종류": "강사활동증명서",
+        "근무시작일": "2024년 3월 1일", "근무종료일": "현재", "종료사유": "계약만료"}))
+    assert rejected == []
+    row = good.iloc[0]
+    assert list(good.columns) == app.SUBMISSION_FIELDS
+    assert row["주민번호"] == "900101-2345678"
+    assert row["이메일주소"] == "hana@example.com"
+    assert row["증명서종류"] == "강사 활동증명서"
+    assert (row["근무시작일"], row["근무종료일"]) == ("2024-03-01", "현재까지")
+    assert row["종료사유"] == ""                    # 해촉증명서만 보관
+    assert (row["상태"], row["발급번호"]) == ("대기", "")
+
+
+def test_rejects_report_excel_row_and_every_reason():
+    good, rejected = app.validate_import_requests(rows(
+        {},
+        {"성명": "", "주민번호": "123"},
+        {"성명": "박둘", "이메일주소": "not-an-email", "증명서종류": "재직증명서"},
+        {"성명": "최셋", "근무시작일": "2024-05-01", "근무종료일": "2024.4.1"},
+        {"성명": "정넷", "증명서종류": "강사 해촉증명서", "근무종료일": "", "종료사유": "이사"},
+        {"성명": "한다섯", "근무시작일": "언젠가"},
+    ))
+    assert list(good["성명"]) == ["김하나"]
+    assert reasons(rejected) == {
+        3: "성명 없음; 주민번호 형식",
+        4: "증명서종류 확인; 이메일 형식",
+        5: "근무종료일이 시작일보다 빠름",
+        6: "해촉증명서는 근무종료일 필요; 종료사유 확인",
+        7: "근무시작일 형식",
+    }
+
+
+def test_blank_lines_skipped_and_in_file_duplicates_keep_first():
+    df = pd.concat([rows({}), pd.DataFrame([{k: "" for k in GOOD}]), rows({"주민번호": "9001012345678"})],
+                   ignore_index=True)
+    good, rejected = app.validate_import_requests(df)
+    assert len(good) == 1
+    assert reasons(rejected) == {4: "파일 안 중복"}
+
+
+def test_read_import_file_handles_aliases_and_cp949_csv(tmp_path):
+    path = tmp_path / "requests.csv"
+    df = pd.DataFrame([GOOD]).rename(columns={"이메일주소": "이메일", "근무장소": "근무학교", "증명서종류": "종류"})
+    path.write_bytes(df.to_csv(index=False).encode("cp949"))
+    read = app.read_import_file(str(path))
+    assert {"이메일주소", "근무장소", "증명서종류"} <= set(read.columns)
+    assert read.loc[0, "성명"] == "김하나"
+
+
+def test_import_appends_and_flags_existing_duplicates(submissions, monkeypatch):
+    first, _ = app.validate_import_requests(rows({}))
+    assert app.import_submissions("system01", first) == (1, 0, 0)
+    again, _ = app.validate_import_requests(rows({}, {"성명": "이둘", "주민번호": "910101-1234567"}))
+    assert app.import_submissions("system01", again) == (2, 1, 0)
+    assert len(app.read_submissions(submissions)) == 3
+
+    monkeypatch.setattr(app, "DUPLICATE_POLICY", "merge")
+    assert app.import_submissions("system01", again) == (0, 0, 2)
+    assert len(app.read_submissions(submissions)) == 3
+
+
+def test_import_route_check_does_not_save(submissions):
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess["system01_authenticated"] = True
+    buf = io.BytesIO()
+    rows({}, {"성명": ""}).to_excel(buf, index=False)
+
+    def post(action):
+        buf.seek(0)
+        return client.post("/system01/import", data={"action": action, "file": (io.BytesIO(buf.getvalue()), "a.xlsx")},
+                           content_type="multipart/form-data")
+
+    page = post("check").get_data(as_text=True)
+    assert "통과 1건" in page and "제외 1건" in page and "저장하지 않음" in page
+    assert len(app.read_submissions(submissions)) == 0
+    page = post("import").get_data(as_text=True)
+    assert "1건 등록" in page
+    assert list(app.read_submissions(submissions)["성명"]) == ["김하나"]
@@ -0,0 +1,190 @@
+from datetime import datetime, time as dtime
+
+import pytest
+
+import app
+
+DAY = "2026-03-02"
+
+
+def kst(day, hhmm):
+    return datetime.fromisoformat(f"{day}T{hhmm}:00").replace(tzinfo=app.KST)
+
+
+@pytest.fixture
+def quota(monkeypatch, runtime_db):
+    # 하루 50통 - 남길 몫 10 → 예약 발송은 하루 40통, 시간대 2개
+    monkeypatch.setenv("MAIL_DAILY_QUOTA", "50")
+    monkeypatch.setattr(app, "MAIL_QUOTA_RESERVE", 10)
+    monkeypatch.setattr(app, "DISPATCH_WINDOWS", "09:00-12:00,13:00-18:00")
+    return app
+
+
+def add_job(tmp_path, key="send01", total=100):
+    path = tmp_path / f"job_{key}.xlsx"
+    path.write_bytes(b"x")
+    with app._runtime_db(write=True) as conn:
+        return conn.execute(
+            "INSERT INTO dispatch_jobs(key, file, filename, send_date, image_mode, public_base_url, total, "
+            "created, status) VALUES (?, ?, 'a.xlsx', ?, 'cid', '', ?, ?, 'planned')",
+            (key, str(path), DAY, total, f"{DAY}T08:00:00")).lastrowid
+
+
+def use_quota(day, n):
+    with app._runtime_db(write=True) as conn:
+        conn.execute("INSERT INTO mail_usage(account, day, count) VALUES ('ops@example.com', ?, ?)", (day, n))
+
+
+def plan(job_id, start_dt, offset, total, key="send01"):
+    with app._runtime_db(write=True) as conn:
+        return app._plan_chunks(conn, key, job_id, start_dt, offset, total)
+
+
+def chunks(job_id=None):
+    with app._runtime_db() as conn:
+        rows = conn.execute("SELECT id, job_id, day, run_at, start, stop, status FROM dispatch_chunks ORDER BY id")
+        keys = ("id", "job_id", "day", "run_at", "start", "stop", "status")
+        return [dict(zip(keys, r)) for r in rows if job_id is None or r[1] == job_id]
+
+
+def summary(job_id):
+    return [(c["run_at"][:16], c["start"], c["stop"]) for c in chunks(job_id) if c["status"] == "planned"]
+
+
+def test_dispatch_windows_skip_invalid_parts(monkeypatch):
+    monkeypatch.setattr(app, "DISPATCH_WINDOWS", "09:00-12:00, 25:00-26:00, 14:00-13:00, 13:00-18:00")
+    assert app.dispatch_windows() == [(dtime(9), dtime(12)), (dtime(13), dtime(18))]
+    monkeypatch.setattr(app, "DISPATCH_WINDOWS", "garbage")
+    assert app.dispatch_windows() == [(dtime(9), dtime(18))]
+
+
+def test_plan_spreads_over_windows_and_days(quota, tmp_path):
+    job = add_job(tmp_path)
+    assert plan(job, kst(DAY, "08:00"), 0, 100) == 100
+    assert summary(job) == [
+        ("2026-03-02T09:00", 0, 20), ("2026-03-02T13:00", 20, 40),
+        ("2026-03-03T09:00", 40, 60), ("2026-03-03T13:00", 60, 80),
+        ("2026-03-04T09:00", 80, 90), ("2026-03-04T13:00", 90, 100),
+    ]
+
+
+def test_plan_respects_mail_already_sent_and_other_jobs(quota, tmp_path):
+    use_quota(DAY, 30)                                  # 그날 이미 30통 → 예약 몫은 10
+    first = add_job(tmp_path, total=16)
+    plan(first, kst(DAY, "08:00"), 0, 16)
+    assert summary(first) == [("2026-03-02T09:00", 0, 5), ("2026-03-02T13:00", 5, 10),
+                              ("2026-03-03T09:00", 10, 13), ("2026-03-03T13:00", 13, 16)]
+    # send02 도 같은 계정 → 같은 한도를 나눠 씀 (둘째 날 남은 몫 34)
+    second = add_job(tmp_path, key="send02", total=40)
+    plan(second, kst(DAY, "08:00"), 0, 40, key="send02")
+    assert summary(second) == [("2026-03-03T09:00", 0, 17), ("2026-03-03T13:00", 17, 34),
+                               ("2026-03-04T09:00", 34, 37), ("2026-03-04T13:00", 37, 40)]
+
+
+def test_plan_starting_mid_day_uses_remaining_windows_only(quota, tmp_path):
+    job = add_job(tmp_path, total=30)
+    plan(job, kst(DAY, "14:30"), 0, 30)
+    assert summary(job) == [("2026-03-02T14:30", 0, 30)]
+
+
+def test_plan_gives_up_when_quota_is_all_reserved(quota, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, "MAIL_QUOTA_RESERVE", 50)
+    job = add_job(tmp_path, total=5)
+    assert plan(job, kst(DAY, "08:00"), 0, 5) == 0
+    assert chunks(job) == []
+
+
+def test_claim_runs_due_chunks_one_per_key(quota, tmp_path):
+    job = add_job(tmp_path, total=60)
+    plan(job, kst(DAY, "08:00"), 0, 60)
+    assert app._claim_due_chunk(kst(DAY, "08:59")) is None            # 아직 시간 전
+
+    claimed = app._claim_due_chunk(kst(DAY, "13:05"))
+    assert (claimed["start"], claimed["stop"]) == (0, 20)
+    # 같은 담당자 묶음이 도는 중이면 밀린 13:00 묶음도 기다림
+    assert app._claim_due_chunk(kst(DAY, "13:05")) is None
+    with app._runtime_db() as conn:
+        assert conn.execute("SELECT status FROM dispatch_jobs WHERE id=?", (job,)).fetchone()[0] == "running"
+
+
+def test_claim_marks_stale_running_chunks_interrupted(quota, tmp_path):
+    job = add_job(tmp_path, total=40)
+    plan(job, kst(DAY, "08:00"), 0, 40)
+    first = app._claim_due_chunk(kst(DAY, "09:00"))
+    nxt = app._claim_due_chunk(kst("2026-03-03", "09:00"))    # DISPATCH_STALE_HOURS(12) 지남
+    assert [c["status"] for c in chunks(job)][:1] == ["interrupted"]
+    assert nxt["id"] != first["id"] and nxt["start"] == 20
+
+
+def test_catch_up_after_missed_windows_moves_chunk_to_today_within_quota(quota, tmp_path):
+    job = add_job(tmp_path, total=40)
+    plan(job, kst(DAY, "08:00"), 0, 40)
+    # 서버가 하루 꺼져 있다가 다음 날 켜짐 — 오늘 이미 증명서 메일 25통 → 예약 몫 15
+    app.record_mail_usage("ops@example.com", 25)
+    today = app.now_kst().strftime("%Y-%m-%d")
+    claimed = app._claim_due_chunk(kst(today, "10:00"))
+    assert (claimed["start"], claimed["stop"]) == (0, 15)
+    rows = chunks(job)
+    assert rows[0]["day"] == today and rows[0]["status"] == "running"
+    # 못 보낸 15..20 은 다시 배정되고, 전체 범위는 빠짐없이 한 번씩
+    covered = sorted((c["start"], c["stop"]) for c in rows if c["status"] in ("planned", "running"))
+    assert covered[0] == (0, 15) and covered[-1][1] == 40
+    assert all(a[1] == b[0] for a, b in zip(covered, covered[1:]))
+
+
+def test_claim_with_no_quota_left_reschedules_whole_chunk(quota, tmp_path):
+    job = add_job(tmp_path, total=10)
+    plan(job, kst(DAY, "08:00"), 0, 10)
+    today = app.now_kst().strftime("%Y-%m-%d")
+    app.record_mail_usage("ops@example.com", 40)
+    assert app._claim_due_chunk(kst(today, "10:00")) is None
+    statuses = [(c["status"], c["start"], c["stop"]) for c in chunks(job)]
+    assert ("moved", 0, 0) in statuses
+    assert sum(stop - start for status, start, stop in statuses if status == "planned") == 10
+
+
+def test_cancel_planned_job_removes_file(quota, tmp_path):
+    job = add_job(tmp_path, total=40)
+    plan(job, kst(DAY, "08:00"), 0, 40)
+    assert app.cancel_dispatch(job)
+    assert {c["status"] for c in chunks(job)} == {"canceled"}
+    assert not (tmp_path / "job_send01.xlsx").exists()
+    assert app.cancel_dispatch(999999) is False
+
+
+def test_cancel_while_chunk_runs_keeps_canceled(quota, monkeypatch, tmp_path):
+    job = add_job(tmp_path, total=40)
+    plan(job, kst(DAY, "08:00"), 0, 40)
+    chunk = app._claim_due_chunk(kst(DAY, "09:00"))
+
+    def fake_send(key, path, **kwargs):
+        app.cancel_dispatch(job)                       # 보내는 도중 취소
+        app.runtime_add(kwargs["state_key"], sent_count=chunk["stop"] - chunk["start"])
+        return kwargs["report_id"]
+
+    monkeypatch.setattr(app, "process_excel_multi", fake_send)
+    app._run_dispatch_chunk(chunk)
+    with app._runtime_db() as conn:
+        assert conn.execute("SELECT status FROM dispatch_jobs WHERE id=?", (job,)).fetchone()[0] == "canceled"
+    assert [c["status"] for c in chunks(job)] == ["done", "canceled"]
+    assert not (tmp_path / "job_send01.xlsx").exists()
+
+
+def test_scheduled_chunk_keeps_interactive_state(quota, monkeypatch, tmp_path):
+    app.runtime_reset("send01")
+    app.runtime_add("send01", entry="화면 발송", sent_count=3)
+    app.set_stop_requested("send01", True)
+    job = add_job(tmp_path, total=10)
+    plan(job, kst(DAY, "08:00"), 0, 10)
+    chunk = app._claim_due_chunk(kst(DAY, "09:00"))
+
+    def fake_send(key, path, **kwargs):
+        app.runtime_reset(kwargs["state_key"])
+        app.runtime_add(kwargs["state_key"], sent_count=5)
+        return kwargs["report_id"]
+
+    monkeypatch.setattr(app, "process_excel_multi", fake_send)
+    app._run_dispatch_chunk(chunk)
+    assert app.runtime_get("send01", "sent_count") == 3
+    assert app.is_stop_requested("send01")
+    assert [c["status"] for c in chunks(job)][0] == "done"
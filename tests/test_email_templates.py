@@ -0,0 +1,92 @@
+import re
+
+import app
+
+
+def _style_of(html, tag_id):
+    m = re.search(rf'<[^>]*\bid="{tag_id}"[^>]*\bstyle="([^"]*)"', html)
+    return m.group(1) if m else ""
+
+
+def _kept_css(html):
+    return " ".join(re.findall(r"<style>(.*?)</style>", html, flags=re.S))
+
+
+def test_simple_rules_move_into_style_attribute():
+    html, inlined, kept = app.inline_css(
+        "<html><head><style>p { color: red } .note { font-size: 12px }</style></head>"
+        '<body><p id="a" class="note">x</p></body></html>')
+    assert _style_of(html, "a") == "color: red; font-size: 12px"
+    assert (inlined, kept) == (2, 0)
+    assert "<style>" not in html
+
+
+def test_existing_style_attribute_wins_over_rules():
+    html, _, _ = app.inline_css(
+        '<html><head><style>p { color: red }</style></head><body><p id="a" style="color: blue">x</p></body></html>')
+    assert _style_of(html, "a") == "color: red; color: blue"
+
+
+def test_more_specific_simple_rule_is_applied_last():
+    html, _, _ = app.inline_css(
+        "<html><head><style>#a { color: green } p.note { color: blue } p { color: red }</style></head>"
+        '<body><p id="a" class="note">x</p></body></html>')
+    assert _style_of(html, "a") == "color: red; color: blue; color: green"
+
+
+def test_property_targeted_by_leftover_rule_stays_in_style_block():
+    # td p 는 옮길 수 없는 (더 특이한) 규칙 — p 의 color 를 인라인하면 td p 가 더는 이기지 못함
+    html, inlined, kept = app.inline_css(
+        "<html><head><style>p { color: red; margin: 0 } td p { color: blue }</style></head>"
+        '<body><table><tr><td><p id="a">x</p></td></tr></table></body></html>')
+    assert _style_of(html, "a") == "margin: 0"
+    css = _kept_css(html)
+    assert css.index("p { color: red }") < css.index("td p { color: blue }")
+    assert (inlined, kept) == (1, 2)
+
+
+def test_media_query_properties_block_inlining_including_shorthands():
+    html, _, _ = app.inline_css(
+        "<html><head><style>td { padding: 10px; color: red } "
+        "@media (max-width: 600px) { td { padding-left: 0 } }</style></head>"
+        '<body><table><tr><td id="a">x</td></tr></table></body></html>')
+    assert _style_of(html, "a") == "color: red"
+    css = _kept_css(html)
+    assert "td { padding: 10px }" in css and "@media" in css
+
+
+def test_single_quoted_attributes():
+    html, _, _ = app.inline_css(
+        "<html><head><style>.note { color: red }</style></head>"
+        "<body><p id=\"a\" class='note' style='font-family: \"Nanum Gothic\"'>x</p></body></html>")
+    assert _style_of(html, "a") == "color: red; font-family: 'Nanum Gothic'"
+    assert html.count("style=") == 1
+
+
+def test_conditional_comments_are_left_alone():
+    source = ("<html><head><style>p { color: red }</style>"
+              "<!--[if mso]><style>p { color: black }</style><![endif]--></head>"
+              "<body><!--[if mso]><p>outlook</p><![endif]--><p id=\"a\">x</p>"
+              "<!--[if !mso]><!--><div>web</div><!--<![endif]--><!-- 메모 --></body></html>")
+    html, _, _ = app.inline_css(source)
+    assert "<!--[if mso]><style>p { color: black }</style><![endif]-->" in html
+    assert "<!--[if mso]><p>outlook</p><![endif]-->" in html
+    assert _style_of(html, "a") == "color: red"
+
+    minified = app.minify_html(html)
+    assert "<!--[if mso]><p>outlook</p><![endif]-->" in minified
+    assert "<!--[if !mso]><!--><div>web</div><!--<![endif]-->" in minified
+    assert "메모" not in minified
+
+
+def test_minify_keeps_jinja_and_collapses_whitespace():
+    out = app.minify_html("<table>\n  <tr>\n    <td>{{ name }}   님</td>\n  </tr>\n</table>\n")
+    assert out == "<table><tr><td>{{ name }} 님</td></tr></table>"
+
+
+def test_payslip_templates_compile_and_render():
+    for name in app.EMAIL_TEMPLATE_NAMES:
+        template = app.compile_email_template("send01", name)
+        assert template is app.compile_email_template("send01", name)   # 캐시
+    report = app.email_template_report("send01")
+    assert all(r["compiled_bytes"] < r["source_bytes"] for r in report)
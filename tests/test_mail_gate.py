@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+def wait_for(cond, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def queue_waiters(gate, requests):
+    """requests: [(등급, 담당자)] 를 이 순서대로 대기열에 넣고, 자리 받은 순서를 기록."""
+    granted, threads = [], []
+    lock = threading.Lock()
+
+    def take(cls, owner):
+        gate.acquire(cls, owner)
+        with lock:
+            granted.append((cls, owner))
+
+    for n, (cls, owner) in enumerate(requests, 1):
+        t = threading.Thread(target=take, args=(cls, owner), daemon=True)
+        t.start()
+        threads.append(t)
+        wait_for(lambda: len(gate._waiting) == n)
+    return granted, threads
+
+
+def test_waiting_mail_is_granted_by_priority():
+    gate = app.MailGate("prio@example.com", 1)
+    gate.acquire("bulk", "send01")
+    granted, threads = queue_waiters(gate, [("bulk", "send01"), ("admin", "system01"), ("certificate", "system02")])
+    for expected in range(1, 4):
+        gate.release(granted[-1][0] if granted else "bulk")
+        wait_for(lambda: len(granted) == expected)
+    assert granted == [("certificate", "system02"), ("admin", "system01"), ("bulk", "send01")]
+    gate.release("bulk")
+    for t in threads:
+        t.join(1)
+    assert gate.snapshot()["classes"]["certificate"]["granted"] == 1
+
+
+def test_bulk_leaves_urgent_reserve_free(monkeypatch):
+    monkeypatch.setattr(app, "MAIL_URGENT_RESERVE", 1)
+    gate = app.MailGate("reserve@example.com", 3)
+    gate.acquire("bulk", "send01")
+    gate.acquire("bulk", "send01")
+    granted, _ = queue_waiters(gate, [("bulk", "send01")])
+    time.sleep(0.05)
+    assert granted == []                                  # 마지막 1자리는 급한 메일 몫
+    gate.acquire("certificate", "system01")               # 바로 들어감
+    assert gate.in_flight == {"certificate": 1, "admin": 0, "bulk": 2}
+    gate.release("certificate")
+    gate.release("bulk")
+    wait_for(lambda: granted == [("bulk", "send01")])
+
+
+def test_bulk_alternates_between_operators():
+    gate = app.MailGate("fair@example.com", 1)
+    gate.acquire("bulk", "send01")
+    granted, _ = queue_waiters(gate, [("bulk", "send01"), ("bulk", "send01"), ("bulk", "send02")])
+    for expected in range(1, 4):
+        gate.release("bulk")
+        wait_for(lambda: len(granted) == expected)
+    # send01 이 방금 자리를 받았으므로 먼저 온 send01 보다 send02 가 앞섬
+    assert [owner for _, owner in granted] == ["send02", "send01", "send01"]
+
+
+@pytest.fixture
+def multi_worker(monkeypatch, runtime_db):
+    monkeypatch.setattr(app, "MAIL_MULTI_WORKER", True)
+    monkeypatch.setattr(app, "MAIL_YIELD_MAX_SEC", 2.0)
+    return app
+
+
+def publish_other_worker(account, urgent, ts=None):
+    key = app._urgent_state_key(account, pid=99999)
+    app.runtime_set(key, urgent=urgent, urgent_ts=time.time() if ts is None else ts)
+
+
+def test_bulk_yields_to_urgent_mail_in_other_worker(multi_worker):
+    account = "yield@example.com"
+    publish_other_worker(account, 1)
+    threading.Timer(0.6, publish_other_worker, args=(account, 0)).start()
+    started = time.monotonic()
+    app._mail_slot_acquire(account, "bulk", "send01")
+    waited = time.monotonic() - started
+    app._mail_slot_release(account, "bulk")
+    assert 0.5 <= waited < 2.0
+
+
+def test_bulk_ignores_own_and_stale_urgent_mail(multi_worker):
+    account = "own@example.com"
+    app._mail_slot_acquire(account, "certificate", "system01")     # 이 프로세스의 급한 메일은 게이트가 처리
+    publish_other_worker(account, 1, ts=time.time() - 3600)         # 죽은 워커가 남긴 값
+    started = time.monotonic()
+    app._mail_slot_acquire(account, "bulk", "send01")
+    assert time.monotonic() - started < 0.3
+    app._mail_slot_release(account, "bulk")
+    app._mail_slot_release(account, "certificate")
+    assert app.runtime_get(app._urgent_state_key(account), "urgent") == 0
+
+
+def test_single_worker_skips_sqlite(monkeypatch, runtime_db):
+    monkeypatch.setattr(app, "MAIL_MULTI_WORKER", False)
+    with app.mail_slot("single@example.com", "certificate", "system01"):
+        pass
+    with app._runtime_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM runtime_state WHERE key LIKE 'mailq:%'").fetchone()[0] == 0